@@ -0,0 +1,97 @@
+MAX_HAND_SLOTS = 10
+MAX_ENEMY_SLOTS = 6
+MAX_PILE_SLOTS = 20
+MAX_POTION_SLOTS = 5
+MAX_CHOICE_SLOTS = 64
+
+# Target slots of a card: no target, an enemy, a card in hand, a card in the discard pile, or a discard pile card
+# together with an enemy (headbutt). No combat option targets the exhaust pile.
+ENEMY_TARGET_OFFSET = 1
+HAND_TARGET_OFFSET = ENEMY_TARGET_OFFSET + MAX_ENEMY_SLOTS
+PILE_TARGET_OFFSET = HAND_TARGET_OFFSET + MAX_HAND_SLOTS
+PILE_ENEMY_TARGET_OFFSET = PILE_TARGET_OFFSET + MAX_PILE_SLOTS
+NUM_CARD_TARGET_SLOTS = PILE_ENEMY_TARGET_OFFSET + MAX_PILE_SLOTS * MAX_ENEMY_SLOTS
+
+NUM_POTION_TARGET_SLOTS = 1 + MAX_ENEMY_SLOTS
+
+PLAY_OFFSET = 0
+PLAY_POTION_OFFSET = PLAY_OFFSET + MAX_HAND_SLOTS * NUM_CARD_TARGET_SLOTS
+END_TURN_INDEX = PLAY_POTION_OFFSET + MAX_POTION_SLOTS * NUM_POTION_TARGET_SLOTS
+CHOICE_OFFSET = END_TURN_INDEX + 1
+ACTION_SPACE_SIZE = CHOICE_OFFSET + MAX_CHOICE_SLOTS
+
+
+def get_option_indices(floor, option_tuples: list[tuple[str, ...]]) -> dict[int, tuple[str, ...]]:
+    """
+    Maps the option tuples of the current floor onto the fixed action space. In combat an option's index is built
+    from the slot of the card or potion played and the slot of its targets; outside combat options take the choice
+    slots in the order the floor lists them. Options beyond the fixed number of slots are left out.
+    """
+    if floor.floor_type != 'combat':
+        return {CHOICE_OFFSET + position: option for position, option in enumerate(option_tuples[:MAX_CHOICE_SLOTS])}
+    hand_slots = {card_id: slot for slot, card_id in enumerate(floor.player['hand'])}
+    enemy_slots = {enemy['id']: slot for slot, enemy in enumerate(floor.enemy_list)}
+    pile_slots = {card_id: slot for slot, card_id in enumerate(floor.player['discard_pile'])}
+    potion_slots = {potion_id: slot for slot, potion_id in enumerate(floor.player['potions'])}
+    option_indices = {}
+    for option in option_tuples:
+        if option[0] == 'end_turn':
+            option_index = END_TURN_INDEX
+        elif option[0] == 'play':
+            option_index = get_card_option_index(option, hand_slots, enemy_slots, pile_slots)
+        else:
+            option_index = get_potion_option_index(option, potion_slots, enemy_slots)
+        if option_index is not None:
+            option_indices[option_index] = option
+    return option_indices
+
+
+def get_card_option_index(option: tuple[str, ...], hand_slots: dict, enemy_slots: dict,
+                          pile_slots: dict) -> int | None:
+    hand_slot = hand_slots.get(option[1], MAX_HAND_SLOTS)
+    if hand_slot >= MAX_HAND_SLOTS:
+        return None
+    targets = option[2:]
+    if not targets:
+        target_slot = 0
+    elif len(targets) == 2:
+        pile_slot = pile_slots.get(targets[0], MAX_PILE_SLOTS)
+        enemy_slot = enemy_slots.get(targets[1], MAX_ENEMY_SLOTS)
+        if pile_slot >= MAX_PILE_SLOTS or enemy_slot >= MAX_ENEMY_SLOTS:
+            return None
+        target_slot = PILE_ENEMY_TARGET_OFFSET + pile_slot * MAX_ENEMY_SLOTS + enemy_slot
+    elif targets[0] in enemy_slots:
+        if enemy_slots[targets[0]] >= MAX_ENEMY_SLOTS:
+            return None
+        target_slot = ENEMY_TARGET_OFFSET + enemy_slots[targets[0]]
+    elif targets[0] in hand_slots:
+        target_slot = HAND_TARGET_OFFSET + hand_slots[targets[0]]
+    elif pile_slots.get(targets[0], MAX_PILE_SLOTS) < MAX_PILE_SLOTS:
+        target_slot = PILE_TARGET_OFFSET + pile_slots[targets[0]]
+    else:
+        return None
+    return PLAY_OFFSET + hand_slot * NUM_CARD_TARGET_SLOTS + target_slot
+
+
+def get_potion_option_index(option: tuple[str, ...], potion_slots: dict, enemy_slots: dict) -> int | None:
+    potion_slot = potion_slots.get(option[1], MAX_POTION_SLOTS)
+    if potion_slot >= MAX_POTION_SLOTS:
+        return None
+    target_slot = 0
+    if len(option) > 2:
+        enemy_slot = enemy_slots.get(option[2], MAX_ENEMY_SLOTS)
+        if enemy_slot >= MAX_ENEMY_SLOTS:
+            return None
+        target_slot = 1 + enemy_slot
+    return PLAY_POTION_OFFSET + potion_slot * NUM_POTION_TARGET_SLOTS + target_slot
+
+
+def build_action_mask(option_indices: dict[int, tuple[str, ...]], out=None):
+    # numpy is imported here so importing Game does not pay for it when no mask is asked for.
+    import numpy as np
+    if out is None:
+        out = np.zeros(ACTION_SPACE_SIZE, dtype=np.bool_)
+    else:
+        out[:] = False
+    out[list(option_indices)] = True
+    return out
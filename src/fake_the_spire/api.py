@@ -0,0 +1,161 @@
+from fake_the_spire import GameOver, FloorOver
+from fake_the_spire.sessions import GameSession, GameSessionStore, SessionNotFound
+from fake_the_spire.state_delta import copy_state, diff_state
+from fake_the_spire.transcripts import hash_options, record_transcript
+
+Response = tuple[dict, int]
+
+
+def play_game_request(game_sessions: GameSessionStore, request_json: dict) -> Response:
+    """
+    The /play_game contract shared by the Flask and the ASGI server. Starts a new game session when no action is
+    given, otherwise plays the action in the game of session_id. A request may instead carry "actions", an ordered
+    list played one after the other in the same session, or "requests", a list of independent requests whose
+    responses come back in the same order.
+    """
+    if 'requests' in request_json:
+        batch_error_response = get_batch_error(request_json)
+        if batch_error_response is not None:
+            return batch_error_response
+        return {"responses": [response_with_status(play_batched_request(game_sessions, session_request))
+                              for session_request in request_json['requests']]}, 200
+    if not is_action_request(request_json):
+        return start_game(game_sessions, request_json)
+    session, error_response = get_request_session(game_sessions, request_json)
+    if session is None:
+        return error_response
+    return play_action(game_sessions, session, request_json)
+
+
+def get_batch_error(request_json: dict) -> Response | None:
+    if not isinstance(request_json['requests'], list):
+        return {"error": "requests must be a list of requests"}, 400
+    return None
+
+
+def get_batched_request_error(session_request) -> Response | None:
+    """
+    The 400 response of one entry of "requests" that is not a request object or is itself a batch, else None.
+    """
+    if not isinstance(session_request, dict):
+        return {"error": "Each entry of requests must be a request object"}, 400
+    if 'requests' in session_request:
+        return {"error": "Nested requests are not supported"}, 400
+    return None
+
+
+def play_batched_request(game_sessions: GameSessionStore, session_request) -> Response:
+    error_response = get_batched_request_error(session_request)
+    if error_response is not None:
+        return error_response
+    return play_game_request(game_sessions, session_request)
+
+
+def is_action_request(request_json: dict) -> bool:
+    return bool(request_json.get('action') or request_json.get('actions'))
+
+
+def response_with_status(response: Response) -> dict:
+    response_json, status = response
+    return {"status": status, **response_json}
+
+
+def start_game(game_sessions: GameSessionStore, request_json: dict) -> Response:
+    session = game_sessions.create_session(seed=request_json.get('seed'))
+    game = session.game
+    record_transcript('start', session.session_id, seed=game.seed)
+    # The client decides whether to make another request based on this response
+    response_json = {"session_id": session.session_id, "options": game.current_options}
+    attach_game_state(session, request_json, response_json)
+    return response_json, 200
+
+
+def get_request_session(game_sessions: GameSessionStore,
+                        request_json: dict) -> tuple[GameSession | None, Response | None]:
+    session_id = request_json.get('session_id')
+    if not session_id:
+        return None, ({"error": "Missing session_id"}, 400)
+    try:
+        return game_sessions.get_session(session_id), None
+    except SessionNotFound:
+        return None, ({"error": "Unknown or expired session_id", "session_id": session_id}, 404)
+
+
+def play_action(game_sessions: GameSessionStore, session: GameSession, request_json: dict) -> Response:
+    with session.lock:
+        if request_json.get('actions'):
+            response = play_session_actions(game_sessions, session, request_json['actions'])
+        else:
+            response = play_session_action(game_sessions, session, request_json['action'])
+        attach_game_state(session, request_json, response[0])
+        if 'delta' in response[0]:
+            record_transcript('state', session.session_id, state_version=session.state_version,
+                              delta=response[0]['delta'])
+    game_sessions.update_memory_estimate(session)
+    return response
+
+
+def attach_game_state(session: GameSession, request_json: dict, response_json: dict):
+    """
+    Puts the game state in the response. With "delta" set in the request, a client whose "state_version" is the
+    latest one the session sent gets only the changes since then under "delta"; any other client gets the full
+    state under "game" to resync. Either way the response carries the new "state_version" to acknowledge next time.
+    The state is copied so the response can be serialized after session.lock is released.
+    """
+    game_state = copy_state(session.game.to_dict())
+    if not request_json.get('delta'):
+        response_json['game'] = game_state
+        return
+    if session.state_snapshot is not None and request_json.get('state_version') == session.state_version:
+        response_json['delta'] = diff_state(session.state_snapshot, game_state)
+    else:
+        response_json['game'] = game_state
+    session.state_snapshot = game_state
+    session.state_version += 1
+    response_json['state_version'] = session.state_version
+
+
+def play_session_action(game_sessions: GameSessionStore, session: GameSession, action: list[str]) -> Response:
+    game = session.game
+    options = game.current_options
+    if not game.validate_action(action):
+        return {"error": "Invalid action", "session_id": session.session_id, "options": options}, 400
+    try:
+        record_transcript('step', session.session_id, action=action[0], options_hash=hash_options(options))
+        game.action_initiate(action)
+    except GameOver as ge:
+        record_transcript('end', session.session_id, won=ge.args[0])
+        game_sessions.remove_session(session.session_id)
+        return {"session_id": session.session_id, "game_over": str(ge)}, 200
+    except FloorOver:
+        pass
+    return {"session_id": session.session_id, "options": game.current_options}, 200
+
+
+def play_session_actions(game_sessions: GameSessionStore, session: GameSession, actions: list[str]) -> Response:
+    """
+    Plays actions in order, validating each one against the options left by the previous step, and stops at the
+    first invalid action or at the end of the game. Every attempted action gets an entry in "results".
+    """
+    game = session.game
+    if not isinstance(actions, list):
+        return {"error": "Invalid actions", "session_id": session.session_id, "options": game.current_options}, 400
+    results = []
+    for action in actions:
+        if not game.validate_action([action]):
+            results.append({"action": action, "error": "Invalid action"})
+            return {"error": "Invalid action", "session_id": session.session_id, "results": results,
+                    "options": game.current_options}, 400
+        try:
+            record_transcript('step', session.session_id, action=action,
+                              options_hash=hash_options(game.current_options))
+            game.action_initiate([action])
+        except GameOver as ge:
+            record_transcript('end', session.session_id, won=ge.args[0])
+            game_sessions.remove_session(session.session_id)
+            results.append({"action": action, "game_over": str(ge)})
+            return {"session_id": session.session_id, "game_over": str(ge), "results": results}, 200
+        except FloorOver:
+            pass
+        results.append({"action": action, "options": game.current_options})
+    return {"session_id": session.session_id, "results": results, "options": game.current_options}, 200
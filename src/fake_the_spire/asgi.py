@@ -0,0 +1,132 @@
+import asyncio
+import json
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from fake_the_spire.api import (Response, get_batch_error, get_batched_request_error, get_request_session,
+                                is_action_request, play_action, response_with_status, start_game)
+from fake_the_spire.condition_based_file_handler import setup_logging
+from fake_the_spire.config import config
+from fake_the_spire.references import load_all_references
+from fake_the_spire.sessions import GameSessionStore
+from fake_the_spire.transcripts import setup_transcript_logging, stop_transcript_logging
+
+
+class PlayGameApp:
+    """
+    ASGI app serving the same /play_game contract as the Flask app in views.py, e.g.
+    `uvicorn fake_the_spire.asgi:app`. Game steps run on a bounded thread pool so a slow combat resolution only holds
+    up its own session; steps of one session run in arrival order, and once max_pending_requests are waiting new
+    requests are turned away with 503 instead of queueing without bound. Transcripts are written from lifespan
+    startup to shutdown, into transcript_directory if given.
+    """
+
+    def __init__(self, game_sessions: GameSessionStore = None,
+                 max_concurrent_steps: int = config.ASGI_MAX_CONCURRENT_STEPS,
+                 max_pending_requests: int = config.ASGI_MAX_PENDING_REQUESTS, transcript_directory: Path = None):
+        self.game_sessions = game_sessions if game_sessions is not None else GameSessionStore()
+        self.transcript_directory = transcript_directory
+        self.max_pending_requests = max_pending_requests
+        self.pending_requests = 0
+        self.executor = ThreadPoolExecutor(max_concurrent_steps, thread_name_prefix='game_step')
+        self.step_slots = asyncio.Semaphore(max_concurrent_steps)
+        self.session_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        if scope['path'] != '/play_game':
+            await send_json(send, {"error": "Not found"}, 404)
+            return
+        if scope['method'] != 'POST':
+            await send_json(send, {"error": "Method not allowed"}, 405)
+            return
+        try:
+            request_json = json.loads(await read_body(receive) or b'{}')
+        except ValueError:
+            await send_json(send, {"error": "Invalid JSON"}, 400)
+            return
+        if not isinstance(request_json, dict):
+            await send_json(send, {"error": "Invalid JSON"}, 400)
+            return
+        if self.pending_requests >= self.max_pending_requests:
+            await send_json(send, {"error": "Server busy"}, 503, [(b'retry-after', b'1')])
+            return
+        self.pending_requests += 1
+        try:
+            response_json, status = await self.play_game(request_json)
+        finally:
+            self.pending_requests -= 1
+        await send_json(send, response_json, status)
+
+    async def play_game(self, request_json: dict) -> Response:
+        if 'requests' in request_json:
+            batch_error_response = get_batch_error(request_json)
+            if batch_error_response is not None:
+                return batch_error_response
+            responses = await asyncio.gather(*(self.play_batched_request(session_request)
+                                               for session_request in request_json['requests']))
+            return {"responses": [response_with_status(response) for response in responses]}, 200
+        if not is_action_request(request_json):
+            return await self.run_step(start_game, self.game_sessions, request_json)
+        session, error_response = get_request_session(self.game_sessions, request_json)
+        if session is None:
+            return error_response
+        # play_action copies the game state under session.lock, so send_json can encode it after the next step starts
+        async with self.get_session_lock(session.session_id):
+            return await self.run_step(play_action, self.game_sessions, session, request_json)
+
+    async def play_batched_request(self, session_request) -> Response:
+        error_response = get_batched_request_error(session_request)
+        if error_response is not None:
+            return error_response
+        return await self.play_game(session_request)
+
+    async def run_step(self, step, *args) -> Response:
+        async with self.step_slots:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, step, *args)
+
+    def get_session_lock(self, session_id: str) -> asyncio.Lock:
+        session_lock = self.session_locks.get(session_id)
+        if session_lock is None:
+            session_lock = asyncio.Lock()
+            self.session_locks[session_id] = session_lock
+        return session_lock
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                load_all_references()
+                setup_transcript_logging(self.transcript_directory)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                stop_transcript_logging()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+async def read_body(receive) -> bytes:
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body', False):
+            return body
+
+
+async def send_json(send, response_json: dict, status: int, headers: list = None):
+    body = json.dumps(response_json).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'),
+                            (b'content-length', str(len(body)).encode('ascii'))] + (headers or [])})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+logger = setup_logging()
+app = PlayGameApp()
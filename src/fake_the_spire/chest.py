@@ -1,18 +1,23 @@
 import random
 import math
+from collections import Counter
 
+from fake_the_spire.entity_ids import IdAllocator, default_ids
 from fake_the_spire.floor import Floor
-from fake_the_spire.references import RelicReference, generate_probability_list_from_probability_dict
+from fake_the_spire.references import RelicReference, get_weighted_sampler
+from fake_the_spire.rng import GameRandom
 
 from fake_the_spire.config import config
 
 
 class Chest(Floor):
-    def __init__(self, game_state: dict, chest_rarity: str = None):
-        super().__init__(game_state)
+    def __init__(self, game_state: dict, chest_rarity: str = None, rng: GameRandom = None, ids: IdAllocator = None,
+                 action_counts: Counter = None):
+        super().__init__(game_state, rng, ids, action_counts)
         if chest_rarity is None:
-            chest_rarity = self.generate_chest_rarity()
-        self.chest = {'relics': [self.generate_chest_relic(chest_rarity)], 'gold': self.generate_gold(chest_rarity)}
+            chest_rarity = self.generate_chest_rarity(self.rng.treasure)
+        self.chest = {'relics': [self.generate_chest_relic(chest_rarity, self.rng.treasure, self.ids)],
+                      'gold': self.generate_gold(chest_rarity, self.rng.treasure)}
 
     def take_action(self, action: str):
         super().take_action(action)
@@ -39,26 +44,23 @@ class Chest(Floor):
             del self.chest[removal_type]
 
     @staticmethod
-    def generate_chest_rarity():
-        chest_rarity_names, weights = generate_probability_list_from_probability_dict(
-            config.CHEST_SIZE_PROBABILITY_WEIGHT_DICT)
-        chest_rarity = random.choices(chest_rarity_names, weights=weights)
-        return chest_rarity[0]
+    def generate_chest_rarity(rng=random):
+        return get_weighted_sampler(config.CHEST_SIZE_PROBABILITY_WEIGHT_DICT).sample(rng)
 
     @staticmethod
-    def generate_chest_relic(chest_rarity) -> str:
+    def generate_chest_relic(chest_rarity, rng=random, ids: IdAllocator = default_ids) -> str:
         relic_reference = RelicReference.get_instance()
         relic_rarity_dict = config.CHEST_RELIC_RARITY_PROBABILITY_DICT[chest_rarity]
-        relic = relic_reference.get_single_entity_by_probability_dict('rarity', relic_rarity_dict)
+        relic = relic_reference.get_single_entity_by_probability_dict('rarity', relic_rarity_dict, rng=rng, ids=ids)
         return relic[0]
 
     @staticmethod
-    def generate_gold(chest_rarity) -> int:
+    def generate_gold(chest_rarity, rng=random) -> int:
         chest_gold_chance = config.CHEST_GOLD_CHANCE_DICT[chest_rarity]
-        has_gold = random.random() < chest_gold_chance
+        has_gold = rng.random() < chest_gold_chance
         if has_gold:
             base_gold_amount = config.CHEST_GOLD_AMOUNT_DICT[chest_rarity]
             int_cost_variance = math.floor(config.CHEST_GOLD_VARIANCE * base_gold_amount)
-            gold_amount = random.randint(base_gold_amount - int_cost_variance, base_gold_amount + int_cost_variance)
+            gold_amount = rng.randint(base_gold_amount - int_cost_variance, base_gold_amount + int_cost_variance)
             return gold_amount
         return 0
@@ -1,106 +1,186 @@
 import logging
 import random
 import itertools
-import uuid
+from collections import Counter
+from typing import NamedTuple
 
 from fake_the_spire import FloorOver
-from fake_the_spire.floor import Floor
+from fake_the_spire.entity_ids import IdAllocator, default_ids, entity_name
+from fake_the_spire.floor import Floor, action_handler, format_option
+from fake_the_spire.opcodes import Op, Verb, TargetSelector
+from fake_the_spire.piles import Pile
+from fake_the_spire.rng import GameRandom
 from fake_the_spire.references import (EnemyReference, CardReference, CombatReference, PotionReference,
-                                       generate_probability_list_from_probability_dict)
+                                       get_card_instance, get_weighted_sampler)
 
 logger = logging.getLogger('flask_app')
 
 
+class PileSnapshot(NamedTuple):
+    source: Pile
+    version: int
+    cards: Pile
+
+
+class CombatState(NamedTuple):
+    """
+    The combat part of a FloorSnapshot. Card instances are shared with the live piles, since combat never changes a
+    card in place.
+    """
+    piles: dict[str, PileSnapshot]
+    energy: int
+    max_energy: int
+    optional_dict: dict
+    potions: dict
+    enemies: tuple[dict, ...]
+
+
+def copy_enemy(enemy: dict) -> dict:
+    return {**enemy, 'optional_dict': dict(enemy['optional_dict']), 'action_history': list(enemy['action_history'])}
+
+
 class Combat(Floor):
-    def __init__(self, game_state: dict, enemy_ids: list[str] = None, combat_type: str = "hallway"):
-        super().__init__(game_state)
+    CARD_PILE_NAMES = ('hand', 'draw_pile', 'discard_pile', 'exhaust_pile')
+
+    def __init__(self, game_state: dict, enemy_ids: list[str] = None, combat_type: str = "hallway",
+                 rng: GameRandom = None, ids: IdAllocator = None, action_counts: Counter = None):
+        super().__init__(game_state, rng, ids, action_counts)
         self.floor_type = "combat"
-        self.player = {'max_energy': game_state['player']['max_energy'], 'optional_dict': {}, 'hand': {}, 'energy': 0,
-                       'draw_pile': self.generate_draw_pile(game_state['player']['deck']), 'discard_pile': {},
-                       'potions': self.generate_potions(game_state['player']['potions']), 'top_of_deck_ids': [],
-                       'exhaust_pile': {}}
-        self.enemy_list = self.generate_enemies(game_state['act'], combat_type, enemy_ids)
+        self.player = {'max_energy': game_state['player']['max_energy'], 'optional_dict': {}, 'hand': Pile(),
+                       'energy': 0, 'draw_pile': Pile(self.generate_draw_pile(game_state['player']['deck'], self.ids)),
+                       'discard_pile': Pile(),
+                       'potions': self.generate_potions(game_state['player']['potions'], self.ids),
+                       'exhaust_pile': Pile()}
+        self.enemy_list = self.generate_enemies(game_state['act'], combat_type, enemy_ids, self.rng, self.ids)
+        self.enemies_by_id = {enemy['id']: enemy for enemy in self.enemy_list}
+        self.card_option_cache = {}
+        self.option_target_cache = {}
+        self.hand_attack_count = (-1, 0)
+        self.pile_snapshots = {}
         self.combat_type = combat_type
         self.start_combat()
 
     @staticmethod
-    def generate_enemies(act: int, combat_type: str, enemy_ids: list[str] = None) -> list[dict]:
+    def generate_enemies(act: int, combat_type: str, enemy_ids: list[str] = None,
+                         rng: GameRandom = None, ids: IdAllocator = default_ids) -> list[dict]:
         enemy_reference = EnemyReference.get_instance()
         combat_reference = CombatReference.get_instance()
         if enemy_ids:
-            return enemy_reference.generate_enemies_by_id_list(enemy_ids)
-        enemy_ids = combat_reference.generate_enemies_by_combat_type_and_act(act, combat_type)
-        return enemy_reference.generate_enemies_by_id_list(enemy_ids)
+            return enemy_reference.generate_enemies_by_id_list(enemy_ids, ids)
+        enemy_ids = combat_reference.generate_enemies_by_combat_type_and_act(
+            act, combat_type, rng.encounters if rng is not None else random)
+        return enemy_reference.generate_enemies_by_id_list(enemy_ids, ids)
 
     @staticmethod
-    def generate_draw_pile(init_deck: dict) -> dict:
+    def generate_draw_pile(init_deck: dict, ids: IdAllocator = default_ids) -> dict:
         card_reference = CardReference.get_instance()
-        return card_reference.generate_entity_dict_from_init_dict(init_deck)
+        return card_reference.generate_card_instance_dict_from_init_dict(init_deck, ids)
 
     @staticmethod
-    def generate_potions(init_potions: list[str]) -> dict:
+    def generate_potions(init_potions: list[str], ids: IdAllocator = default_ids) -> dict:
         potion_reference = PotionReference.get_instance()
-        return potion_reference.generate_entity_dict_from_init_dict(init_potions)
+        return potion_reference.generate_entity_dict_from_init_dict(init_potions, ids)
 
     def to_dict(self):
-        return {'player': self.player, 'enemy_list': self.enemy_list}
+        player = dict(self.player)
+        for pile_name in self.CARD_PILE_NAMES:
+            player[pile_name] = {card_id: card.to_dict() for card_id, card in self.player[pile_name].items()}
+        player['top_of_deck_ids'] = list(self.player['draw_pile'].top_ids)
+        return {'player': player, 'enemy_list': self.enemy_list}
+
+    def snapshot_floor_state(self) -> CombatState:
+        """
+        Copies only the piles that changed since they were last snapshotted or restored, so sibling snapshots taken
+        while a pile is unchanged share one frozen copy of it.
+        """
+        piles = {}
+        for pile_name in self.CARD_PILE_NAMES:
+            pile = self.player[pile_name]
+            pile_snapshot = self.pile_snapshots.get(pile_name)
+            if pile_snapshot is None or pile_snapshot.source is not pile or pile_snapshot.version != pile.version:
+                pile_snapshot = PileSnapshot(pile, pile.version, pile.copy())
+                self.pile_snapshots[pile_name] = pile_snapshot
+            piles[pile_name] = pile_snapshot
+        return CombatState(piles, self.player['energy'], self.player['max_energy'],
+                           dict(self.player['optional_dict']), dict(self.player['potions']),
+                           tuple(copy_enemy(enemy) for enemy in self.enemy_list))
+
+    def restore_floor_state(self, floor_state: CombatState):
+        for pile_name, pile_snapshot in floor_state.piles.items():
+            pile = self.player[pile_name]
+            if pile_snapshot.source is not pile or pile_snapshot.version != pile.version:
+                pile = pile_snapshot.cards.copy()
+                self.player[pile_name] = pile
+                self.pile_snapshots[pile_name] = PileSnapshot(pile, pile_snapshot.version, pile_snapshot.cards)
+        self.player['energy'] = floor_state.energy
+        self.player['max_energy'] = floor_state.max_energy
+        self.player['optional_dict'] = dict(floor_state.optional_dict)
+        self.player['potions'] = dict(floor_state.potions)
+        self.enemy_list = [copy_enemy(enemy) for enemy in floor_state.enemies]
+        self.enemies_by_id = {enemy['id']: enemy for enemy in self.enemy_list}
+        self.card_option_cache = {}
+        self.option_target_cache = {}
+        self.hand_attack_count = (-1, 0)
+
+    def checkpoint_floor_state(self) -> dict:
+        player = {key: value for key, value in self.player.items() if key not in self.CARD_PILE_NAMES}
+        piles = {pile_name: {'cards': [[card_id, card.template['name'], card.overrides]
+                                       for card_id, card in self.player[pile_name].items()],
+                             'top_ids': list(self.player[pile_name].top_ids)}
+                 for pile_name in self.CARD_PILE_NAMES}
+        return {**super().checkpoint_floor_state(), 'combat_type': self.combat_type, 'player': player,
+                'piles': piles, 'enemy_list': self.enemy_list}
+
+    def restore_checkpoint_floor_state(self, floor_state: dict):
+        super().restore_checkpoint_floor_state(floor_state)
+        self.floor_type = "combat"
+        self.combat_type = floor_state['combat_type']
+        self.player = dict(floor_state['player'])
+        for pile_name, pile_state in floor_state['piles'].items():
+            pile = Pile({card_id: get_card_instance(name, overrides)
+                         for card_id, name, overrides in pile_state['cards']})
+            pile.top_ids = list(pile_state['top_ids'])
+            self.player[pile_name] = pile
+        self.enemy_list = floor_state['enemy_list']
+        self.enemies_by_id = {enemy['id']: enemy for enemy in self.enemy_list}
+        self.card_option_cache = {}
+        self.option_target_cache = {}
+        self.hand_attack_count = (-1, 0)
+        self.pile_snapshots = {}
 
     def start_combat(self):
         self.get_new_enemy_action(is_first_turn=True)
         self.start_turn()
 
     def take_action(self, action: str):
-        action = super().take_action(action)
-        if action is not None:
-            if action[0] == 'attack':
-                self.attack(action[1:])
-            elif action[0] == 'apply':
-                self.apply(action[1:])
-            elif action[0] == 'draw':
-                self.draw(action[1:])
-            elif action[0] == 'play':
-                self.play(action[1:])
-            elif action[0] == 'play_potion':
-                self.play_potion(action[1:])
-            elif action[0] == 'end_turn':
-                self.resolve_end_turn()
-            elif action[0] == 'gain_energy':
-                self.gain_energy(action[1:])
-            elif action[0] == 'stage':
-                self.update_stage(action[1:])
-            elif action[0] == 'damage':
-                self.damage(action[1:])
-            elif action[0] == 'blockable_damage':
-                self.blockable_damage(action[1:])
-            elif action[0] == 'add':
-                self.add_card(action[1:])
-            elif action[0] == 'put':
-                self.put_card(action[1:])
-            elif action[0] == 'duplicate':
-                self.duplicate_card(action[1:])
-            elif action[0] == 'rampage':
-                self.rampage(action[1:])
-            elif action[0] == 'upgrade':
-                self.upgrade_card(action[1:])
-            else:
-                logger.info(f'Invalid action: {action}')
-
+        super().take_action(action)
+        self.check_combat_over()
+
+    def take_compiled_action(self, op: Op, user: str, targets: tuple[str, ...]):
+        self.action_counts[op.verb.word] += 1
+        self.compiled_action_handlers[op.verb](self, op, user, targets)
+        self.check_combat_over()
+
+    def take_direct_action(self, verb: Verb, handler, *args):
+        """
+        Calls handler directly instead of going through an action string, counting it under verb like the string and
+        compiled paths do.
+        """
+        self.action_counts[verb.word] += 1
+        handler(*args)
+        self.check_combat_over()
+
+    def check_combat_over(self):
         if all(enemy['hp'] <= 0 for enemy in self.enemy_list):
             raise FloorOver
 
+    @action_handler('attack')
     def attack(self, action: list[str]):
-        attack_value = int(action[0])
-        attacker_val = action[1]
-        attack_target = action[2]
+        self.attack_character(int(action[0]), action[1], action[2])
 
-        if attack_target == 'player':
-            target = self.player
-        else:
-            target = self.get_enemy_by_id(attack_target)
-        if attacker_val == 'player':
-            attacker = self.player
-        else:
-            attacker = self.get_enemy_by_id(attacker_val)
+    def attack_character(self, attack_value: int, attacker_val: str, attack_target: str):
+        target = self.get_character(attack_target)
+        attacker = self.get_character(attacker_val)
 
         if 'perfected_strike' in attacker['optional_dict']:
             strike_count = 0
@@ -129,8 +209,8 @@ class Combat(Floor):
         if 'vulnerable' in target['optional_dict']:
             if target['optional_dict']['vulnerable'] > 0:
                 if 'dropkick' in attacker['optional_dict']:
-                    self.take_action("gain_energy 1")
-                    self.take_action("draw")
+                    self.take_direct_action(Verb.GAIN_ENERGY, self.add_energy, 1)
+                    self.take_direct_action(Verb.DRAW, self.draw_card)
                 attack_value *= 1.5
         attack_value = int(attack_value)
 
@@ -147,23 +227,16 @@ class Combat(Floor):
         if 'thorns' in target['optional_dict']:
             self.damage_character(attacker_val, target['optional_dict']['thorns'])
         if 'reaper' in attacker['optional_dict']:
-            self.take_action(f'heal_player {attack_value}')
+            self.take_direct_action(Verb.HEAL_PLAYER, self.heal, attack_value)
         self.damage_character(attack_target, attack_value)
 
+    @action_handler('apply')
     def apply(self, action: list[str]):
-        option_key = action[0]
-        option_value = int(action[1])
-        option_user = action[2]
-        option_target = action[3]
-        if option_target == 'player':
-            target = self.player
-        else:
-            target = self.get_enemy_by_id(option_target)
+        self.apply_option(action[0], int(action[1]), action[2], action[3])
 
-        if option_user == 'player':
-            user = self.player
-        else:
-            user = self.get_enemy_by_id(option_user)
+    def apply_option(self, option_key: str, option_value: int, option_user: str, option_target: str):
+        target = self.get_character(option_target)
+        user = self.get_character(option_user)
 
         if option_key == 'mode_shift':
             previous_mode_shift_count = int(user['optional_dict']['mode_shift_count'])
@@ -177,8 +250,9 @@ class Combat(Floor):
                 total_non_attack_cards = len([card for card in user['hand'].values() if card['type'] != 'attack']) - 1
                 option_value += (user['optional_dict']['second_wind'] * total_non_attack_cards)
             if 'juggernaut' in user['optional_dict'] and user['optional_dict']['juggernaut'] > 0:
-                random_enemy = random.choice(self.enemy_list)['id']
-                self.take_action(f"blockable_damage {user['optional_dict']['juggernaut']} player {random_enemy}")
+                random_enemy = self.rng.card_effects.choice(self.enemy_list)['id']
+                self.take_direct_action(Verb.BLOCKABLE_DAMAGE, self.blockable_damage_character,
+                                        user['optional_dict']['juggernaut'], 'player', random_enemy)
             if 'dexterity' in user['optional_dict']:
                 option_value += user['optional_dict']['dexterity']
 
@@ -196,33 +270,35 @@ class Combat(Floor):
         else:
             target['optional_dict'][option_key] = option_value
 
+    @action_handler('draw')
     def draw(self, action: list[str]):
         if len(action) > 0:
-            played_card_id = action[1]
+            self.draw_card(action[1])
         else:
-            played_card_id = ''
+            self.draw_card()
+
+    def draw_card(self, played_card_id: str = ''):
         if 'battle_trance' in self.player['optional_dict'] and self.player['optional_dict']['battle_trance'] > 0:
             return
-        if len(self.player['draw_pile']) == 0:
-            self.player['draw_pile'] = self.player['discard_pile']
-            self.player['discard_pile'] = {}
-        if len(self.player['draw_pile']) > 0:
-            if len(self.player['top_of_deck_ids']) > 0:
-                card_id = self.player['top_of_deck_ids'].pop()
-            else:
-                card_id = random.choice(list(self.player['draw_pile'].keys()))
-            if len([key for key in self.player['hand'].keys() if key != played_card_id]) < 10:
-                card = self.player['draw_pile'].pop(card_id)
+        draw_pile = self.player['draw_pile']
+        if len(draw_pile) == 0:
+            draw_pile.shuffle_in(self.player['discard_pile'])
+        if len(draw_pile) > 0:
+            card_id = draw_pile.peek_next_id(self.rng.shuffle)
+            if len(self.player['hand']) - (played_card_id in self.player['hand']) < 10:
+                card = draw_pile.pop(card_id)
                 self.player['hand'][card_id] = card
                 if 'evolve' in self.player['optional_dict']:
                     if card['type'] == 'status':
-                        self.take_action(f"draw")
+                        self.take_direct_action(Verb.DRAW, self.draw_card)
                 if 'fire_breathing' in self.player['optional_dict']:
                     if card['type'] in ['status', 'curse']:
                         for enemy in self.enemy_list:
-                            self.take_action(f"blockable_damage {self.player['optional_dict']['fire_breathing']} "
-                                             f"player {enemy['id']}")
+                            self.take_direct_action(Verb.BLOCKABLE_DAMAGE, self.blockable_damage_character,
+                                                    self.player['optional_dict']['fire_breathing'], 'player',
+                                                    enemy['id'])
 
+    @action_handler('play')
     def play(self, action: list[str]):
         card_id = action[0]
         target_list = action[1:]
@@ -235,7 +311,8 @@ class Combat(Floor):
             if self.player['optional_dict']['panache_count'] >= 5:
                 self.player['optional_dict']['panache_count'] = 0
                 for enemy in self.enemy_list:
-                    self.take_action(f"blockable_damage {self.player['optional_dict']['panache']} player {enemy['id']}")
+                    self.take_direct_action(Verb.BLOCKABLE_DAMAGE, self.blockable_damage_character,
+                                            self.player['optional_dict']['panache'], 'player', enemy['id'])
 
         # if 'duplication' in self.player['optional_dict'] and self.player['optional_dict']['duplication'] > 0:
         #     self.player['optional_dict']['duplication'] -= 1
@@ -246,7 +323,7 @@ class Combat(Floor):
             energy_cost = 1
         else:
             repeat_count = 1
-            energy_cost = card["energy_cost"]
+            energy_cost = self.get_card_energy_cost(card)
         for i in range(repeat_count):
             if card_id not in self.player['hand']:
                 print("BAD")
@@ -254,28 +331,32 @@ class Combat(Floor):
                 print(self.player['hand'])
                 print(card_id)
             self.resolve_action_list(card_id, "actions", target_list)
-            self.take_action(f'gain_energy -{energy_cost}')
+            self.take_direct_action(Verb.GAIN_ENERGY, self.add_energy, -energy_cost)
 
         if card['type'] == 'skill':
             for enemy in self.enemy_list:
                 if 'enrage' in enemy['optional_dict']:
-                    self.take_action(f"apply strength {enemy['optional_dict']['enrage']} {enemy['id']} {enemy['id']}")
+                    self.take_direct_action(Verb.APPLY, self.apply_option, 'strength',
+                                            enemy['optional_dict']['enrage'], enemy['id'], enemy['id'])
         if card['type'] == 'attack':
             if 'double_tap' in self.player['optional_dict'] and self.player['optional_dict']['double_tap'] > 0:
-                self.take_action(f"apply double_tap -1 player player")
+                self.take_direct_action(Verb.APPLY, self.apply_option, 'double_tap', -1, 'player', 'player')
                 self.play(action)
             for enemy in self.enemy_list:
                 if 'sharp_hide' in enemy['optional_dict']:
-                    self.take_action(f"blockable_damage {enemy['optional_dict']['sharp_hide']} {enemy['id']} player")
+                    self.take_direct_action(Verb.BLOCKABLE_DAMAGE, self.blockable_damage_character,
+                                            enemy['optional_dict']['sharp_hide'], enemy['id'], 'player')
 
             if 'rage' in self.player['optional_dict'] and self.player['optional_dict']['rage'] > 0:
-                self.take_action(f"apply block {self.player['optional_dict']['rage']} player player")
+                self.take_direct_action(Verb.APPLY, self.apply_option, 'block', self.player['optional_dict']['rage'],
+                                        'player', 'player')
 
         if card_id in self.player['hand']:
             if card['type'] != 'power':
                 self.player['discard_pile'][card_id] = self.player['hand'][card_id]
             self.player['hand'].pop(card_id)
 
+    @action_handler('play_potion')
     def play_potion(self, action: list[str]):
         potion_id = action[0]
         target_list = action[1:]
@@ -284,26 +365,17 @@ class Combat(Floor):
         if potion_id in self.player['potions']:
             self.player['potions'].pop(potion_id)
 
+    @action_handler('rampage')
     def rampage(self, action: list[str]):
-        rampage_value = int(action[0])
-        rampage_card = action[2]
-        enemy_id = action[3]
+        self.rampage_attack(int(action[0]), action[2], action[3])
 
+    def rampage_attack(self, rampage_value: int, rampage_card: str, enemy_id: str):
         attack_boost = self.player['optional_dict'][rampage_card] if rampage_card in self.player['optional_dict'] else 0
-        self.take_action(f"attack {attack_boost + 8} player {enemy_id}")
-        self.take_action(f"apply {rampage_card} {rampage_value} player player")
+        self.take_direct_action(Verb.ATTACK, self.attack_character, attack_boost + 8, 'player', enemy_id)
+        self.take_direct_action(Verb.APPLY, self.apply_option, rampage_card, rampage_value, 'player', 'player')
 
     def resolve_action_list(self, entity_id: str, action_keyword: str, target_list: list[str]):
-        enemy_target_list = None
-        discard_target_list = []
-        hand_target_list = None
-        for target in target_list:
-            if self.get_enemy_by_id(target):
-                enemy_target_list = [target]
-            if target in self.player['discard_pile']:
-                discard_target_list.append(target)
-            if target in self.player['hand']:
-                hand_target_list = [target]
+        enemy_target_list, discard_target_list, hand_target_list = self.classify_target_tokens(target_list)
         if enemy_target_list is None:
             enemy_target_list = [enemy['id'] for enemy in self.enemy_list]
         if hand_target_list is None:
@@ -317,60 +389,75 @@ class Combat(Floor):
 
         if entity_id in self.player['hand']:
             card = self.player['hand'][entity_id]
-            actions_targets = card[action_keyword]
+            compiled_actions = CardReference.get_instance().get_compiled_actions(card['name'], action_keyword)
             is_card = True
         else:
             potion = self.player['potions'][entity_id]
-            actions_targets = potion[action_keyword]
+            compiled_actions = PotionReference.get_instance().get_compiled_actions(potion['name'], action_keyword)
             is_card = False
-        for (action, target) in actions_targets:
-            target_string_list = self.generate_target_string_list(target, target_dict)
-            for target_string in target_string_list:
-                card_action_list = action.split(' ')
-                if card_action_list[0] == 'apply' and card_action_list[1] == 'block':
-                    if ('panic_button' in self.player['optional_dict'] and
-                            self.player['optional_dict']['panic_button'] > 0 and is_card):
-                        card_action_list[2] = '0'
-                card_action = ' '.join(card_action_list)
-                self.take_action(f"{card_action} player {target_string}")
+        for op in compiled_actions:
+            target_token_list = self.generate_target_token_list(op, target_dict, self.rng.card_effects)
+            if op.verb == Verb.APPLY and op.args[0] == 'block':
+                if ('panic_button' in self.player['optional_dict'] and
+                        self.player['optional_dict']['panic_button'] > 0 and is_card):
+                    op = op._replace(value=0)
+            for targets in target_token_list:
+                self.take_compiled_action(op, 'player', targets)
+
+    def classify_target_tokens(self, target_list: list[str]) -> tuple[list[str] | None, list[str], list[str] | None]:
+        """
+        Sorts the target tokens of a play action into the chosen enemy, the chosen discard pile cards and the chosen
+        hand card. The enemy and hand entries are None when no token picked one.
+        """
+        enemy_target_list = None
+        discard_target_list = []
+        hand_target_list = None
+        for target in target_list:
+            if target in self.enemies_by_id:
+                enemy_target_list = [target]
+            elif target in self.player['discard_pile']:
+                discard_target_list.append(target)
+            elif target in self.player['hand']:
+                hand_target_list = [target]
+        return enemy_target_list, discard_target_list, hand_target_list
 
     @staticmethod
-    def generate_target_string_list(card_target: str, target_dict: dict) -> list[str]:
+    def generate_target_token_list(op: Op, target_dict: dict, rng=random) -> list[tuple[str, ...]]:
         enemy_target_list = target_dict['enemy']
-        if card_target == 'self':
-            return ['player']
-        if card_target == 'random_enemy':
-            return [f'{random.choice(enemy_target_list)}']
-        if card_target == 'hand':
-            return [' '.join(target_dict['hand'])]
-        if card_target == 'discard_pile':
-            return [' '.join(target_dict['discard_pile'])]
-        if card_target == 'enemy':
-            target_list = []
-            for target in enemy_target_list:
-                target_list.append(target)
-            return target_list
-        if card_target == 'self_card':
-            return [target_dict['card']]
-        if card_target == 'random_hand':
+        card_target = op.target
+        if card_target == TargetSelector.SELF:
+            return [('player',)]
+        if card_target == TargetSelector.RANDOM_ENEMY:
+            return [(rng.choice(enemy_target_list),)]
+        if card_target == TargetSelector.HAND:
+            return [tuple(target_dict['hand'])]
+        if card_target == TargetSelector.DISCARD_PILE:
+            return [tuple(target_dict['discard_pile'])]
+        if card_target == TargetSelector.ENEMY:
+            return [(target,) for target in enemy_target_list]
+        if card_target == TargetSelector.SELF_CARD:
+            return [(target_dict['card'],)]
+        if card_target == TargetSelector.RANDOM_HAND:
             target_dict["hand"].remove(target_dict["card"])
-            return [f'{random.choice(target_dict["hand"])}']
-        if card_target == 'self_card_enemy':
-            target_list = []
-            for target in enemy_target_list:
-                target_list.append(f'{target_dict["card"]} {target}')
-            return target_list
-        if card_target in target_dict:
-            return target_dict[card_target]
-        raise KeyError(f"Missing {card_target} from generate_target_string_list function")
-
+            return [(rng.choice(target_dict["hand"]),)]
+        if card_target == TargetSelector.SELF_CARD_ENEMY:
+            return [(target_dict["card"], target) for target in enemy_target_list]
+        if op.target_name in target_dict:
+            return [(target,) for target in target_dict[op.target_name]]
+        raise KeyError(f"Missing {op.target_name} from generate_target_token_list function")
+
+    @action_handler('gain_energy')
     def gain_energy(self, action: list[str]):
-        amount = int(action[0])
+        self.add_energy(int(action[0]))
+
+    def add_energy(self, amount: int):
         self.player['energy'] += amount
 
+    @action_handler('stage')
     def update_stage(self, action: list[str]):
-        new_stage = action[0]
-        enemy_stage_to_update = action[1]
+        self.set_enemy_stage(action[0], action[1])
+
+    def set_enemy_stage(self, new_stage: str, enemy_stage_to_update: str):
         enemy = self.get_enemy_by_id(enemy_stage_to_update)
         enemy['stage'] = new_stage
         if enemy[new_stage]['action_choose_type'] == 'ordered':
@@ -379,22 +466,16 @@ class Combat(Floor):
     def spawn_enemy(self, action: list[str]):
         new_enemy = action[0]
         enemy_reference = EnemyReference.get_instance()
-        enemy = enemy_reference.generate_enemy_by_id(new_enemy)
+        enemy = enemy_reference.generate_enemy_by_id(new_enemy, self.ids)
         self.enemy_list.append(enemy)
+        self.enemies_by_id[enemy['id']] = enemy
 
+    @action_handler('blockable_damage')
     def blockable_damage(self, action: list[str]):
-        damage_value = int(action[0])
-        damage_user = action[1]
-        damage_target = action[2]
+        self.blockable_damage_character(int(action[0]), action[1], action[2])
 
-        if damage_target == 'player':
-            target = self.player
-        else:
-            target = self.get_enemy_by_id(damage_target)
-        if damage_user == 'player':
-            user = self.player
-        else:
-            user = self.get_enemy_by_id(damage_user)
+    def blockable_damage_character(self, damage_value: int, damage_user: str, damage_target: str):
+        target = self.get_character(damage_target)
 
         if 'block' in target['optional_dict']:
             original_attack_value = damage_value
@@ -407,38 +488,42 @@ class Combat(Floor):
 
         self.damage_character(damage_target, damage_value)
 
+    @action_handler('damage')
     def damage(self, action: list[str]):
-        damage_value = int(action[0])
-        damager = action[1]
-        damage_target = action[2]
+        self.unblockable_damage(int(action[0]), action[1], action[2])
+
+    def unblockable_damage(self, damage_value: int, damager: str, damage_target: str):
         if damager == 'player' and damage_target == 'player':
             if 'rupture' in self.player['optional_dict'] and self.player['optional_dict']['rupture'] > 0:
-                self.take_action(f"apply strength {self.player['optional_dict']['rupture']} player player")
+                self.take_direct_action(Verb.APPLY, self.apply_option, 'strength',
+                                        self.player['optional_dict']['rupture'], 'player', 'player')
 
         self.damage_character(damage_target, damage_value)
 
+    @action_handler('add')
     def add_card(self, action: list[str]):
-        add_location = action[0]
-        add_card = action[1]
-        card_id = action[3]
+        self.add_card_to_pile(action[0], action[1], action[3])
+
+    def add_card_to_pile(self, add_location: str, add_card: str, card_id: str):
         card_reference = CardReference.get_instance()
-        card = card_reference.generate_entity_by_name(add_card)
+        card = card_reference.generate_card_instance_by_name(add_card, self.ids)
         if add_location == 'discard':
             self.player['discard_pile'].update(card)
         if add_location == 'draw':
             self.player['draw_pile'].update(card)
         if add_location == 'hand':
-            if len([key for key in self.player['hand'] if key != card_id]) > 9:
+            if len(self.player['hand']) - (card_id in self.player['hand']) > 9:
                 self.player['discard_pile'].update(card)
             else:
                 self.player['hand'].update(card)
 
+    @action_handler('put')
     def put_card(self, action: list[str]):
-        card_ids = action[3:]
-        if card_ids == ['']:
+        self.move_cards(action[0], action[1], action[3:])
+
+    def move_cards(self, source: str, destination: str, card_ids):
+        if not card_ids or list(card_ids) == ['']:
             return
-        source = action[0]
-        destination = action[1]
         temp_card_pile = {}
         for card_id in card_ids:
             if source == 'discard':
@@ -451,39 +536,43 @@ class Combat(Floor):
                 temp_card_pile[card_id] = self.player['exhaust_pile'][card_id]
                 del self.player['exhaust_pile'][card_id]
             if destination == 'draw_top':
-                self.player['top_of_deck_ids'].append(card_id)
-                self.player['draw_pile'][card_id] = temp_card_pile[card_id]
+                self.player['draw_pile'].put_on_top(card_id, temp_card_pile[card_id])
             if destination == 'exhaust':
                 if 'dark_embrace' in self.player['optional_dict']:
                     for i in range(self.player['optional_dict']['dark_embrace']):
-                        self.take_action("draw")
+                        self.take_direct_action(Verb.DRAW, self.draw_card)
                 if 'feel_no_pain' in self.player['optional_dict']:
-                    self.take_action(f"apply block {self.player['optional_dict']['feel_no_pain']} player player")
+                    self.take_direct_action(Verb.APPLY, self.apply_option, 'block',
+                                            self.player['optional_dict']['feel_no_pain'], 'player', 'player')
                 self.player['exhaust_pile'][card_id] = temp_card_pile[card_id]
             if destination == 'hand':
                 self.player['hand'][card_id] = temp_card_pile[card_id]
 
     def upgrade_card(self, action: list[str]):
-        card_ids = action[1:]
+        self.upgrade_cards_in_hand(action[1:])
+
+    def upgrade_cards_in_hand(self, card_ids):
         for card_id in card_ids:
-            first_dash_index = card_id.find('-')
-            card_name = card_id[:first_dash_index]
+            card_name = entity_name(card_id)
             card_reference = CardReference.get_instance()
-            upgraded_card = card_reference.generate_entity_by_name(f"{card_name}_plus")
+            upgraded_card = card_reference.generate_card_instance_by_name(f"{card_name}_plus", self.ids)
             self.player['hand'].update(upgraded_card)
             del self.player['hand'][card_id]
 
+    @action_handler('duplicate')
     def duplicate_card(self, action: list[str]):
-        card_id = action[1]
+        self.duplicate_card_in_hand(action[1])
+
+    def duplicate_card_in_hand(self, card_id: str):
         card = self.player['hand'][card_id]
-        self.player['hand'][f'{card["name"]}_{uuid.uuid4()}'] = card
+        self.player['hand'][self.ids.allocate(card['name'])] = card.copy()
 
     def damage_character(self, damage_target: str, damage_value: int):
         if damage_value <= 0:
             return
         if damage_target == 'player':
             self.game_state['player']['hp'] -= damage_value
-            self.take_action("apply damage_instances 1 player player")
+            self.take_direct_action(Verb.APPLY, self.apply_option, 'damage_instances', 1, 'player', 'player')
         else:
             enemy = self.get_enemy_by_id(damage_target)
             enemy['hp'] -= damage_value
@@ -495,43 +584,121 @@ class Combat(Floor):
                     enemy['current_stage_action_key'] = 0
                     self.get_new_enemy_action()
 
+    def compiled_attack(self, op: Op, user: str, targets: tuple[str, ...]):
+        self.attack_character(op.value, user, targets[0])
+
+    def compiled_apply(self, op: Op, user: str, targets: tuple[str, ...]):
+        self.apply_option(op.args[0], op.value, user, targets[0])
+
+    def compiled_draw(self, op: Op, user: str, targets: tuple[str, ...]):
+        self.draw_card(targets[0] if targets else '')
+
+    def compiled_gain_energy(self, op: Op, user: str, targets: tuple[str, ...]):
+        self.add_energy(op.value)
+
+    def compiled_stage(self, op: Op, user: str, targets: tuple[str, ...]):
+        self.set_enemy_stage(op.args[0], user)
+
+    def compiled_damage(self, op: Op, user: str, targets: tuple[str, ...]):
+        self.unblockable_damage(op.value, user, targets[0])
+
+    def compiled_blockable_damage(self, op: Op, user: str, targets: tuple[str, ...]):
+        self.blockable_damage_character(op.value, user, targets[0])
+
+    def compiled_add(self, op: Op, user: str, targets: tuple[str, ...]):
+        self.add_card_to_pile(op.args[0], op.args[1], targets[0])
+
+    def compiled_put(self, op: Op, user: str, targets: tuple[str, ...]):
+        self.move_cards(op.args[0], op.args[1], targets)
+
+    def compiled_duplicate(self, op: Op, user: str, targets: tuple[str, ...]):
+        self.duplicate_card_in_hand(targets[0])
+
+    def compiled_rampage(self, op: Op, user: str, targets: tuple[str, ...]):
+        self.rampage_attack(op.value, targets[0], targets[1])
+
+    def compiled_upgrade(self, op: Op, user: str, targets: tuple[str, ...]):
+        self.upgrade_cards_in_hand(targets)
+
+    def compiled_heal_player(self, op: Op, user: str, targets: tuple[str, ...]):
+        self.heal(op.value)
+
+    def compiled_max_hp(self, op: Op, user: str, targets: tuple[str, ...]):
+        self.increase_max_hp(op.value)
+
+    def compiled_invalid(self, op: Op, user: str, targets: tuple[str, ...]):
+        logger.info(f'Invalid action: {list(op.args) + [user] + list(targets)}')
+
+    compiled_action_handlers = {Verb.ATTACK: compiled_attack, Verb.APPLY: compiled_apply, Verb.DRAW: compiled_draw,
+                                Verb.GAIN_ENERGY: compiled_gain_energy, Verb.STAGE: compiled_stage,
+                                Verb.DAMAGE: compiled_damage, Verb.BLOCKABLE_DAMAGE: compiled_blockable_damage,
+                                Verb.ADD: compiled_add, Verb.PUT: compiled_put, Verb.DUPLICATE: compiled_duplicate,
+                                Verb.RAMPAGE: compiled_rampage, Verb.UPGRADE: compiled_upgrade,
+                                Verb.HEAL_PLAYER: compiled_heal_player, Verb.MAX_HP: compiled_max_hp,
+                                Verb.INVALID: compiled_invalid}
+
     def get_enemy_by_id(self, enemy_id: str) -> dict:
-        for enemy in self.enemy_list:
-            if enemy['id'] == enemy_id:
-                return enemy
-        return None
+        return self.enemies_by_id.get(enemy_id)
+
+    def get_character(self, character_id: str) -> dict:
+        if character_id == 'player':
+            return self.player
+        return self.enemies_by_id.get(character_id)
 
     def get_new_options(self) -> list[str]:
-        cards_in_hand = self.player['hand']
-        potions = self.player['potions']
+        return [format_option(option) for option in self.get_new_option_tuples()]
+
+    def get_new_option_tuples(self) -> list[tuple[str, ...]]:
+        """
+        The options as tuples such as ('play', card_id, enemy_id). The options of a card in hand are kept between
+        calls and only rebuilt when the card's playability or one of the target lists it uses has changed.
+        """
+        target_versions = {'enemy': tuple(self.generate_attackable_enemy_list()),
+                           'discard_pile': self.player['discard_pile'].version,
+                           'hand': self.player['hand'].version,
+                           'attack_and_powers_in_hand': self.player['hand'].version}
+        card_option_cache = {}
         options = []
-        target_dict = {'enemy': self.generate_attackable_enemy_list(),
-                       'discard_pile': self.generate_discard_pile_list(),
-                       'hand': self.generate_hand_list(),
-                       'attack_and_powers_in_hand': self.generate_filtered_hand_list('hand',
-                                                                                     [('type',
-                                                                                       ['power', 'attack'])])}
-        for card_id, card in cards_in_hand.items():
-            if self.is_card_is_playable(card):
-                target_option_list = self.generate_target_option_list(card, target_dict)
-                for target_id in target_option_list:
-                    if card_id == target_id:
-                        continue
-                    options.append(f"play {card_id} {target_id}")
-                if len(target_option_list) == 0:
-                    options.append(f'play {card_id}')
-        for potion_id, potion in potions.items():
-            target_option_list = self.generate_target_option_list(potion, target_dict)
-            for target_id in target_option_list:
-                if potion_id == target_id:
-                    continue
-                options.append(f"play_potion {potion_id} {target_id}")
-            if len(target_option_list) == 0:
-                options.append(f'play_potion {potion_id}')
-
-        options.append('end_turn')
+        for card_id, card in self.player['hand'].items():
+            option_key = (self.is_card_is_playable(card),
+                          tuple(target_versions[keyword] for keyword in card['target'] if keyword in target_versions))
+            cached_options = self.card_option_cache.get(card_id)
+            if cached_options is None or cached_options[0] != option_key or cached_options[1] is not card:
+                card_options = ()
+                if option_key[0]:
+                    card_options = self.generate_option_tuples('play', card_id, card, target_versions)
+                cached_options = (option_key, card, card_options)
+            card_option_cache[card_id] = cached_options
+            options.extend(cached_options[2])
+        self.card_option_cache = card_option_cache
+        for potion_id, potion in self.player['potions'].items():
+            options.extend(self.generate_option_tuples('play_potion', potion_id, potion, target_versions))
+        options.append(('end_turn',))
         return options
 
+    def generate_option_tuples(self, verb: str, entity_id: str, entity, target_versions: dict) -> tuple:
+        selected_lists = [self.get_option_targets(keyword, target_versions[keyword]) for keyword in entity['target']
+                          if keyword in target_versions]
+        if not all(selected_lists):
+            return ((verb, entity_id),)
+        return tuple((verb, entity_id) + targets for targets in itertools.product(*selected_lists)
+                     if targets != (entity_id,))
+
+    def get_option_targets(self, keyword: str, version) -> tuple[str, ...]:
+        cached_targets = self.option_target_cache.get(keyword)
+        if cached_targets is not None and cached_targets[0] == version:
+            return cached_targets[1]
+        if keyword == 'enemy':
+            targets = version
+        elif keyword == 'discard_pile':
+            targets = tuple(self.player['discard_pile'])
+        elif keyword == 'hand':
+            targets = tuple(self.player['hand'])
+        else:
+            targets = tuple(self.generate_filtered_hand_list('hand', [('type', ['power', 'attack'])]))
+        self.option_target_cache[keyword] = (version, targets)
+        return targets
+
     def generate_attackable_enemy_list(self) -> list[str]:
         enemy_list = []
         for enemy in self.enemy_list:
@@ -539,18 +706,6 @@ class Combat(Floor):
                 enemy_list.append(enemy['id'])
         return enemy_list
 
-    def generate_discard_pile_list(self) -> list[str]:
-        discard_list = []
-        for card in self.player['discard_pile'].items():
-            discard_list.append(card[0])
-        return discard_list
-
-    def generate_hand_list(self) -> list[str]:
-        hand_list = []
-        for card in self.player['hand'].items():
-            hand_list.append(card[0])
-        return hand_list
-
     def generate_filtered_hand_list(self, search_location: str, search_list: list) -> list[str]:
         filtered_hand_list = []
         for card in self.player[search_location].items():
@@ -559,37 +714,35 @@ class Combat(Floor):
                 filtered_hand_list.append(card[0])
         return filtered_hand_list
 
-    @staticmethod
-    def generate_target_option_list(card: dict, target_dict: dict) -> list[str]:
-        selected_lists = []
-        for keyword in card['target']:
-            if keyword in target_dict:
-                selected_lists.append(target_dict[keyword])
-        combinations = list(itertools.product(*selected_lists))
-        target_option_list = [' '.join(combination) for combination in combinations]
-        return target_option_list
-
-    def is_card_is_playable(self, card: dict) -> bool:
+    def count_attacks_in_hand(self) -> int:
+        hand_version = self.player['hand'].version
+        if self.hand_attack_count[0] != hand_version:
+            self.hand_attack_count = (hand_version, sum(1 for card in self.player['hand'].values()
+                                                        if card.get('type') == 'attack'))
+        return self.hand_attack_count[1]
+
+    def get_card_energy_cost(self, card) -> int:
+        if card['name'] == 'blood_for_blood':
+            return max(card['energy_cost'] - self.player['optional_dict'].get('damage_instances', 0), 0)
+        return card['energy_cost']
+
+    def is_card_is_playable(self, card) -> bool:
         if card['actions'] == 'unplayable':
             return False
 
         if card['name'] == 'clash':
-            count_of_attacks_in_hand = len({k: v for k, v in self.player['hand'].items()
-                                            if 'type' in v and v['type'] == 'attack'})
-            if count_of_attacks_in_hand > 1:
+            if self.count_attacks_in_hand() > 1:
                 return False
 
-        if card['name'] == 'blood_for_blood':
-            if 'damage_instances' in self.player['optional_dict']:
-                card['energy_cost'] -= self.player['optional_dict']['damage_instances']
         # if card['name'] == 'spot_weakness':
         #     all_enemy_actions = [enemy['actions'][enemy['intent']] for enemy in self.enemy_list]
         #     all_enemy_actions = list(itertools.chain.from_iterable(all_enemy_actions))
-        if card['energy_cost'] > self.player['energy']:
+        if self.get_card_energy_cost(card) > self.player['energy']:
             return False
         return True
 
-    def resolve_end_turn(self):
+    @action_handler('end_turn')
+    def resolve_end_turn(self, action: list[str] = None):
         for enemy in self.enemy_list:
             if enemy['hp'] > 0:
                 self.resolve_enemy_action(enemy, after_player_update=False)
@@ -612,14 +765,11 @@ class Combat(Floor):
 
     def resolve_enemy_action(self, enemy, after_player_update):
         enemy_action = enemy['intent']
-        intent_action_list = enemy['actions'][enemy_action]
-        keyword_list = ['apply']
-        for intent_action, intent_target in intent_action_list:
-            keyword = intent_action.split(' ')[0]
-            if (after_player_update and keyword in keyword_list) or (
-                    not after_player_update and keyword not in keyword_list):
-                self.take_action(
-                    f"{intent_action} {enemy['id']} {'player' if intent_target == 'player' else enemy['id']}")
+        intent_action_list = EnemyReference.get_instance().get_compiled_actions(enemy['name'], enemy_action)
+        for op in intent_action_list:
+            if after_player_update == (op.verb == Verb.APPLY):
+                targets = ('player',) if op.target == TargetSelector.PLAYER else (enemy['id'],)
+                self.take_compiled_action(op, enemy['id'], targets)
         if after_player_update:
             enemy['action_history'].append(enemy_action)
             self.get_new_enemy_action()
@@ -651,10 +801,7 @@ class Combat(Floor):
                     else:
                         valid_actions = current_stage_dict['action_probabilities'].copy()
 
-                    action_names, action_weights = generate_probability_list_from_probability_dict(
-                        valid_actions)
-                    random_action = random.choices(action_names, weights=action_weights)
-                    enemy['intent'] = random_action[0]
+                    enemy['intent'] = get_weighted_sampler(valid_actions).sample(self.rng.enemy_ai)
                 elif current_stage_dict['action_choose_type'] == 'ordered':
                     if 'current_stage_action_key' in enemy:
                         current_stage_action_key = enemy['current_stage_action_key']
@@ -700,17 +847,17 @@ class Combat(Floor):
                 else:
                     character['optional_dict']['strength'] = character['optional_dict']['ritual']
             if 'regen' in character['optional_dict'] and character['optional_dict']['regen'] > 0:
-                self.take_action(f"heal_player {character['optional_dict']['regen']}")
+                self.take_direct_action(Verb.HEAL_PLAYER, self.heal, character['optional_dict']['regen'])
                 character['optional_dict']['regen'] -= 1
 
     def start_turn(self):
         for i in range(5):
-            self.take_action("draw")
+            self.take_direct_action(Verb.DRAW, self.draw_card)
         if 'berserk' in self.player['optional_dict']:
             for i in range(self.player['optional_dict']['berserk']):
-                self.take_action("gain_energy 1")
+                self.take_direct_action(Verb.GAIN_ENERGY, self.add_energy, 1)
         if 'brutality' in self.player['optional_dict']:
             for i in range(self.player['optional_dict']['brutality']):
-                self.take_action("draw")
-                self.take_action("damage 1 player player")
-        self.take_action(f'gain_energy {self.player["max_energy"]}')
+                self.take_direct_action(Verb.DRAW, self.draw_card)
+                self.take_direct_action(Verb.DAMAGE, self.unblockable_damage, 1, 'player', 'player')
+        self.take_direct_action(Verb.GAIN_ENERGY, self.add_energy, self.player["max_energy"])
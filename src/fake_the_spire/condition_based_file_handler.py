@@ -5,33 +5,19 @@ import socket
 
 
 class ConditionBasedFileHandler(logging.FileHandler):
+    """
+    Server log file named after its start time. It moves to a new file only when rotate_log is called; per game
+    transcripts are written by fake_the_spire.transcripts instead.
+    """
     _file_count = 0
 
-    def __init__(self, mode='a', encoding=None, delay=False):
+    def __init__(self, mode='a', encoding=None, delay=True):
         # Set the initial log file based on current time
         _file_count = 0
         filename = self.generate_filename()
         super().__init__(filename, mode, encoding, delay)
         self.baseFilename = str(Path(filename))
 
-    def emit(self, record):
-        """
-        Overwrite the emit method to check the condition before logging.
-        """
-        logging.FileHandler.emit(self, record)
-
-        if self.check_condition(record):
-            self.rotate_log()
-
-    @staticmethod
-    def check_condition(record):
-        """
-        Define your condition here. This function should return True when the log file needs to be rotated.
-        """
-        if record.levelname == 'INFO' and 'GameOver' in record.getMessage():
-            return True
-        return False
-
     def rotate_log(self):
         # Generate a new filename and rotate to it
         self.close()  # Close the current file
@@ -42,11 +28,15 @@ class ConditionBasedFileHandler(logging.FileHandler):
         if not self.delay:
             self.stream = self._open()  # Reopen the file stream
 
+    def _open(self):
+        # The logs directory is only created once the first record is written
+        Path(self.baseFilename).parent.mkdir(exist_ok=True)
+        return super()._open()
+
     @staticmethod
     def generate_filename():
         # Generate a filename based on the current timestamp with an incrementing counter
         directory = Path(__file__).resolve().parent.parent.parent / 'logs'
-        directory.mkdir(exist_ok=True)  # Ensure the directory exists
         current_time = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
         filename = f"log_{current_time}_{ConditionBasedFileHandler._file_count}.log"
         ConditionBasedFileHandler._file_count += 1  # Increment the counter
@@ -54,12 +44,14 @@ class ConditionBasedFileHandler(logging.FileHandler):
 
 
 def setup_logging():
+    logger = logging.getLogger('flask_app')
+    if any(isinstance(handler, ConditionBasedFileHandler) for handler in logger.handlers):
+        return logger
     handler = ConditionBasedFileHandler()  # Initial log file name, will be renamed upon condition
     handler.setLevel(logging.INFO)
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     handler.setFormatter(formatter)
 
-    logger = logging.getLogger('flask_app')
     logger.addHandler(handler)
     logger.setLevel(logging.INFO)
     return logger
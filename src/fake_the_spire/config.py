@@ -2,26 +2,34 @@ import os
 from pathlib import Path
 
 
-class Config:
-    CARD_TOML = Path('../data/cards.toml')
-    if not CARD_TOML.exists():
-        CARD_TOML = Path('../../data/cards.toml')
+PACKAGE_DIR = Path(__file__).resolve().parent
+
 
-    ENEMY_TOML = Path('../data/enemies.toml')
-    if not ENEMY_TOML.exists():
-        ENEMY_TOML = Path('../../data/enemies.toml')
+def find_data_dir() -> Path:
+    """
+    The directory holding the TOML data files: $FAKE_THE_SPIRE_DATA when set, otherwise the repo's data directory or
+    the data files copied next to the package (as in the Docker image), and last the old paths relative to the CWD.
+    """
+    env_data_dir = os.environ.get('FAKE_THE_SPIRE_DATA')
+    if env_data_dir:
+        return Path(env_data_dir)
+    candidates = (PACKAGE_DIR.parent.parent / 'data', PACKAGE_DIR.parent / 'data', PACKAGE_DIR.parent,
+                  Path('../data'), Path('../../data'))
+    for candidate in candidates:
+        if (candidate / 'cards.toml').exists():
+            return candidate
+    return candidates[0]
 
-    POTION_TOML = Path('../data/potions.toml')
-    if not POTION_TOML.exists():
-        POTION_TOML = Path('../../data/potions.toml')
 
-    RELIC_TOML = Path('../data/relics.toml')
-    if not RELIC_TOML.exists():
-        RELIC_TOML = Path('../../data/relics.toml')
+class Config:
+    DATA_DIR = find_data_dir()
+    CARD_TOML = DATA_DIR / 'cards.toml'
+    ENEMY_TOML = DATA_DIR / 'enemies.toml'
+    POTION_TOML = DATA_DIR / 'potions.toml'
+    RELIC_TOML = DATA_DIR / 'relics.toml'
+    COMBAT_TOML = DATA_DIR / 'combats.toml'
 
-    COMBAT_TOML = Path('../data/combats.toml')
-    if not COMBAT_TOML.exists():
-        COMBAT_TOML = Path('../../data/combats.toml')
+    REFERENCE_BUNDLE_NAME = 'references.bundle'
 
     POTION_REWARD_CHANGE = .1
 
@@ -65,5 +73,20 @@ class Config:
     CHEST_GOLD_AMOUNT_DICT = {'small': 25, 'medium': 50, 'large': 75}
     CHEST_GOLD_VARIANCE = .1
 
+    SESSION_MAX_COUNT = 512
+    SESSION_IDLE_TIMEOUT_SECONDS = 30 * 60
+    SESSION_MAX_MEMORY_BYTES = 512 * 1024 * 1024
+
+    ASGI_MAX_CONCURRENT_STEPS = 8
+    ASGI_MAX_PENDING_REQUESTS = 256
+
+    TRANSCRIPT_BATCH_SIZE = 256
+    TRANSCRIPT_MAX_OPEN_FILES = 64
+    TRANSCRIPT_MAX_QUEUED_RECORDS = 65536
+
+    REPLAY_CHECKPOINT_INTERVAL = 100
+
+    TRAJECTORY_CHUNK_SIZE = 4096
+
 
 config = Config()
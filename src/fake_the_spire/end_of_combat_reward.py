@@ -1,8 +1,11 @@
 import logging
 import random
+from collections import Counter
 
+from fake_the_spire.entity_ids import IdAllocator, default_ids
 from fake_the_spire.floor import Floor
 from fake_the_spire.references import CardReference, PotionReference, RelicReference
+from fake_the_spire.rng import GameRandom
 
 from fake_the_spire.config import config
 
@@ -11,20 +14,31 @@ logger = logging.getLogger('flask_app')
 
 class EndOfCombatReward(Floor):
     def __init__(self, game_state: dict, combat_type: str, potion_rewards: list[str] = None,
-                 card_rewards: list[str] = None, relic_rewards: list[str] = None, card_reward_count: int = None):
-        super().__init__(game_state)
+                 card_rewards: list[str] = None, relic_rewards: list[str] = None, card_reward_count: int = None,
+                 rng: GameRandom = None, ids: IdAllocator = None,
+                 action_counts: Counter = None):
+        super().__init__(game_state, rng, ids, action_counts)
         self.floor_type = "end_of_combat_reward"
         self.rewards_dict = self.generate_base_reward_dict(combat_type, potion_rewards, card_rewards, relic_rewards,
                                                            card_reward_count)
 
+    def checkpoint_floor_state(self) -> dict:
+        return {**super().checkpoint_floor_state(), 'rewards_dict': self.rewards_dict}
+
+    def restore_checkpoint_floor_state(self, floor_state: dict):
+        super().restore_checkpoint_floor_state(floor_state)
+        self.floor_type = "end_of_combat_reward"
+        self.rewards_dict = floor_state['rewards_dict']
+
     def generate_base_reward_dict(self, combat_type: str, potion_rewards: list[str] = None,
                                   relic_rewards: list[str] = None, card_rewards: list[str] = None,
                                   card_reward_count: int = None) -> dict:
         rewards_dict = self.get_card_rewards(combat_type, card_reward_count)
-        should_get_potion = random.random() < self.game_state['environment_modifiers']['potion_reward_chance']
+        should_get_potion = self.rng.potions.random() < self.game_state['environment_modifiers']['potion_reward_chance']
 
         if should_get_potion or potion_rewards or 'white_beast_statue' in self.game_state['player']['relics']:
-            rewards_dict['potions'] = potion_rewards if potion_rewards else self.get_potion_rewards()
+            rewards_dict['potions'] = (potion_rewards if potion_rewards
+                                       else self.get_potion_rewards(self.rng.potions, self.ids))
             self.game_state['environment_modifiers']['potion_reward_chance'] -= config.POTION_REWARD_CHANGE
         else:
             self.game_state['environment_modifiers']['potion_reward_chance'] += config.POTION_REWARD_CHANGE
@@ -85,7 +99,9 @@ class EndOfCombatReward(Floor):
             card = card_reference.get_random_card_by_rarity_dict_and_modifier(
                 rarity_dict=rarity_dict,
                 rarity_dict_modifier=self.game_state['environment_modifiers']['card_reward_offset'],
-                additional_search_criteria=[('color', self.game_state['environment_modifiers']['color'])]
+                additional_search_criteria=[('color', self.game_state['environment_modifiers']['color'])],
+                rng=self.rng.card_rewards,
+                ids=self.ids
             )
             if card not in cards:
                 cards.append(card)
@@ -96,12 +112,13 @@ class EndOfCombatReward(Floor):
         return cards
 
     @staticmethod
-    def get_potion_rewards() -> list[str]:
+    def get_potion_rewards(rng=random, ids: IdAllocator = default_ids) -> list[str]:
         potion_reference = PotionReference.get_instance()
 
         potion_rewards = [
             potion_reference.get_single_entity_by_probability_dict('rarity',
-                                                                   config.POTION_RARITY_DISTRIBUTION)[0] for _ in range(1)]
+                                                                   config.POTION_RARITY_DISTRIBUTION,
+                                                                   rng=rng, ids=ids)[0] for _ in range(1)]
         return potion_rewards
 
     def get_relic_rewards(self) -> list[str]:
@@ -110,6 +127,8 @@ class EndOfCombatReward(Floor):
                                                                                config.RELIC_RARITY_DISTRIBUTION,
                                                                                exclude_list=
                                                                                self.game_state['environment_modifiers']
-                                                                               ['seen_relics'])
+                                                                               ['seen_relics'],
+                                                                               rng=self.rng.relics,
+                                                                               ids=self.ids)
         self.game_state['environment_modifiers']['seen_relics'].append(relic_reward[1]['name'])
         return [relic_reward[0]]
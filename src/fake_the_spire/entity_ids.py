@@ -0,0 +1,39 @@
+class EntityId(str):
+    """
+    The id of one card, potion, relic or enemy instance, e.g. "strike-12": the entity name and a number unique within
+    its game. It is a plain str on the wire and in option strings.
+    """
+    __slots__ = ()
+
+    @property
+    def name(self) -> str:
+        return entity_name(self)
+
+    @property
+    def number(self) -> int:
+        return int(self.rpartition('-')[2])
+
+
+def entity_name(entity_id: str) -> str:
+    name, _, number = entity_id.rpartition('-')
+    if number.isdigit():
+        return name
+    return entity_id
+
+
+class IdAllocator:
+    """
+    Hands out the instance ids of one game in increasing order.
+    """
+    __slots__ = ('next_number',)
+
+    def __init__(self, next_number: int = 1):
+        self.next_number = next_number
+
+    def allocate(self, name: str) -> EntityId:
+        number = self.next_number
+        self.next_number += 1
+        return EntityId(f"{name}-{number}")
+
+
+default_ids = IdAllocator()
@@ -1,9 +1,14 @@
+from collections import Counter
+
+from fake_the_spire.entity_ids import IdAllocator
 from fake_the_spire.floor import Floor
+from fake_the_spire.rng import GameRandom
 
 
 class Event(Floor):
-    def __init__(self, game_state: dict):
-        super().__init__(game_state)
+    def __init__(self, game_state: dict, rng: GameRandom = None, ids: IdAllocator = None,
+                 action_counts: Counter = None):
+        super().__init__(game_state, rng, ids, action_counts)
         self.floor_type = "event"
 
     def to_dict(self):
@@ -1,16 +1,113 @@
+import copy
 import logging
+from collections import Counter
+from typing import NamedTuple
 
 from fake_the_spire import FloorOver
+from fake_the_spire.entity_ids import IdAllocator, entity_name
 from fake_the_spire.references import CardReference
+from fake_the_spire.rng import GameRandom
+from fake_the_spire.state_delta import copy_state
 
 logger = logging.getLogger('flask_app')
 
 
+def action_handler(verb: str):
+    """
+    Registers the decorated method as the take_action handler for verb. Handlers receive the action words that
+    follow the verb.
+    """
+    def decorator(func):
+        func.action_verb = verb
+        return func
+    return decorator
+
+
+def format_option(option: tuple[str, ...]) -> str:
+    return ' '.join(option)
+
+
+class FloorSnapshot(NamedTuple):
+    """
+    The mutable state of a floor and of the game around it at one point in time. A snapshot is never changed after it
+    is taken, so one snapshot may be restored any number of times.
+    """
+    game_state: dict
+    rng_state: dict
+    next_id_number: int
+    floor_state: object
+
+
 class Floor:
-    def __init__(self, game_state: dict):
+    action_handlers: dict = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.action_handlers = cls.build_action_handlers()
+
+    @classmethod
+    def build_action_handlers(cls) -> dict:
+        handler_names = {}
+        for klass in reversed(cls.__mro__):
+            for name, attribute in vars(klass).items():
+                verb = getattr(attribute, 'action_verb', None)
+                if verb is not None:
+                    handler_names[verb] = name
+        return {verb: getattr(cls, name) for verb, name in handler_names.items()}
+
+    def __init__(self, game_state: dict, rng: GameRandom = None, ids: IdAllocator = None,
+                 action_counts: Counter = None):
         self.game_state = game_state
+        self.rng = rng if rng is not None else GameRandom()
+        self.ids = ids if ids is not None else IdAllocator()
+        # How often each verb and direct handler ran, shared by every floor of a game
+        self.action_counts = action_counts if action_counts is not None else Counter()
         self.can_remove_card = False
 
+    def snapshot(self) -> FloorSnapshot:
+        return FloorSnapshot(copy_state(self.game_state), self.rng.getstate(), self.ids.next_number,
+                             self.snapshot_floor_state())
+
+    def restore(self, snapshot: FloorSnapshot):
+        """
+        Puts the floor, the game state, the random streams and the id counter back to snapshot. The game state dict is
+        refilled in place, since the game and the floor share it.
+        """
+        self.game_state.clear()
+        self.game_state.update(copy_state(snapshot.game_state))
+        self.rng.setstate(snapshot.rng_state)
+        self.ids.next_number = snapshot.next_id_number
+        self.restore_floor_state(snapshot.floor_state)
+
+    def get_shared_state_memo(self) -> dict:
+        return {id(self.game_state): self.game_state, id(self.rng): self.rng, id(self.ids): self.ids,
+                id(self.action_counts): self.action_counts}
+
+    def snapshot_floor_state(self):
+        return copy.deepcopy(vars(self), self.get_shared_state_memo())
+
+    def restore_floor_state(self, floor_state):
+        vars(self).update(copy.deepcopy(floor_state, self.get_shared_state_memo()))
+
+    def checkpoint_floor_state(self) -> dict:
+        """
+        The state of the floor as plain JSON data, for replay checkpoints. Unlike snapshot_floor_state it must not
+        depend on how the floor is laid out in memory, so it stays loadable after the code changes.
+        """
+        return {'can_remove_card': self.can_remove_card}
+
+    def restore_checkpoint_floor_state(self, floor_state: dict):
+        self.can_remove_card = floor_state['can_remove_card']
+
+    @classmethod
+    def from_checkpoint(cls, game_state: dict, floor_state: dict, rng: GameRandom, ids: IdAllocator,
+                        action_counts: Counter = None) -> 'Floor':
+        # Skips the subclass __init__, which would generate a new floor and draw from rng
+        floor = cls.__new__(cls)
+        Floor.__init__(floor, game_state, rng, ids, action_counts)
+        floor.restore_checkpoint_floor_state(floor_state)
+        return floor
+
     def get_new_options(self) -> list[str]:
         options = []
         if sum(self.game_state['player']['potions'].values()) > self.game_state['player']['max_potions']:
@@ -23,38 +120,31 @@ class Floor:
                 options.append(f"remove {card}")
             return options
 
+    def get_new_option_tuples(self) -> list[tuple[str, ...]]:
+        return [tuple(option.split()) for option in self.get_new_options() or []]
+
     def to_dict(self):
         ...
 
     def take_action(self, action: str):
         action = action.split(' ')
-        if action[0] == 'end':
-            raise FloorOver
-        elif action[0] == 'cards':
-            self.take_card(action[1:])
-        elif action[0] == 'potions':
-            self.take_potion(action[1:])
-        elif action[0] == 'relics':
-            self.take_relic(action[1:])
-        elif action[0] == 'gold':
-            self.take_gold(action[1:])
-        elif action[0] == 'drop':
-            self.drop_potion(action[1:])
-        elif action[0] == 'remove':
-            self.remove_card(action[1:])
-        elif action[0] == 'heal_player':
-            self.heal_player(action[1:])
-        elif action[0] == 'max_hp':
-            self.max_hp(action[1:])
-        elif action[0] == 'upgrade':
-            self.upgrade_card(action[1:])
-        else:
+        handler = self.action_handlers.get(action[0])
+        if handler is None:
+            logger.info(f'Invalid action: {action}')
             return action
+        self.action_counts[action[0]] += 1
+        handler(self, action[1:])
+
+    @action_handler('end')
+    def end_floor(self, action: list[str]):
+        raise FloorOver
 
+    @action_handler('drop')
     def drop_potion(self, action: list[str]):
         potion = action[0]
         self.game_state['player']['potions'][potion] -= 1
 
+    @action_handler('remove')
     def remove_card(self, action: list[str]):
         card_to_remove = action[0]
         for card in self.game_state['player']['deck'].keys():
@@ -65,56 +155,63 @@ class Floor:
                     del self.game_state['player']['deck'][card]
                     break
 
+    @action_handler('relics')
     def take_relic(self, action: list[str]):
         relic = action[0]
-        first_dash_index = relic.find('-')
-        relic_name = relic[:first_dash_index]
+        relic_name = entity_name(relic)
         self.game_state['player']['relics'].append(relic_name)
         self.remove_from_current_floor('relics', relic)
 
+    @action_handler('cards')
     def take_card(self, action: list[str]):
         card = action[0]
-        first_dash_index = card.find('-')
-        card_name = card[:first_dash_index]
+        card_name = entity_name(card)
         if card_name in self.game_state['player']['deck']:
             self.game_state['player']['deck'][card_name] += 1
         else:
             self.game_state['player']['deck'][card_name] = 1
         self.remove_from_current_floor('cards', card)
 
+    @action_handler('potions')
     def take_potion(self, action: list[str]):
         potion = action[0]
-        first_dash_index = potion.find('-')
-        potion_name = potion[:first_dash_index]
+        potion_name = entity_name(potion)
         if potion_name in self.game_state['player']['potions']:
             self.game_state['player']['potions'][potion_name] += 1
         else:
             self.game_state['player']['potions'][potion_name] = 1
         self.remove_from_current_floor('potions', potion)
 
+    @action_handler('gold')
     def take_gold(self, action: list[str]):
         gold_amount = action[0]
         self.game_state['player']['gold'] += int(gold_amount)
         self.remove_from_current_floor('gold', gold_amount)
 
+    @action_handler('heal_player')
     def heal_player(self, action: list[str]):
-        heal_amount = action[0]
-        self.game_state['player']['hp'] += int(heal_amount)
+        self.heal(int(action[0]))
+
+    def heal(self, heal_amount: int):
+        self.game_state['player']['hp'] += heal_amount
         if self.game_state['player']['hp'] > self.game_state['player']['max_hp']:
             self.game_state['player']['hp'] = self.game_state['player']['max_hp']
 
+    @action_handler('max_hp')
     def max_hp(self, action: list[str]):
-        increase_amount = int(action[0])
+        self.increase_max_hp(int(action[0]))
+
+    def increase_max_hp(self, increase_amount: int):
         self.game_state['player']['max_hp'] += increase_amount
         self.game_state['player']['hp'] += increase_amount
 
+    @action_handler('upgrade')
     def upgrade_card(self, action: list[str]):
         card_ids = action[2:]
         location = action[0]
 
         for card_id in card_ids:
-            first_dash_index = card_id.find('-')
-            card_name = card_id[:first_dash_index]
+            card_name = entity_name(card_id)
             if location == 'deck':
                 upgraded_card_name = f"{card_name}_plus"
                 if upgraded_card_name in self.game_state['player']['deck']:
@@ -124,4 +221,7 @@ class Floor:
                 self.game_state['player']['deck'][card_name] -= 1
 
     def remove_from_current_floor(self, removal_type: str, removal_key: str):
-        ...
\ No newline at end of file
+        ...
+
+
+Floor.action_handlers = Floor.build_action_handlers()
@@ -1,18 +1,36 @@
-from fake_the_spire.references import EnemyReference, CardReference
 from fake_the_spire.combat import Combat
 from fake_the_spire.end_of_combat_reward import EndOfCombatReward
 from fake_the_spire import FloorOver, GameOver
 
+from fake_the_spire.action_space import build_action_mask, get_option_indices
 from fake_the_spire.config import config
+from fake_the_spire.entity_ids import IdAllocator
+from fake_the_spire.floor import Floor, FloorSnapshot, format_option
+from fake_the_spire.rng import GameRandom
 
 import logging
+from collections import Counter
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from fake_the_spire.replays import ReplayWriter
 
 logger = logging.getLogger('flask_app')
 
+GAME_CHECKPOINT_FORMAT_VERSION = 1
+# The floors Game moves through, by floor_type
+CHECKPOINT_FLOOR_CLASSES = {'combat': Combat, 'end_of_combat_reward': EndOfCombatReward}
+
+
+class GameSnapshot(NamedTuple):
+    floor: Floor
+    floor_snapshot: FloorSnapshot
+    option_tuples: tuple[tuple[str, ...], ...]
+
 
 class Game:
-    def __init__(self, character: str):
-        self.floor = None
+    def __init__(self, character: str, seed: int = None):
+        self.init_attributes(character, seed)
         self.game_state = {'floor_num': 1, 'act': 1,
                            'player': {'hp': 100, 'max_hp': 100, 'max_energy': 3,
                                       'deck': {'strike': 5, 'bash': 1, 'defend': 4},
@@ -28,38 +46,154 @@ class Game:
                                'color': 'red',
                                'seen_relics': []
                            }}
-        self.current_options = []
-        self.enemy_reference = EnemyReference(config.ENEMY_TOML, "enemies", reset=True)
-        self.card_reference = CardReference(config.CARD_TOML, "cards", reset=True)
         self.initialize_game()
 
+    def init_attributes(self, character: str, seed: int = None):
+        """
+        Everything but the game state and the floor, shared by __init__ and from_checkpoint.
+        """
+        self.character = character
+        self.rng = GameRandom(seed)
+        self.seed = self.rng.seed
+        self.ids = IdAllocator()
+        self.action_counts = Counter()
+        self.floor = None
+        self.current_option_tuples = []
+        self.current_option_strings = None
+        self.current_option_set = None
+        self.current_option_indices = None
+        self.replay_writer = None
+
     def initialize_game(self):
-        self.floor = Combat(self.game_state)
-        options = self.floor.get_new_options()
-        options = [x.strip() for x in options]
-        self.current_options = options
+        self.floor = Combat(self.game_state, rng=self.rng, ids=self.ids, action_counts=self.action_counts)
+        self.set_current_option_tuples(self.floor.get_new_option_tuples())
+
+    @property
+    def current_options(self) -> list[str]:
+        if self.current_option_strings is None:
+            self.current_option_strings = [format_option(option) for option in self.current_option_tuples]
+        return self.current_option_strings
+
+    def set_current_option_tuples(self, option_tuples: list[tuple[str, ...]]):
+        self.current_option_tuples = option_tuples
+        self.current_option_strings = None
+        self.current_option_set = None
+        self.current_option_indices = None
+
+    def get_current_option_indices(self) -> dict[int, tuple[str, ...]]:
+        if self.current_option_indices is None:
+            self.current_option_indices = get_option_indices(self.floor, self.current_option_tuples)
+        return self.current_option_indices
+
+    def action_mask(self, out=None):
+        """
+        Fixed width boolean mask over the action space in fake_the_spire.action_space, True for every index that
+        take_action_index currently accepts. Pass out to fill a preallocated array instead of allocating one.
+        """
+        return build_action_mask(self.get_current_option_indices(), out=out)
+
+    def take_action_index(self, action_index: int):
+        option = self.get_current_option_indices().get(int(action_index))
+        if option is None:
+            raise ValueError(f"Action index {action_index} is not a legal action")
+        self.action_initiate([format_option(option)])
 
     def validate_action(self, action_lst: list[str]) -> bool:
+        """
+        Whether every entry of action_lst is a current option. Anything but a non-empty list of strings, e.g. from a
+        malformed request, is invalid.
+        """
+        if not isinstance(action_lst, list) or not action_lst:
+            return False
+        if self.current_option_set is None:
+            self.current_option_set = set(self.current_options)
         for action in action_lst:
-            if action not in self.current_options:
+            if not isinstance(action, str) or action not in self.current_option_set:
                 return False
         return True
 
+    def record_replay(self, replay_file,
+                      checkpoint_interval: int = config.REPLAY_CHECKPOINT_INTERVAL) -> 'ReplayWriter':
+        """
+        Records every following action to replay_file, a path or binary file, see fake_the_spire.replays. The replay
+        is finished when the game ends, or by calling close on the returned writer.
+        """
+        # replays imports this module to rebuild games from checkpoints
+        from fake_the_spire.replays import ReplayWriter
+        self.replay_writer = ReplayWriter(replay_file, self, checkpoint_interval)
+        return self.replay_writer
+
     def action_initiate(self, action: list[str]):
-        action = action[0]
+        if self.replay_writer is None:
+            self.play_action(action[0])
+            return
+        self.replay_writer.record_action(self, action[0])
+        try:
+            self.play_action(action[0])
+        except GameOver as game_over:
+            self.replay_writer.finish(won=game_over.args[0])
+            self.replay_writer = None
+            raise
+
+    def play_action(self, action: str):
         try:
             self.floor.take_action(action)
         except FloorOver:
             self.floor = self.get_next_floor()
         if self.game_state['player']['hp'] <= 0:
             raise GameOver(won=False)
-        updated_options = [x.strip() for x in self.floor.get_new_options()]
-        self.current_options = updated_options
+        self.set_current_option_tuples(self.floor.get_new_option_tuples())
+
+    def snapshot(self) -> GameSnapshot:
+        """
+        Captures the game so restore can branch from this point any number of times, e.g. for tree search. Much
+        cheaper than copy.deepcopy of the game.
+        """
+        return GameSnapshot(self.floor, self.floor.snapshot(), tuple(self.current_option_tuples))
+
+    def restore(self, snapshot: GameSnapshot):
+        self.floor = snapshot.floor
+        self.floor.restore(snapshot.floor_snapshot)
+        self.set_current_option_tuples(list(snapshot.option_tuples))
+
+    def checkpoint(self) -> dict:
+        """
+        The game as plain JSON data: the game state, the floor's piles and enemies, the random streams and the id
+        counter. It shares objects with the live game, so serialize it before the next action.
+        """
+        return {'format': GAME_CHECKPOINT_FORMAT_VERSION, 'character': self.character, 'seed': self.seed,
+                'game_state': self.game_state, 'rng_state': self.rng.getstate(), 'next_id_number': self.ids.next_number,
+                'action_counts': self.action_counts, 'floor_type': self.floor.floor_type,
+                'floor_state': self.floor.checkpoint_floor_state(), 'option_tuples': self.current_option_tuples}
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint: dict) -> 'Game':
+        """
+        Rebuilds a game from checkpoint data, which the game takes ownership of. Raises ValueError for a checkpoint
+        of another format version or of a floor type Game does not produce.
+        """
+        if checkpoint.get('format') != GAME_CHECKPOINT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported game checkpoint format {checkpoint.get('format')}")
+        floor_class = CHECKPOINT_FLOOR_CLASSES.get(checkpoint['floor_type'])
+        if floor_class is None:
+            raise ValueError(f"Cannot restore a {checkpoint['floor_type']} floor from a checkpoint")
+        # Skips __init__, which would build and start a first combat only to throw it away
+        game = cls.__new__(cls)
+        game.init_attributes(checkpoint['character'], checkpoint['seed'])
+        game.game_state = checkpoint['game_state']
+        game.rng.setstate(checkpoint['rng_state'])
+        game.ids.next_number = checkpoint['next_id_number']
+        game.action_counts.update(checkpoint['action_counts'])
+        game.floor = floor_class.from_checkpoint(game.game_state, checkpoint['floor_state'], game.rng, game.ids,
+                                                 game.action_counts)
+        game.set_current_option_tuples([tuple(option) for option in checkpoint['option_tuples']])
+        return game
 
     def get_next_floor(self):
         if self.floor.floor_type == "combat":
             combat_type = self.floor.combat_type
-            return EndOfCombatReward(self.game_state, combat_type=combat_type, card_reward_count=3)
+            return EndOfCombatReward(self.game_state, combat_type=combat_type, card_reward_count=3, rng=self.rng,
+                                     ids=self.ids, action_counts=self.action_counts)
 
         elif self.floor.floor_type == "end_of_combat_reward":
             self.game_state['floor_num'] += 1
@@ -70,7 +204,8 @@ class Game:
                 combat_type = 'elite'
                 if self.game_state['floor_num'] == 15:
                     combat_type = 'boss'
-            return Combat(self.game_state, combat_type=combat_type)
+            return Combat(self.game_state, combat_type=combat_type, rng=self.rng, ids=self.ids,
+                          action_counts=self.action_counts)
 
     def to_dict(self):
         full_state = {'floor': self.floor.to_dict(), 'game_state': self.game_state}
@@ -1,13 +1,16 @@
-import random
 import itertools
+from collections import Counter
 
+from fake_the_spire.entity_ids import IdAllocator
 from fake_the_spire.floor import Floor
+from fake_the_spire.rng import GameRandom
 from fake_the_spire import FloorOver
 
 
 class MatchAndKeep(Floor):
-    def __init__(self, game_state):
-        super().__init__(game_state)
+    def __init__(self, game_state, rng: GameRandom = None, ids: IdAllocator = None,
+                 action_counts: Counter = None):
+        super().__init__(game_state, rng, ids, action_counts)
         self.cards = self.generate_cards()
         self.remaining_moves = 5
         self.matches = []
@@ -19,7 +22,7 @@ class MatchAndKeep(Floor):
         """
         # Replace this with your own implementation
         cards = ['A', 'B', 'C', 'D', 'E', 'F'] * 2
-        random.shuffle(cards)
+        self.rng.events.shuffle(cards)
         return cards
 
     def take_action(self, action):
@@ -0,0 +1,149 @@
+import numpy as np
+
+from fake_the_spire.action_space import MAX_ENEMY_SLOTS
+from fake_the_spire.opcodes import Verb
+from fake_the_spire.references import CardReference, EnemyReference, PotionReference, RelicReference
+
+FLOOR_TYPES = ('combat', 'end_of_combat_reward', 'shop', 'chest', 'event')
+PLAYER_STATS = ('hp', 'max_hp', 'energy', 'max_energy', 'gold', 'floor_num', 'act')
+PILE_NAMES = ('hand', 'draw_pile', 'discard_pile', 'exhaust_pile')
+
+
+def collect_buff_names() -> list[str]:
+    buff_names = {'block'}
+    for reference in (CardReference.get_instance(), PotionReference.get_instance(), EnemyReference.get_instance()):
+        for compiled_actions in reference.compiled_actions.values():
+            for ops in compiled_actions.values():
+                buff_names.update(op.args[0] for op in ops if op.verb == Verb.APPLY and op.args)
+    for enemy_dict in EnemyReference.get_instance().all_entities.values():
+        buff_names.update(enemy_dict.get('optional_dict', {}))
+    return sorted(buff_names)
+
+
+class ObservationLayout:
+    """
+    Fixed layout of an observation vector. Vocabularies of cards, enemies, intents, buffs, relics and potions come
+    from the references, and every section is a slice of the vector, see sections.
+    """
+    _instance = None
+
+    def __init__(self, card_names: list[str], enemy_names: list[str], intent_names: list[str],
+                 buff_names: list[str], relic_names: list[str], potion_names: list[str]):
+        self.card_index = {name: index for index, name in enumerate(card_names)}
+        self.enemy_index = {name: index for index, name in enumerate(enemy_names)}
+        self.intent_index = {name: index for index, name in enumerate(intent_names)}
+        self.buff_index = {name: index for index, name in enumerate(buff_names)}
+        self.relic_index = {name: index for index, name in enumerate(relic_names)}
+        self.potion_index = {name: index for index, name in enumerate(potion_names)}
+        # Each enemy slot holds alive, hp and max_hp, then the enemy name, intent and buffs.
+        self.enemy_name_offset = 3
+        self.enemy_intent_offset = self.enemy_name_offset + len(enemy_names)
+        self.enemy_buff_offset = self.enemy_intent_offset + len(intent_names)
+        self.enemy_width = self.enemy_buff_offset + len(buff_names)
+        section_sizes = [('player', len(PLAYER_STATS)), ('floor_type', len(FLOOR_TYPES)),
+                         ('player_buffs', len(buff_names)), ('deck', len(card_names))]
+        section_sizes += [(pile_name, len(card_names)) for pile_name in PILE_NAMES]
+        section_sizes += [('enemies', MAX_ENEMY_SLOTS * self.enemy_width), ('relics', len(relic_names)),
+                          ('potions', len(potion_names))]
+        self.sections = {}
+        start = 0
+        for name, size in section_sizes:
+            self.sections[name] = slice(start, start + size)
+            start += size
+        self.size = start
+
+    @staticmethod
+    def get_instance() -> 'ObservationLayout':
+        if ObservationLayout._instance is None:
+            enemy_reference = EnemyReference.get_instance()
+            intent_names = sorted({intent for enemy_dict in enemy_reference.all_entities.values()
+                                   for intent in enemy_dict['actions']})
+            ObservationLayout._instance = ObservationLayout(
+                list(CardReference.get_instance().all_entities), list(enemy_reference.all_entities), intent_names,
+                collect_buff_names(), list(RelicReference.get_instance().all_entities),
+                list(PotionReference.get_instance().all_entities))
+        return ObservationLayout._instance
+
+
+class ObservationEncoder:
+    """
+    Writes the observation of a game into buffer, a float32 vector of layout.size that may be a row of a batch
+    array. Card pile sections are only rewritten when their Pile's version changed since the last encode, so the
+    buffer must not be written to by anyone else between encodes.
+    """
+
+    def __init__(self, out: np.ndarray = None, layout: ObservationLayout = None):
+        self.layout = layout if layout is not None else ObservationLayout.get_instance()
+        self.buffer = out if out is not None else np.zeros(self.layout.size, dtype=np.float32)
+        if self.buffer.shape != (self.layout.size,):
+            raise ValueError(f"Observation buffer must have shape ({self.layout.size},), got {self.buffer.shape}")
+        self.pile_versions = dict.fromkeys(PILE_NAMES, ())
+
+    def encode(self, game) -> np.ndarray:
+        floor = game.floor
+        player_state = game.game_state['player']
+        in_combat = getattr(floor, 'floor_type', None) == 'combat'
+        self.encode_player(game.game_state, floor, in_combat)
+        self.encode_counts('deck', player_state['deck'].items(), self.layout.card_index)
+        self.encode_counts('relics', ((relic, 1) for relic in player_state['relics']), self.layout.relic_index)
+        if in_combat:
+            potion_names = (potion['name'] for potion in floor.player['potions'].values())
+            self.encode_counts('potions', ((name, 1) for name in potion_names), self.layout.potion_index)
+        else:
+            self.encode_counts('potions', player_state['potions'].items(), self.layout.potion_index)
+        for pile_name in PILE_NAMES:
+            self.encode_pile(pile_name, floor.player[pile_name] if in_combat else None)
+        self.encode_enemies(floor.enemy_list if in_combat else [])
+        return self.buffer
+
+    def encode_player(self, game_state: dict, floor, in_combat: bool):
+        player_section = self.buffer[self.layout.sections['player']]
+        player_state = game_state['player']
+        player_section[:] = (player_state['hp'], player_state['max_hp'],
+                             floor.player['energy'] if in_combat else 0, player_state['max_energy'],
+                             player_state['gold'], game_state['floor_num'], game_state['act'])
+        floor_type_section = self.buffer[self.layout.sections['floor_type']]
+        floor_type_section[:] = 0
+        floor_type = getattr(floor, 'floor_type', None)
+        if floor_type in FLOOR_TYPES:
+            floor_type_section[FLOOR_TYPES.index(floor_type)] = 1
+        self.encode_counts('player_buffs', floor.player['optional_dict'].items() if in_combat else (),
+                           self.layout.buff_index)
+
+    def encode_counts(self, section_name: str, counts, index: dict):
+        section = self.buffer[self.layout.sections[section_name]]
+        section[:] = 0
+        for name, count in counts:
+            if name in index:
+                section[index[name]] += count
+
+    def encode_pile(self, pile_name: str, pile):
+        cached_version = self.pile_versions[pile_name]
+        if pile is None:
+            if cached_version is None:
+                return
+            self.pile_versions[pile_name] = None
+            self.buffer[self.layout.sections[pile_name]] = 0
+            return
+        if cached_version and cached_version[0] is pile and cached_version[1] == pile.version:
+            return
+        self.pile_versions[pile_name] = (pile, pile.version)
+        self.encode_counts(pile_name, ((card['name'], 1) for card in pile.values()), self.layout.card_index)
+
+    def encode_enemies(self, enemy_list: list[dict]):
+        layout = self.layout
+        enemies_section = self.buffer[layout.sections['enemies']].reshape(MAX_ENEMY_SLOTS, layout.enemy_width)
+        enemies_section[:] = 0
+        for enemy_row, enemy in zip(enemies_section, enemy_list):
+            enemy_row[:layout.enemy_name_offset] = (enemy['hp'] > 0, enemy['hp'], enemy['max_hp'])
+            if enemy['name'] in layout.enemy_index:
+                enemy_row[layout.enemy_name_offset + layout.enemy_index[enemy['name']]] = 1
+            if enemy.get('intent') in layout.intent_index:
+                enemy_row[layout.enemy_intent_offset + layout.intent_index[enemy['intent']]] = 1
+            for buff_name, buff_value in enemy['optional_dict'].items():
+                if buff_name in layout.buff_index and isinstance(buff_value, (int, float)):
+                    enemy_row[layout.enemy_buff_offset + layout.buff_index[buff_name]] = buff_value
+
+
+def encode_observation(game, out: np.ndarray = None) -> np.ndarray:
+    return ObservationEncoder(out).encode(game)
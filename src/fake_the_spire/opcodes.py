@@ -0,0 +1,79 @@
+from enum import IntEnum
+from typing import NamedTuple
+
+
+class Verb(IntEnum):
+    INVALID = 0
+    ATTACK = 1
+    APPLY = 2
+    DRAW = 3
+    GAIN_ENERGY = 4
+    STAGE = 5
+    DAMAGE = 6
+    BLOCKABLE_DAMAGE = 7
+    ADD = 8
+    PUT = 9
+    DUPLICATE = 10
+    RAMPAGE = 11
+    UPGRADE = 12
+    HEAL_PLAYER = 13
+    MAX_HP = 14
+
+    @property
+    def word(self) -> str:
+        return self.name.lower()
+
+
+class TargetSelector(IntEnum):
+    UNKNOWN = 0
+    SELF = 1
+    PLAYER = 2
+    ENEMY = 3
+    RANDOM_ENEMY = 4
+    HAND = 5
+    DISCARD_PILE = 6
+    SELF_CARD = 7
+    RANDOM_HAND = 8
+    SELF_CARD_ENEMY = 9
+    HAND_NON_ATTACK = 10
+    EXHAUST = 11
+
+    @property
+    def word(self) -> str:
+        return self.name.lower()
+
+
+VERB_BY_WORD = {verb.word: verb for verb in Verb if verb != Verb.INVALID}
+TARGET_SELECTOR_BY_WORD = {selector.word: selector for selector in TargetSelector
+                           if selector != TargetSelector.UNKNOWN}
+
+
+class Op(NamedTuple):
+    """
+    A single pre-parsed entry of a card, potion or enemy action list, e.g. ["apply block 5", "self"] becomes
+    Op(Verb.APPLY, 5, ('block',), TargetSelector.SELF, 'self').
+    """
+    verb: Verb
+    value: int = 0
+    args: tuple[str, ...] = ()
+    target: TargetSelector = TargetSelector.SELF
+    target_name: str = 'self'
+
+
+def compile_action(action: str, target: str) -> Op:
+    words = action.split(' ')
+    verb = VERB_BY_WORD.get(words[0], Verb.INVALID)
+    if verb == Verb.INVALID:
+        return Op(verb, 0, tuple(words), TargetSelector.UNKNOWN, target)
+    value = 0
+    args = []
+    for word in words[1:]:
+        if word.lstrip('-').isdigit():
+            value = int(word)
+        else:
+            args.append(word)
+    return Op(verb, value, tuple(args), TARGET_SELECTOR_BY_WORD.get(target, TargetSelector.UNKNOWN), target)
+
+
+def compile_action_list(action_list: list) -> tuple[Op, ...]:
+    return tuple(compile_action(action, target) for action, target in action_list)
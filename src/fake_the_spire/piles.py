@@ -0,0 +1,104 @@
+import random
+from collections.abc import MutableMapping
+
+
+class Pile(MutableMapping):
+    """
+    A pile of cards keyed by card id. Cards are kept in a dense list with an id -> slot index, and a removed card's
+    slot is filled by the last card, so adding, removing and drawing a random card are all O(1). Cards put on top of
+    the pile are remembered in order and drawn before any random draw. version changes whenever the pile does.
+    """
+    __slots__ = ('card_ids', 'cards', 'slots', 'top_ids', 'version')
+
+    def __init__(self, cards: dict = None):
+        self.card_ids = []
+        self.cards = []
+        self.slots = {}
+        self.top_ids = []
+        self.version = 0
+        if cards:
+            self.update(cards)
+
+    def __getitem__(self, card_id: str):
+        return self.cards[self.slots[card_id]]
+
+    def __setitem__(self, card_id: str, card):
+        self.version += 1
+        slot = self.slots.get(card_id)
+        if slot is not None:
+            self.cards[slot] = card
+            return
+        self.slots[card_id] = len(self.card_ids)
+        self.card_ids.append(card_id)
+        self.cards.append(card)
+
+    def __delitem__(self, card_id: str):
+        slot = self.slots.pop(card_id)
+        self.version += 1
+        last_card_id = self.card_ids.pop()
+        last_card = self.cards.pop()
+        if last_card_id != card_id:
+            self.card_ids[slot] = last_card_id
+            self.cards[slot] = last_card
+            self.slots[last_card_id] = slot
+        if self.top_ids and card_id in self.top_ids:
+            self.top_ids.remove(card_id)
+
+    def __contains__(self, card_id) -> bool:
+        return card_id in self.slots
+
+    def __iter__(self):
+        return iter(self.card_ids)
+
+    def __len__(self) -> int:
+        return len(self.card_ids)
+
+    def __repr__(self) -> str:
+        return f"Pile({dict(self.items())!r})"
+
+    def copy(self) -> 'Pile':
+        pile = Pile()
+        pile.card_ids = list(self.card_ids)
+        pile.cards = list(self.cards)
+        pile.slots = dict(self.slots)
+        pile.top_ids = list(self.top_ids)
+        pile.version = self.version
+        return pile
+
+    def put_on_top(self, card_id: str, card):
+        self[card_id] = card
+        self.version += 1
+        if card_id in self.top_ids:
+            self.top_ids.remove(card_id)
+        self.top_ids.append(card_id)
+
+    def peek_next_id(self, rng=random) -> str:
+        """
+        The id of the card the next draw takes: the latest card put on top, otherwise a random card.
+        """
+        if self.top_ids:
+            return self.top_ids[-1]
+        return self.card_ids[rng.randrange(len(self.card_ids))]
+
+    def shuffle_in(self, other: 'Pile'):
+        """
+        Moves every card of other into this pile and empties other, e.g. the discard pile into an empty draw pile.
+        """
+        if not self.card_ids:
+            self.card_ids, other.card_ids = other.card_ids, []
+            self.cards, other.cards = other.cards, []
+            self.slots, other.slots = other.slots, {}
+            other.top_ids = []
+            self.version += 1
+            other.version += 1
+            return
+        for card_id, card in zip(other.card_ids, other.cards):
+            self[card_id] = card
+        other.clear()
+
+    def clear(self):
+        self.card_ids = []
+        self.cards = []
+        self.slots = {}
+        self.top_ids = []
+        self.version += 1
@@ -0,0 +1,197 @@
+import argparse
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from pathlib import Path
+
+from fake_the_spire.config import config
+
+logger = logging.getLogger('flask_app')
+
+BUNDLE_FORMAT_VERSION = 1
+
+REFERENCE_DATA_REQUIRED_KEYS = {
+    'cards': ('type', 'target', 'actions', 'rarity', 'color'),
+    'enemies': ('max_hp', 'stage_start_combat', 'actions'),
+    'potions': ('color', 'target', 'actions'),
+    'relics': ('rarity', 'color'),
+    'combats': ('act', 'combat_type', 'enemies', 'weight'),
+}
+
+loaded_reference_data: dict[Path, dict] = {}
+loaded_reference_data_lock = threading.Lock()
+
+
+def get_reference_toml_paths() -> tuple[Path, ...]:
+    return config.CARD_TOML, config.ENEMY_TOML, config.POTION_TOML, config.RELIC_TOML, config.COMBAT_TOML
+
+
+def get_bundle_path() -> Path:
+    return config.CARD_TOML.parent / config.REFERENCE_BUNDLE_NAME
+
+
+def hash_file(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def get_source_stamp(path: Path) -> tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def validate_reference_data(all_data: dict[str, dict]) -> list[str]:
+    """
+    Checks every entity of every data file for the keys the engine reads and raises ValueError listing every missing
+    one. Combats naming enemies that do not exist only fail once drawn, so they are returned as warnings instead.
+    """
+    problems = []
+    for entity_name, required_keys in REFERENCE_DATA_REQUIRED_KEYS.items():
+        entities = all_data.get(entity_name)
+        if not isinstance(entities, dict):
+            problems.append(f"Missing [{entity_name}] table")
+            continue
+        for name, entity_dict in entities.items():
+            if not isinstance(entity_dict, dict):
+                problems.append(f"{entity_name}.{name} is not a table")
+                continue
+            problems.extend(f"{entity_name}.{name} has no {key}" for key in required_keys if key not in entity_dict)
+    if problems:
+        raise ValueError('Invalid reference data:\n' + '\n'.join(problems))
+    enemies = all_data['enemies']
+    return [f"combats.{name} names unknown enemy {enemy}" for name, combat_dict in all_data['combats'].items()
+            for enemy in combat_dict['enemies'] if enemy not in enemies]
+
+
+def to_plain_data(data):
+    """
+    Replaces the dict subclasses the toml package uses for inline tables with plain dicts, which can be pickled.
+    """
+    if isinstance(data, dict):
+        return {key: to_plain_data(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [to_plain_data(value) for value in data]
+    return data
+
+
+def load_toml(path: Path) -> dict:
+    # Only needed to rebuild the bundle, so processes that read the bundle never import toml.
+    import toml
+    return to_plain_data(toml.load(path))
+
+
+def parse_reference_tomls(paths: tuple[Path, ...]) -> dict[Path, dict]:
+    parsed_data = {path: load_toml(path) for path in paths}
+    all_data = {}
+    for data in parsed_data.values():
+        all_data.update(data)
+    for warning in validate_reference_data(all_data):
+        logger.warning(f'Reference data: {warning}')
+    return parsed_data
+
+
+def build_reference_bundle(paths: tuple[Path, ...] = None, bundle_path: Path = None) -> dict[Path, dict]:
+    """
+    Parses and validates the data files and writes them to a single pickled bundle together with the mtime, size and
+    hash of every source, so later processes can skip TOML parsing.
+    """
+    paths = paths if paths is not None else get_reference_toml_paths()
+    bundle_path = bundle_path if bundle_path is not None else get_bundle_path()
+    parsed_data = parse_reference_tomls(paths)
+    bundle = {'format': BUNDLE_FORMAT_VERSION,
+              'sources': {str(path): (get_source_stamp(path), hash_file(path)) for path in paths},
+              'data': {str(path): data for path, data in parsed_data.items()}}
+    write_reference_bundle(bundle, bundle_path)
+    return parsed_data
+
+
+def write_reference_bundle(bundle: dict, bundle_path: Path):
+    temporary_path = bundle_path.with_name(f'{bundle_path.name}.{os.getpid()}.tmp')
+    try:
+        with open(temporary_path, 'wb') as bundle_file:
+            pickle.dump(bundle, bundle_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, bundle_path)
+    finally:
+        temporary_path.unlink(missing_ok=True)
+
+
+def read_reference_bundle(paths: tuple[Path, ...], bundle_path: Path) -> dict[Path, dict] | None:
+    """
+    Returns the bundled data, or None when the bundle is missing, unreadable, incomplete or older than any of its
+    sources. A source whose mtime or size changed still counts as current if its hash is unchanged, and its new stamp
+    is written back so later processes do not hash it again.
+    """
+    try:
+        with open(bundle_path, 'rb') as bundle_file:
+            bundle = pickle.load(bundle_file)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if not isinstance(bundle, dict) or bundle.get('format') != BUNDLE_FORMAT_VERSION:
+        return None
+    sources = bundle.get('sources')
+    data = bundle.get('data')
+    if not isinstance(sources, dict) or not isinstance(data, dict):
+        return None
+    refreshed_stamp = False
+    for path in paths:
+        source = sources.get(str(path))
+        if source is None or str(path) not in data:
+            return None
+        stamp, file_hash = source
+        current_stamp = get_source_stamp(path)
+        if tuple(stamp) != current_stamp:
+            if hash_file(path) != file_hash:
+                return None
+            sources[str(path)] = (current_stamp, file_hash)
+            refreshed_stamp = True
+    if refreshed_stamp:
+        try:
+            write_reference_bundle(bundle, bundle_path)
+        except OSError as error:
+            logger.info(f'Could not refresh reference bundle {bundle_path}: {error!r}')
+    return {path: data[str(path)] for path in paths}
+
+
+def load_reference_bundle(paths: tuple[Path, ...] = None, bundle_path: Path = None) -> dict[Path, dict]:
+    paths = paths if paths is not None else get_reference_toml_paths()
+    bundle_path = bundle_path if bundle_path is not None else get_bundle_path()
+    parsed_data = read_reference_bundle(paths, bundle_path)
+    if parsed_data is not None:
+        return parsed_data
+    try:
+        return build_reference_bundle(paths, bundle_path)
+    except OSError as error:
+        logger.info(f'Could not write reference bundle {bundle_path}: {error!r}')
+        return parse_reference_tomls(paths)
+
+
+def load_reference_data(path: Path) -> dict:
+    """
+    The parsed contents of a data file, loaded from the bundle once per process. Callers must treat it as read-only,
+    since every reference and game in the process shares it.
+    """
+    if path not in loaded_reference_data:
+        with loaded_reference_data_lock:
+            if path not in loaded_reference_data:
+                paths = get_reference_toml_paths()
+                if path in paths:
+                    loaded_reference_data.update(load_reference_bundle(paths))
+                else:
+                    loaded_reference_data[path] = load_toml(path)
+    return loaded_reference_data[path]
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Validate the data files and rebuild the reference bundle.")
+    parser.add_argument('--output', type=Path, default=None, help="bundle path, next to the data files by default")
+    args = parser.parse_args(argv)
+    bundle_path = args.output if args.output is not None else get_bundle_path()
+    parsed_data = build_reference_bundle(bundle_path=bundle_path)
+    entity_counts = ', '.join(f'{len(entities)} {entity_name}' for data in parsed_data.values()
+                              for entity_name, entities in data.items())
+    print(f"{entity_counts} -> {bundle_path}")
+
+
+if __name__ == '__main__':
+    main()
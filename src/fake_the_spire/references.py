@@ -1,8 +1,13 @@
-import toml
 import random
-import uuid
+import bisect
+import itertools
+import functools
 from pathlib import Path
+from types import MappingProxyType
 from fake_the_spire.config import config
+from fake_the_spire.entity_ids import IdAllocator, default_ids
+from fake_the_spire.opcodes import Op, compile_action_list
+from fake_the_spire.reference_bundle import load_reference_data
 
 
 def generate_probability_list_from_probability_dict(probability_dict: dict) -> (list, list):
@@ -14,50 +19,127 @@ def generate_probability_list_from_probability_dict(probability_dict: dict) -> (
     return names, weights
 
 
+class WeightedSampler:
+    """
+    Draws names from a fixed weight distribution. Cumulative weights are computed once, and each draw is one
+    random() call plus a bisect, exactly like random.choices with the same weights.
+    """
+    __slots__ = ('names', 'cumulative_weights', 'total')
+
+    def __init__(self, names: list, weights: list):
+        self.names = tuple(names)
+        self.cumulative_weights = tuple(itertools.accumulate(weights))
+        self.total = self.cumulative_weights[-1] if self.cumulative_weights else 0.
+        if self.total <= 0.:
+            raise ValueError('Total of weights must be greater than zero')
+
+    def sample(self, rng=random):
+        return self.names[bisect.bisect(self.cumulative_weights, rng.random() * self.total, 0,
+                                        len(self.cumulative_weights) - 1)]
+
+
+@functools.lru_cache(maxsize=512)
+def get_cached_sampler(distribution_items: tuple) -> WeightedSampler:
+    return WeightedSampler(*generate_probability_list_from_probability_dict(dict(distribution_items)))
+
+
+def get_weighted_sampler(probability_dict: dict) -> WeightedSampler:
+    return get_cached_sampler(tuple(probability_dict.items()))
+
+
 class BaseReference:
     _instance = None
+    compiled_action_keywords: tuple[str, ...] = ()
+    indexed_keywords: tuple[str, ...] = ('rarity', 'color', 'type')
 
-    def __init__(self, entity_toml: Path, entity_name: str, reset: bool = False):
-        if BaseReference._instance is not None:
-            if reset:
-                BaseReference._instance.all_entities = toml.load(entity_toml)
-            else:
-                raise Exception("This class is a singleton!")
-        self.all_entities = toml.load(entity_toml)[entity_name]
-
-    def get_all_entities_by_search_list(self, search_list: list, exclude_list: list[str] = None) -> list:
-        entities = []
-        for (entity_name, entity_dict) in self.all_entities.items():
-            if exclude_list:
-                if entity_name in exclude_list:
-                    continue
-            if all(search_keyword in entity_dict and entity_dict[search_keyword] in search_value
-                   for (search_keyword, search_value) in search_list):
-                entity_dict['name'] = entity_name
-                entities.append((f"{entity_name}-{uuid.uuid4()}", entity_dict))
-        return entities
+    def __init__(self, entity_toml: Path, entity_name: str):
+        self.all_entities = load_reference_data(entity_toml)[entity_name]
+        for name, entity_dict in self.all_entities.items():
+            entity_dict['name'] = name
+        self.compiled_actions = {name: self.compile_entity_actions(entity_dict)
+                                 for name, entity_dict in self.all_entities.items()}
+        self.entity_index = self.build_entity_index()
+        self.query_cache = {}
+
+    def compile_entity_actions(self, entity_dict: dict) -> dict[str, tuple[Op, ...]]:
+        return {keyword: compile_action_list(entity_dict[keyword]) for keyword in self.compiled_action_keywords
+                if isinstance(entity_dict.get(keyword), list)}
+
+    def get_compiled_actions(self, name: str, action_keyword: str) -> tuple[Op, ...]:
+        return self.compiled_actions[name][action_keyword]
+
+    def build_entity_index(self) -> dict[str, dict[str, set[str]]]:
+        entity_index = {keyword: {} for keyword in self.indexed_keywords}
+        for name, entity_dict in self.all_entities.items():
+            for keyword in self.indexed_keywords:
+                value = entity_dict.get(keyword)
+                if isinstance(value, str):
+                    entity_index[keyword].setdefault(value, set()).add(name)
+        return entity_index
+
+    def query_entity_names(self, search_list: list, exclude_list: list[str] = None) -> tuple[str, ...]:
+        """
+        Returns the names of every entity matching all (keyword, values) pairs in search_list, in reference order.
+        values may be a single value or a collection of accepted values. Results are cached per search, so callers
+        should mint instances only for the entities they actually pick.
+        """
+        search_key = tuple(sorted((keyword, frozenset([values] if isinstance(values, str) else values))
+                                  for keyword, values in search_list))
+        names = self.query_cache.get(search_key)
+        if names is None:
+            names = self.search_entity_names(search_key)
+            self.query_cache[search_key] = names
+        if exclude_list:
+            return tuple(name for name in names if name not in exclude_list)
+        return names
+
+    def search_entity_names(self, search_key: tuple) -> tuple[str, ...]:
+        candidates = None
+        unindexed_search = []
+        for keyword, values in search_key:
+            if keyword not in self.entity_index:
+                unindexed_search.append((keyword, values))
+                continue
+            matches = set()
+            for value in values:
+                matches |= self.entity_index[keyword].get(value, set())
+            candidates = matches if candidates is None else candidates & matches
+        names = []
+        for name, entity_dict in self.all_entities.items():
+            if candidates is not None and name not in candidates:
+                continue
+            if all(keyword in entity_dict and entity_dict[keyword] in values for keyword, values in unindexed_search):
+                names.append(name)
+        return tuple(names)
+
+    def mint_entity(self, name: str, ids: IdAllocator = default_ids) -> tuple[str, dict]:
+        return ids.allocate(name), self.all_entities[name]
+
+    def get_all_entities_by_search_list(self, search_list: list, exclude_list: list[str] = None,
+                                        ids: IdAllocator = default_ids) -> list:
+        return [self.mint_entity(name, ids) for name in self.query_entity_names(search_list, exclude_list)]
 
     def get_single_entity_by_probability_dict(self, probability_keyword: str, probability_dict: dict,
-                                              exclude_list: list[str] = None) -> tuple:
-        names, weights = generate_probability_list_from_probability_dict(probability_dict)
-        choice = random.choices(names, weights=weights)
-        potential_entities = self.get_all_entities_by_search_list([(probability_keyword, choice)], exclude_list)
-        if len(potential_entities) == 0:
+                                              exclude_list: list[str] = None, rng=random,
+                                              ids: IdAllocator = default_ids) -> tuple:
+        choice = get_weighted_sampler(probability_dict).sample(rng)
+        potential_names = self.query_entity_names([(probability_keyword, choice)], exclude_list)
+        if len(potential_names) == 0:
             return 'poop', {'name': 'poop', 'rarity': 'base'}
-        return random.choice(potential_entities)
+        return self.mint_entity(rng.choice(potential_names), ids)
 
-    def generate_entity_dict_from_init_dict(self, init_dict: dict) -> dict:
+    def generate_entity_dict_from_init_dict(self, init_dict: dict, ids: IdAllocator = default_ids) -> dict:
         entities = {}
         for key, value in init_dict.items():
             for i in range(value):
-                entities.update(self.generate_entity_by_name(key))
+                entities.update(self.generate_entity_by_name(key, ids))
         return entities
 
-    def generate_entity_by_name(self, name: str) -> dict:
+    def generate_entity_by_name(self, name: str, ids: IdAllocator = default_ids) -> dict:
         entity_dict = {}
         entity_instance = self.all_entities[name].copy()
         entity_instance['name'] = name
-        entity_dict[f'{name}-{uuid.uuid4()}'] = entity_instance
+        entity_dict[ids.allocate(name)] = entity_instance
         return entity_dict
 
 
@@ -68,9 +150,13 @@ class EnemyReference(BaseReference):
             EnemyReference._instance = EnemyReference(config.ENEMY_TOML, 'enemies')
         return EnemyReference._instance
 
-    def generate_enemy_by_id(self, enemy_id: str) -> dict:
+    def compile_entity_actions(self, entity_dict: dict) -> dict[str, tuple[Op, ...]]:
+        return {intent: compile_action_list(action_list) for intent, action_list in entity_dict['actions'].items()}
+
+    def generate_enemy_by_id(self, enemy_id: str, ids: IdAllocator = default_ids) -> dict:
         enemy_copy = self.all_entities[enemy_id].copy()
-        enemy_copy['id'] = f"{enemy_id}-{uuid.uuid4()}"
+        enemy_copy['id'] = ids.allocate(enemy_id)
+        enemy_copy['name'] = enemy_id
         enemy_copy['hp'] = enemy_copy['max_hp']
         if 'optional_dict' not in enemy_copy:
             enemy_copy['optional_dict'] = {}
@@ -78,26 +164,98 @@ class EnemyReference(BaseReference):
         enemy_copy['stage'] = enemy_copy['stage_start_combat']
         return enemy_copy
 
-    def generate_enemies_by_id_list(self, id_list: list[str]) -> list[dict]:
+    def generate_enemies_by_id_list(self, id_list: list[str], ids: IdAllocator = default_ids) -> list[dict]:
         all_enemies = []
         for enemy_id in id_list:
-            enemy_copy = self.generate_enemy_by_id(enemy_id)
+            enemy_copy = self.generate_enemy_by_id(enemy_id, ids)
             all_enemies.append(enemy_copy)
         return all_enemies
 
 
+class CardInstance:
+    """
+    A card in a combat pile. The card's template from CardReference is shared by every copy of the card, and only
+    the fields a card changes for itself, e.g. energy_cost lowered by blood_for_blood, live on the instance. Supports
+    the card dict reads and writes combat uses, and to_dict for the API.
+    """
+    __slots__ = ('template', 'overrides')
+
+    def __init__(self, template: MappingProxyType, overrides: dict = None):
+        self.template = template
+        self.overrides = overrides
+
+    def __getitem__(self, key: str):
+        if self.overrides is not None and key in self.overrides:
+            return self.overrides[key]
+        return self.template[key]
+
+    def __setitem__(self, key: str, value):
+        if self.overrides is None:
+            self.overrides = {}
+        self.overrides[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.template or (self.overrides is not None and key in self.overrides)
+
+    def __repr__(self) -> str:
+        return f"CardInstance({self.to_dict()!r})"
+
+    def get(self, key: str, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    @property
+    def upgraded(self) -> bool:
+        return self.template['name'].endswith('_plus')
+
+    def copy(self) -> 'CardInstance':
+        return CardInstance(self.template, dict(self.overrides) if self.overrides else None)
+
+    def to_dict(self) -> dict:
+        if not self.overrides:
+            return dict(self.template)
+        return {**self.template, **self.overrides}
+
+
+def get_card_instance(name: str, overrides: dict = None) -> CardInstance:
+    """
+    Rebuilds a card from its name and overrides around the shared template of this process, e.g. from a replay
+    checkpoint.
+    """
+    return CardInstance(CardReference.get_instance().card_templates[name], overrides)
+
+
 class CardReference(BaseReference):
+    compiled_action_keywords = ('actions', 'end_of_turn')
+
+    def __init__(self, entity_toml: Path, entity_name: str):
+        super().__init__(entity_toml, entity_name)
+        self.card_templates = {name: MappingProxyType(entity_dict) for name, entity_dict in self.all_entities.items()}
+
     @staticmethod
     def get_instance():
         if CardReference._instance is None:
             CardReference._instance = CardReference(config.CARD_TOML, 'cards')
         return CardReference._instance
 
-    def get_random_card(self) -> list[str]:
-        return random.choice(list(self.all_entities.items()))
+    def generate_card_instance_dict_from_init_dict(self, init_dict: dict,
+                                                   ids: IdAllocator = default_ids) -> dict[str, CardInstance]:
+        card_instances = {}
+        for name, count in init_dict.items():
+            for i in range(count):
+                card_instances.update(self.generate_card_instance_by_name(name, ids))
+        return card_instances
+
+    def generate_card_instance_by_name(self, name: str, ids: IdAllocator = default_ids) -> dict[str, CardInstance]:
+        return {ids.allocate(name): CardInstance(self.card_templates[name])}
+
+    def get_random_card(self, rng=random) -> list[str]:
+        return rng.choice(list(self.all_entities.items()))
 
     def get_random_card_by_rarity_dict_and_modifier(self, rarity_dict: dict, rarity_dict_modifier: int,
-                                                    additional_search_criteria: list = None) -> dict:
+                                                    additional_search_criteria: list = None, rng=random,
+                                                    ids: IdAllocator = default_ids) -> dict:
         rarity_dict_pct_modifier = rarity_dict_modifier / 100
         rarity_dict_copy = rarity_dict.copy()
         if rarity_dict_copy['rare'] < 1.:
@@ -106,27 +264,25 @@ class CardReference(BaseReference):
             if rarity_dict_copy['rare'] < 0:
                 rarity_dict_copy['uncommon'] += rarity_dict_copy['rare']
                 rarity_dict_copy['rare'] = 0.
-        potential_entities = []
-        while len(potential_entities) == 0:
-            names, weights = generate_probability_list_from_probability_dict(rarity_dict_copy)
-            choice = random.choices(names, weights=weights)[0]
-            search_list = [('rarity', choice)]
-            if additional_search_criteria is not None:
-                search_list.extend(additional_search_criteria)
-            potential_entities = self.get_all_entities_by_search_list(search_list)
-            del rarity_dict_copy[choice]
-        return random.choice(potential_entities)
+        search_list = list(additional_search_criteria) if additional_search_criteria is not None else []
+        available_rarity_dict = {rarity: probability for rarity, probability in rarity_dict_copy.items()
+                                 if self.query_entity_names([('rarity', rarity)] + search_list)}
+        choice = get_weighted_sampler(available_rarity_dict).sample(rng)
+        potential_names = self.query_entity_names([('rarity', choice)] + search_list)
+        return self.mint_entity(rng.choice(potential_names), ids)
 
 
 class PotionReference(BaseReference):
+    compiled_action_keywords = ('actions',)
+
     @staticmethod
     def get_instance():
         if PotionReference._instance is None:
             PotionReference._instance = PotionReference(config.POTION_TOML, 'potions')
         return PotionReference._instance
 
-    def get_random_potion(self) -> list[str]:
-        return random.choice(list(self.all_entities.items()))
+    def get_random_potion(self, rng=random) -> list[str]:
+        return rng.choice(list(self.all_entities.items()))
 
 
 class RelicReference(BaseReference):
@@ -136,8 +292,8 @@ class RelicReference(BaseReference):
             RelicReference._instance = RelicReference(config.RELIC_TOML, 'relics')
         return RelicReference._instance
 
-    def get_random_relic(self) -> list[str]:
-        return random.choice(list(self.all_entities.items()))
+    def get_random_relic(self, rng=random) -> list[str]:
+        return rng.choice(list(self.all_entities.items()))
 
 
 class CombatReference(BaseReference):
@@ -148,13 +304,23 @@ class CombatReference(BaseReference):
             CombatReference._instance = CombatReference(config.COMBAT_TOML, 'combats')
         return CombatReference._instance
 
-    def generate_enemies_by_combat_type_and_act(self, act: str, combat_type: str) -> list[str]:
-        valid_combats = []
-        weights = []
-        for combat in self.all_entities.values():
-            if combat['combat_type'] == combat_type and combat['act'] == act:
-                valid_combats.append(combat['enemies'])
-                weights.append(combat['weight'])
+    def __init__(self, entity_toml: Path, entity_name: str):
+        super().__init__(entity_toml, entity_name)
+        self.combat_samplers = {}
+
+    def generate_enemies_by_combat_type_and_act(self, act: str, combat_type: str, rng=random) -> list[str]:
+        sampler_key = (act, combat_type)
+        if sampler_key not in self.combat_samplers:
+            self.combat_samplers[sampler_key] = get_weighted_sampler(
+                {name: combat['weight'] for name, combat in self.all_entities.items()
+                 if combat['combat_type'] == combat_type and combat['act'] == act})
+        combat_name = self.combat_samplers[sampler_key].sample(rng)
+        return self.all_entities[combat_name]['enemies']
+
 
-        combat = random.choices(valid_combats, weights=weights)[0]
-        return combat
+def load_all_references():
+    """
+    Loads every reference singleton up front, e.g. before forking worker processes so they share the parsed data.
+    """
+    for reference in (CardReference, EnemyReference, PotionReference, RelicReference, CombatReference):
+        reference.get_instance()
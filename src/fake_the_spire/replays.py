@@ -0,0 +1,181 @@
+import json
+import logging
+import struct
+import zlib
+from pathlib import Path
+from typing import BinaryIO, NamedTuple
+
+from fake_the_spire import GameOver
+from fake_the_spire.config import config
+from fake_the_spire.game import Game
+
+logger = logging.getLogger('flask_app')
+
+REPLAY_MAGIC = b'FTSREPL1'
+FRAME_HEADER = struct.Struct('<BI')
+
+HEADER_FRAME = 1
+ACTIONS_FRAME = 2
+CHECKPOINT_FRAME = 3
+END_FRAME = 4
+
+
+def write_frame(replay_file: BinaryIO, frame_type: int, payload: bytes):
+    compressed_payload = zlib.compress(payload)
+    replay_file.write(FRAME_HEADER.pack(frame_type, len(compressed_payload)))
+    replay_file.write(compressed_payload)
+
+
+def encode_json(data) -> bytes:
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+class ReplayWriter:
+    """
+    Records a game as a replay file: a header with the seed, the actions in chunks, and a checkpoint of the game, see
+    Game.checkpoint, when recording starts and every checkpoint_interval steps after, each in its own length-prefixed
+    zlib frame of JSON. The checkpoint of a step is the game just before that step's action; actions are buffered and
+    written as one frame per checkpoint interval.
+    """
+
+    def __init__(self, replay_file: BinaryIO | str | Path, game: Game,
+                 checkpoint_interval: int = config.REPLAY_CHECKPOINT_INTERVAL):
+        self.owns_file = not hasattr(replay_file, 'write')
+        self.replay_file = open(replay_file, 'wb') if self.owns_file else replay_file
+        self.checkpoint_interval = checkpoint_interval
+        self.step = 0
+        self.pending_actions = []
+        self.replay_file.write(REPLAY_MAGIC)
+        write_frame(self.replay_file, HEADER_FRAME, encode_json({'seed': game.seed, 'character': game.character,
+                                                                 'checkpoint_interval': checkpoint_interval}))
+        self.write_checkpoint(game)
+
+    def record_action(self, game: Game, action: str):
+        if self.step > 0 and self.step % self.checkpoint_interval == 0:
+            self.write_actions()
+            self.write_checkpoint(game)
+        self.pending_actions.append(action)
+        self.step += 1
+
+    def write_checkpoint(self, game: Game):
+        write_frame(self.replay_file, CHECKPOINT_FRAME, encode_json(game.checkpoint()))
+
+    def write_actions(self):
+        if self.pending_actions:
+            write_frame(self.replay_file, ACTIONS_FRAME,
+                        encode_json({'start': self.step - len(self.pending_actions), 'actions': self.pending_actions}))
+            self.pending_actions = []
+
+    def finish(self, won: bool = None):
+        self.write_actions()
+        write_frame(self.replay_file, END_FRAME, encode_json({'steps': self.step, 'won': won}))
+        self.close()
+
+    def close(self):
+        self.write_actions()
+        self.replay_file.flush()
+        if self.owns_file:
+            self.replay_file.close()
+
+
+class Frame(NamedTuple):
+    frame_type: int
+    offset: int
+    length: int
+
+
+class ReplayReader:
+    """
+    Reads a replay file. Opening it walks the frame headers and reads only the header and end frames; game_at(step)
+    loads the nearest checkpoint at or before step and replays the recorded actions from there. A checkpoint that
+    cannot be loaded, e.g. one written by another version, falls back to replaying from the seed.
+    """
+
+    def __init__(self, replay_file: BinaryIO | str | Path):
+        self.owns_file = not hasattr(replay_file, 'read')
+        self.replay_file = open(replay_file, 'rb') if self.owns_file else replay_file
+        if self.replay_file.read(len(REPLAY_MAGIC)) != REPLAY_MAGIC:
+            raise ValueError("Not a fake_the_spire replay file")
+        self.frames = self.read_frame_index()
+        if not self.frames or self.frames[0].frame_type != HEADER_FRAME:
+            raise ValueError("Replay file has no header")
+        header = json.loads(self.read_payload(self.frames[0]))
+        self.seed = header['seed']
+        self.character = header['character']
+        self.checkpoint_interval = header['checkpoint_interval']
+        # The writer checkpoints when recording starts and then every checkpoint_interval steps
+        self.checkpoint_frames = [frame for frame in self.frames if frame.frame_type == CHECKPOINT_FRAME]
+        end_frames = [frame for frame in self.frames if frame.frame_type == END_FRAME]
+        self.end = json.loads(self.read_payload(end_frames[-1])) if end_frames else None
+        self.actions_cache = None
+
+    def __enter__(self) -> 'ReplayReader':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.owns_file:
+            self.replay_file.close()
+
+    def read_frame_index(self) -> list[Frame]:
+        """
+        Offsets of every complete frame. A frame cut short at the end of the file, e.g. by a crashed writer, is
+        ignored.
+        """
+        frames = []
+        offset = self.replay_file.tell()
+        file_size = self.replay_file.seek(0, 2)
+        while offset + FRAME_HEADER.size <= file_size:
+            self.replay_file.seek(offset)
+            frame_type, length = FRAME_HEADER.unpack(self.replay_file.read(FRAME_HEADER.size))
+            offset += FRAME_HEADER.size
+            if offset + length > file_size:
+                break
+            frames.append(Frame(frame_type, offset, length))
+            offset += length
+        return frames
+
+    def read_payload(self, frame: Frame) -> bytes:
+        self.replay_file.seek(frame.offset)
+        return zlib.decompress(self.replay_file.read(frame.length))
+
+    @property
+    def actions(self) -> list[str]:
+        if self.actions_cache is None:
+            actions = []
+            for frame in self.frames:
+                if frame.frame_type == ACTIONS_FRAME:
+                    actions.extend(json.loads(self.read_payload(frame))['actions'])
+            self.actions_cache = actions
+        return self.actions_cache
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    def load_checkpoint(self, checkpoint_index: int) -> Game | None:
+        try:
+            return Game.from_checkpoint(json.loads(self.read_payload(self.checkpoint_frames[checkpoint_index])))
+        except Exception as exception:
+            logger.warning(f'Could not load checkpoint {checkpoint_index} of replay with seed {self.seed}, '
+                           f'replaying from the seed: {exception!r}')
+            return None
+
+    def game_at(self, step: int) -> Game:
+        """
+        The game just before the action of step, or after the last action when step is the number of actions.
+        """
+        if not 0 <= step <= len(self.actions):
+            raise IndexError(f"Replay has no step {step}")
+        checkpoint_index = min(step // self.checkpoint_interval, len(self.checkpoint_frames) - 1)
+        game = self.load_checkpoint(checkpoint_index)
+        if game is None:
+            checkpoint_index = 0
+            game = Game(self.character, seed=self.seed)
+        try:
+            for action in self.actions[checkpoint_index * self.checkpoint_interval:step]:
+                game.action_initiate([action])
+        except GameOver:
+            pass
+        return game
@@ -0,0 +1,26 @@
+import random
+
+
+class GameRandom:
+    """
+    The random number streams of a single game. Every stream is its own random.Random seeded from the game seed and
+    the stream name, so e.g. extra draw shuffles never change which card rewards or enemy intents come up. The policy
+    stream is for whatever picks the actions, e.g. fake_the_spire.simulate.random_policy.
+    """
+    STREAM_NAMES = ('map', 'encounters', 'card_rewards', 'potions', 'relics', 'shop', 'treasure', 'enemy_ai',
+                    'shuffle', 'card_effects', 'events', 'policy')
+
+    def __init__(self, seed: int = None):
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        for stream_name in self.STREAM_NAMES:
+            setattr(self, stream_name, random.Random(f"{seed}:{stream_name}"))
+
+    def getstate(self) -> dict:
+        return {stream_name: getattr(self, stream_name).getstate() for stream_name in self.STREAM_NAMES}
+
+    def setstate(self, state: dict):
+        for stream_name, (version, internal_state, gauss_next) in state.items():
+            # Also accepts the lists a state turns into when stored as JSON
+            getattr(self, stream_name).setstate((version, tuple(internal_state), gauss_next))
@@ -1,4 +1,4 @@
-from fake_the_spire.views import app
+from fake_the_spire.views import create_app
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
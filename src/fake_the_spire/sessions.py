@@ -0,0 +1,113 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from fake_the_spire.config import config
+from fake_the_spire.game import Game
+
+
+# Rough sizes in bytes for estimate_game_memory, fitted to deep sizes of game.to_dict() over random runs
+GAME_MEMORY_BASE_BYTES = 2560
+COMBAT_ENTITY_MEMORY_BYTES = 1280
+PLAYER_ENTRY_MEMORY_BYTES = 320
+
+
+def estimate_game_memory(game: Game) -> int:
+    """
+    Rough size in bytes of a game from the number of cards, enemies, relics and potions it holds. It is called after
+    every action, so it only counts containers instead of walking the game state.
+    """
+    player_state = game.game_state['player']
+    size = GAME_MEMORY_BASE_BYTES + PLAYER_ENTRY_MEMORY_BYTES * (
+            len(player_state['deck']) + len(player_state['relics']) + len(player_state['potions']))
+    floor = game.floor
+    if getattr(floor, 'floor_type', None) == 'combat':
+        combat_entities = len(floor.enemy_list) + sum(
+            len(floor.player[pile_name]) for pile_name in ('hand', 'draw_pile', 'discard_pile', 'exhaust_pile'))
+        size += COMBAT_ENTITY_MEMORY_BYTES * combat_entities
+    return size
+
+
+class GameSession:
+    def __init__(self, session_id: str, game: Game):
+        self.session_id = session_id
+        self.game = game
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.memory_estimate = estimate_game_memory(game)
+        self.state_version = 0
+        self.state_snapshot = None
+
+
+class SessionNotFound(KeyError):
+    pass
+
+
+class GameSessionStore:
+    """
+    Holds the games of many concurrent clients keyed by session id. Sessions idle for longer than idle_timeout are
+    dropped, and the least recently used sessions are evicted once max_sessions or max_memory_bytes is exceeded.
+    """
+
+    def __init__(self, max_sessions: int = config.SESSION_MAX_COUNT,
+                 idle_timeout: float = config.SESSION_IDLE_TIMEOUT_SECONDS,
+                 max_memory_bytes: int = config.SESSION_MAX_MEMORY_BYTES):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_memory_bytes = max_memory_bytes
+        self.sessions: OrderedDict[str, GameSession] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __contains__(self, session_id: str):
+        return session_id in self.sessions
+
+    def create_session(self, character: str = 'character', seed: int = None) -> GameSession:
+        session = GameSession(uuid.uuid4().hex, Game(character, seed=seed))
+        with self.lock:
+            self.sessions[session.session_id] = session
+            self.evict()
+        return session
+
+    def get_session(self, session_id: str) -> GameSession:
+        with self.lock:
+            self.evict_idle()
+            if session_id not in self.sessions:
+                raise SessionNotFound(session_id)
+            session = self.sessions[session_id]
+            session.last_used = time.monotonic()
+            self.sessions.move_to_end(session_id)
+            return session
+
+    def update_memory_estimate(self, session: GameSession):
+        if session.session_id not in self.sessions:
+            return
+        session.memory_estimate = estimate_game_memory(session.game)
+        with self.lock:
+            self.evict()
+
+    def remove_session(self, session_id: str):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def total_memory_estimate(self) -> int:
+        return sum(session.memory_estimate for session in self.sessions.values())
+
+    def evict(self):
+        self.evict_idle()
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+        if self.max_memory_bytes is not None:
+            while len(self.sessions) > 1 and self.total_memory_estimate() > self.max_memory_bytes:
+                self.sessions.popitem(last=False)
+
+    def evict_idle(self):
+        expiry_time = time.monotonic() - self.idle_timeout
+        while self.sessions:
+            oldest_session = next(iter(self.sessions.values()))
+            if oldest_session.last_used >= expiry_time:
+                break
+            self.sessions.popitem(last=False)
@@ -1,10 +1,13 @@
 import logging
 import random
 import math
+from collections import Counter
 
 from fake_the_spire import FloorOver
-from fake_the_spire.floor import Floor
+from fake_the_spire.entity_ids import IdAllocator
+from fake_the_spire.floor import Floor, action_handler
 from fake_the_spire.references import CardReference, PotionReference, RelicReference
+from fake_the_spire.rng import GameRandom
 
 from fake_the_spire.config import config
 
@@ -12,8 +15,9 @@ logger = logging.getLogger('flask_app')
 
 
 class Shop(Floor):
-    def __init__(self, game_state: dict):
-        super().__init__(game_state)
+    def __init__(self, game_state: dict, rng: GameRandom = None, ids: IdAllocator = None,
+                 action_counts: Counter = None):
+        super().__init__(game_state, rng, ids, action_counts)
         self.floor_type = "shop"
         self.shop = self.generate_base_shop()
         self.removed_this_shop = False
@@ -35,14 +39,6 @@ class Shop(Floor):
     def to_dict(self):
         return self.shop
 
-    def take_action(self, action: str):
-        action = super().take_action(action)
-        if action is not None:
-            if action[0] == 'remove_card':
-                self.remove_card_request()
-            else:
-                logger.info(f'Invalid action: {action}')
-
     def generate_base_shop(self):
         shop = {"cards": self.generate_shop_cards() + self.generate_colorless_shop_cards(),
                 "potions": self.generate_potions(),
@@ -55,8 +51,8 @@ class Shop(Floor):
         power_cards = self.generate_distinct_shop_card_list('power', 1)
         card_options = attack_cards + skill_cards + power_cards
         cards_with_costs = self.give_reference_cost(card_options, rarity_to_cost_dict=config.SHOP_CARD_PRICE_DICT,
-                                                    cost_variance=config.SHOP_CARD_PRICE_VARIANCE)
-        random_element = random.choice(cards_with_costs)
+                                                    cost_variance=config.SHOP_CARD_PRICE_VARIANCE, rng=self.rng.shop)
+        random_element = self.rng.shop.choice(cards_with_costs)
         index = cards_with_costs.index(random_element)
         cards_with_costs[index] = (random_element[0], random_element[1] // 2)
         return cards_with_costs
@@ -69,7 +65,9 @@ class Shop(Floor):
                 rarity_dict=config.SHOP_BASE_CARD_RARITY_DISTRIBUTION,
                 rarity_dict_modifier=self.game_state['environment_modifiers']['card_reward_offset'],
                 additional_search_criteria=[('type', card_type),
-                                            ('color', self.game_state['environment_modifiers']['color'])]
+                                            ('color', self.game_state['environment_modifiers']['color'])],
+                rng=self.rng.shop,
+                ids=self.ids
             )
             if card not in cards:
                 cards.append(card)
@@ -77,12 +75,10 @@ class Shop(Floor):
 
     def generate_colorless_shop_cards(self):
         card_reference = CardReference.get_instance()
-        random_rare_colorless_card = random.choice(card_reference.get_all_entities_by_search_list([("rarity", "rare"),
-                                                                                                   ("color",
-                                                                                                    "colorless")]))
-        random_uncommon_colorless_card = random.choice(card_reference.get_all_entities_by_search_list(
-            [("rarity", "uncommon"), ("color", "colorless")]
-        ))
+        random_rare_colorless_card = card_reference.mint_entity(self.rng.shop.choice(
+            card_reference.query_entity_names([("rarity", "rare"), ("color", "colorless")])), self.ids)
+        random_uncommon_colorless_card = card_reference.mint_entity(self.rng.shop.choice(
+            card_reference.query_entity_names([("rarity", "uncommon"), ("color", "colorless")])), self.ids)
 
         card_options = [random_rare_colorless_card, random_uncommon_colorless_card]
         rarity_to_cost_dict = config.SHOP_CARD_PRICE_DICT.copy()
@@ -90,15 +86,16 @@ class Shop(Floor):
             rarity_to_cost_dict[rarity] = int(rarity_to_cost_dict[rarity] * config.SHOP_COLORLESS_CARD_PREMIUM)
 
         return self.give_reference_cost(card_options, rarity_to_cost_dict=rarity_to_cost_dict,
-                                        cost_variance=config.SHOP_CARD_PRICE_VARIANCE)
+                                        cost_variance=config.SHOP_CARD_PRICE_VARIANCE, rng=self.rng.shop)
 
     def generate_potions(self):
         potion_reference = PotionReference.get_instance()
         potion_options = [potion_reference.get_single_entity_by_probability_dict('rarity',
-                                                                                 config.POTION_RARITY_DISTRIBUTION)
+                                                                                 config.POTION_RARITY_DISTRIBUTION,
+                                                                                 rng=self.rng.shop, ids=self.ids)
                           for _ in range(3)]
         return self.give_reference_cost(potion_options, rarity_to_cost_dict=config.SHOP_POTION_PRICE_DICT,
-                                        cost_variance=config.SHOP_POTION_PRICE_VARIANCE)
+                                        cost_variance=config.SHOP_POTION_PRICE_VARIANCE, rng=self.rng.shop)
 
     def generate_relics(self):
         relic_reference = RelicReference.get_instance()
@@ -108,20 +105,18 @@ class Shop(Floor):
                                                                           config.RELIC_RARITY_DISTRIBUTION,
                                                                           exclude_list=
                                                                           self.game_state['environment_modifiers'][
-                                                                              'seen_relics'])
+                                                                              'seen_relics'],
+                                                                          rng=self.rng.shop, ids=self.ids)
             relic_options.append(relic)
             self.game_state['environment_modifiers']['seen_relics'].append(relic[1]['name'])
 
-        shop_relic_option = random.choice(relic_reference.get_all_entities_by_search_list([('rarity', 'shop')],
-                                                                                          exclude_list=
-                                                                                          self.game_state[
-                                                                                              'environment_modifiers'][
-                                                                                              'seen_relics']))
+        shop_relic_option = relic_reference.mint_entity(self.rng.shop.choice(relic_reference.query_entity_names(
+            [('rarity', 'shop')], exclude_list=self.game_state['environment_modifiers']['seen_relics'])), self.ids)
         self.game_state['environment_modifiers']['seen_relics'].append(shop_relic_option[1]['name'])
 
         relic_options.append(shop_relic_option)
         return self.give_reference_cost(relic_options, rarity_to_cost_dict=config.SHOP_RELIC_PRICE_DICT,
-                                        cost_variance=config.SHOP_RELIC_PRICE_VARIANCE)
+                                        cost_variance=config.SHOP_RELIC_PRICE_VARIANCE, rng=self.rng.shop)
 
     def remove_from_current_floor(self, shop_type: str, reference_name: str):
         for i in range(len(self.shop[shop_type])):
@@ -139,19 +134,20 @@ class Shop(Floor):
 
         return base_removal_price
 
-    def remove_card_request(self):
+    @action_handler('remove_card')
+    def remove_card_request(self, action: list[str] = None):
         self.can_remove_card = True
         self.removed_this_shop = True
         self.game_state['player']['gold'] -= self.get_card_removal_cost()
         self.game_state['environment_modifiers']['previous_removes'] += 1
 
     @staticmethod
-    def give_reference_cost(shop_options: list, rarity_to_cost_dict: {}, cost_variance: float):
+    def give_reference_cost(shop_options: list, rarity_to_cost_dict: {}, cost_variance: float, rng=random):
         shop_options_with_cost = []
         for reference_name, reference_option in shop_options:
             rarity = reference_option['rarity']
             base_cost = math.floor(rarity_to_cost_dict[rarity] * config.SHOP_ASCENSION_CARD_PREMIUM)
             int_cost_variance = math.floor(cost_variance * base_cost)
-            cost = random.randint(base_cost - int_cost_variance, base_cost + int_cost_variance)
+            cost = rng.randint(base_cost - int_cost_variance, base_cost + int_cost_variance)
             shop_options_with_cost.append((reference_name, cost))
         return shop_options_with_cost
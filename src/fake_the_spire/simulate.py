@@ -0,0 +1,198 @@
+import argparse
+import gzip
+import importlib
+import json
+import logging
+import multiprocessing
+from pathlib import Path
+from typing import Callable, Iterator
+
+from fake_the_spire import GameOver
+from fake_the_spire.game import Game
+from fake_the_spire.references import load_all_references
+
+logger = logging.getLogger('flask_app')
+
+MAX_ACTIONS_PER_RUN = 5000
+
+Policy = Callable[[Game], str]
+
+
+def random_policy(game: Game) -> str:
+    return game.rng.policy.choice(game.current_options)
+
+
+GREEDY_VERB_PRIORITY = ['drop', 'remove', 'relics', 'cards', 'potions', 'gold', 'play', 'play_potion', 'end_turn',
+                        'end']
+
+
+def greedy_policy(game: Game) -> str:
+    """
+    Takes every reward on offer, plays the first playable card at the weakest enemy and ends the turn only when
+    nothing else is playable.
+    """
+    return min(game.current_options, key=lambda option: greedy_option_score(game, option))
+
+
+def greedy_option_score(game: Game, option: str) -> tuple:
+    words = option.split(' ')
+    verb_priority = GREEDY_VERB_PRIORITY.index(words[0]) if words[0] in GREEDY_VERB_PRIORITY else len(
+        GREEDY_VERB_PRIORITY)
+    target_hp = 0
+    if words[0] == 'play' and game.floor.floor_type == 'combat':
+        for word in words[2:]:
+            enemy = game.floor.get_enemy_by_id(word)
+            if enemy is not None:
+                target_hp = enemy['hp']
+    return verb_priority, target_hp
+
+
+POLICIES = {'random': random_policy, 'greedy': greedy_policy}
+
+
+def load_policy(policy_name: str) -> Policy:
+    """
+    Resolves a builtin policy name, or a user supplied policy given as "package.module:function".
+    """
+    if policy_name in POLICIES:
+        return POLICIES[policy_name]
+    module_name, _, function_name = policy_name.partition(':')
+    if not function_name:
+        raise ValueError(f"Unknown policy {policy_name}, expected one of {list(POLICIES)} or module:function")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def play_run(policy: Policy, seed: int, character: str = 'character',
+             max_actions: int = MAX_ACTIONS_PER_RUN) -> dict:
+    game = Game(character, seed=seed)
+    hp_curve = [game.game_state['player']['hp']]
+    floor_num = game.game_state['floor_num']
+    record = {'seed': seed, 'won': False, 'floor_reached': floor_num, 'actions': 0, 'error': None}
+    try:
+        for _ in range(max_actions):
+            game.action_initiate([policy(game)])
+            record['actions'] += 1
+            if game.game_state['floor_num'] != floor_num:
+                floor_num = game.game_state['floor_num']
+                hp_curve.append(game.game_state['player']['hp'])
+        record['error'] = f'Exceeded {max_actions} actions'
+    except GameOver as game_over:
+        record['actions'] += 1
+        record['won'] = game_over.args[0]
+    except Exception as exception:
+        logger.info(f'Run with seed {seed} failed: {exception!r}')
+        record['error'] = repr(exception)
+    hp_curve.append(game.game_state['player']['hp'])
+    record['floor_reached'] = game.game_state['floor_num']
+    record['hp_curve'] = hp_curve
+    record['deck'] = dict(game.game_state['player']['deck'])
+    record['action_counts'] = dict(game.action_counts)
+    return record
+
+
+def simulate_runs(num_runs: int, policy: Policy, seed: int = 0, character: str = 'character',
+                  max_actions: int = MAX_ACTIONS_PER_RUN) -> Iterator[dict]:
+    for run_seed in range(seed, seed + num_runs):
+        yield play_run(policy, run_seed, character, max_actions)
+
+
+def split_seed_range(seed: int, num_runs: int, num_workers: int) -> list[range]:
+    runs_per_worker, remainder = divmod(num_runs, num_workers)
+    seed_ranges = []
+    start = seed
+    for worker_index in range(num_workers):
+        stop = start + runs_per_worker + (1 if worker_index < remainder else 0)
+        if stop > start:
+            seed_ranges.append(range(start, stop))
+        start = stop
+    return seed_ranges
+
+
+def run_worker(seed_range: range, policy, character: str, max_actions: int, record_queue):
+    try:
+        if isinstance(policy, str):
+            policy = load_policy(policy)
+        for run_seed in seed_range:
+            record_queue.put(play_run(policy, run_seed, character, max_actions))
+    finally:
+        record_queue.put(None)
+
+
+def simulate_runs_in_parallel(num_runs: int, policy, num_workers: int, seed: int = 0, character: str = 'character',
+                              max_actions: int = MAX_ACTIONS_PER_RUN) -> Iterator[dict]:
+    """
+    Plays runs on a pool of worker processes, each owning a contiguous seed range, and yields run records in the
+    order they finish. References are loaded before the workers fork so every worker shares them copy-on-write.
+    policy may be a callable or a policy name accepted by load_policy.
+    """
+    load_all_references()
+    start_methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in start_methods else None)
+    record_queue = context.Queue()
+    workers = [context.Process(target=run_worker, args=(seed_range, policy, character, max_actions, record_queue),
+                               daemon=True)
+               for seed_range in split_seed_range(seed, num_runs, num_workers)]
+    for worker in workers:
+        worker.start()
+    running_workers = len(workers)
+    try:
+        while running_workers > 0:
+            record = record_queue.get()
+            if record is None:
+                running_workers -= 1
+                continue
+            yield record
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+
+def open_output(output_path: Path):
+    if output_path.suffix == '.gz':
+        return gzip.open(output_path, 'wt', encoding='utf-8')
+    return open(output_path, 'w', encoding='utf-8')
+
+
+def write_run_records(records, output_path: Path) -> dict:
+    summary = {'runs': 0, 'won': 0, 'errors': 0}
+    with open_output(output_path) as output_file:
+        for record in records:
+            output_file.write(json.dumps(record, separators=(',', ':')))
+            output_file.write('\n')
+            summary['runs'] += 1
+            summary['won'] += record['won']
+            summary['errors'] += record['error'] is not None
+    return summary
+
+
+def build_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Play full runs of fake_the_spire without the web server.")
+    parser.add_argument('--runs', type=int, default=100, help="number of complete runs to play")
+    parser.add_argument('--policy', default='random',
+                        help="random, greedy, or a user supplied policy as package.module:function")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first run, later runs count up from it")
+    parser.add_argument('--max-actions', type=int, default=MAX_ACTIONS_PER_RUN,
+                        help="abandon a run after this many actions")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of worker processes, each playing a contiguous range of seeds")
+    parser.add_argument('--output', type=Path, default=Path('runs.jsonl'),
+                        help="JSON lines output file, gzip compressed when it ends in .gz")
+    return parser
+
+
+def main(argv: list[str] = None):
+    args = build_argument_parser().parse_args(argv)
+    policy = load_policy(args.policy)
+    if args.workers > 1:
+        records = simulate_runs_in_parallel(args.runs, args.policy, args.workers, seed=args.seed,
+                                            max_actions=args.max_actions)
+    else:
+        records = simulate_runs(args.runs, policy, seed=args.seed, max_actions=args.max_actions)
+    summary = write_run_records(records, args.output)
+    print(f"{summary['runs']} runs, {summary['won']} won, {summary['errors']} errors -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
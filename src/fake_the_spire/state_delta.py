@@ -0,0 +1,65 @@
+def copy_state(state):
+    """
+    Copies the nested dicts and lists of a game state so later in-place changes to the game do not reach the copy.
+    """
+    if isinstance(state, dict):
+        return {key: copy_state(value) for key, value in state.items()}
+    if isinstance(state, (list, tuple)):
+        return [copy_state(value) for value in state]
+    return state
+
+
+def escape_path_token(token) -> str:
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def unescape_path_token(token: str) -> str:
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def diff_state(old_state, new_state, path: str = '') -> list[dict]:
+    """
+    JSON-patch style operations turning old_state into new_state. Dicts are compared key by key and lists of equal
+    length index by index; anything else that differs is replaced whole.
+    """
+    if isinstance(old_state, dict) and isinstance(new_state, dict):
+        delta = []
+        for key, old_value in old_state.items():
+            key_path = f"{path}/{escape_path_token(key)}"
+            if key not in new_state:
+                delta.append({'op': 'remove', 'path': key_path})
+            else:
+                delta.extend(diff_state(old_value, new_state[key], key_path))
+        for key, new_value in new_state.items():
+            if key not in old_state:
+                delta.append({'op': 'add', 'path': f"{path}/{escape_path_token(key)}", 'value': copy_state(new_value)})
+        return delta
+    if isinstance(old_state, (list, tuple)) and isinstance(new_state, (list, tuple)) and len(old_state) == len(
+            new_state):
+        delta = []
+        for index, (old_value, new_value) in enumerate(zip(old_state, new_state)):
+            delta.extend(diff_state(old_value, new_value, f"{path}/{index}"))
+        return delta
+    if type(old_state) is type(new_state) and old_state == new_state:
+        return []
+    return [{'op': 'replace', 'path': path, 'value': copy_state(new_state)}]
+
+
+def apply_delta(state, delta: list[dict]):
+    """
+    Applies operations from diff_state to state in place and returns the patched state.
+    """
+    for operation in delta:
+        if not operation['path']:
+            state = copy_state(operation['value'])
+            continue
+        tokens = [unescape_path_token(token) for token in operation['path'].split('/')[1:]]
+        parent = state
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last_token = int(tokens[-1]) if isinstance(parent, list) else tokens[-1]
+        if operation['op'] == 'remove':
+            del parent[last_token]
+        else:
+            parent[last_token] = copy_state(operation['value'])
+    return state
@@ -0,0 +1,223 @@
+import argparse
+import json
+import logging
+import os
+import random
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from fake_the_spire import GameOver
+from fake_the_spire.action_space import ACTION_SPACE_SIZE
+from fake_the_spire.config import config
+from fake_the_spire.floor import format_option
+from fake_the_spire.game import Game
+from fake_the_spire.observation import ObservationEncoder, ObservationLayout
+from fake_the_spire.replays import ReplayReader
+from fake_the_spire.simulate import MAX_ACTIONS_PER_RUN, Policy, load_policy
+from fake_the_spire.vector_game import LOSS_REWARD, WIN_REWARD
+
+logger = logging.getLogger('flask_app')
+
+TRAJECTORY_FORMAT_VERSION = 2
+MANIFEST_NAME = 'manifest.json'
+
+# Column name, dtype and shape of one step
+TRAJECTORY_COLUMNS = (('observations', np.float32, ('observation_size',)),
+                      ('actions', np.int32, ()),
+                      ('action_masks', np.bool_, ('action_space_size',)),
+                      ('rewards', np.float32, ()),
+                      ('dones', np.bool_, ()),
+                      ('truncated', np.bool_, ()))
+
+
+def get_chunk_path(directory: Path, column: str, chunk_index: int) -> Path:
+    return directory / f"{column}_{chunk_index:05d}.npy"
+
+
+def read_manifest(directory: Path) -> dict | None:
+    try:
+        with open(directory / MANIFEST_NAME, encoding='utf-8') as manifest_file:
+            return json.load(manifest_file)
+    except FileNotFoundError:
+        return None
+
+
+def write_atomically(path: Path, write):
+    temporary_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    try:
+        with open(temporary_path, 'wb') as temporary_file:
+            write(temporary_file)
+        os.replace(temporary_path, path)
+    finally:
+        temporary_path.unlink(missing_ok=True)
+
+
+def get_action_index(game: Game, option: str) -> int:
+    for action_index, option_tuple in game.get_current_option_indices().items():
+        if format_option(option_tuple) == option:
+            return action_index
+    raise ValueError(f"Option {option} is not a current option")
+
+
+class TrajectoryWriter:
+    """
+    Appends steps to a trajectory directory. Every step holds the observation and action mask of the game before the
+    action, the action index, the reward of the action, whether it ended the episode and whether the episode was cut
+    short there instead, as in fake_the_spire.vector_game. Steps are buffered in arrays
+    of chunk_size rows and each full buffer is written as one .npy file per column, after which the manifest listing
+    the chunks is replaced, so readers only ever see complete chunks. Opening an existing directory appends to it.
+    """
+
+    def __init__(self, directory: Path, chunk_size: int = config.TRAJECTORY_CHUNK_SIZE,
+                 layout: ObservationLayout = None):
+        self.directory = Path(directory)
+        self.chunk_size = chunk_size
+        self.encoder = ObservationEncoder(layout=layout)
+        shapes = {'observation_size': self.encoder.layout.size, 'action_space_size': ACTION_SPACE_SIZE}
+        self.manifest = read_manifest(self.directory)
+        if self.manifest is None:
+            self.manifest = {'format': TRAJECTORY_FORMAT_VERSION, **shapes, 'chunks': []}
+        elif self.manifest['format'] != TRAJECTORY_FORMAT_VERSION or any(
+                self.manifest[name] != size for name, size in shapes.items()):
+            raise ValueError(f"Trajectories in {self.directory} were written with a different layout")
+        self.buffers = {column: np.zeros((chunk_size, *(shapes[name] for name in shape)), dtype=dtype)
+                        for column, dtype, shape in TRAJECTORY_COLUMNS}
+        self.size = 0
+
+    def __enter__(self) -> 'TrajectoryWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_step(self, game: Game, action_index: int):
+        if self.size == self.chunk_size:
+            self.flush()
+        row = self.size
+        self.buffers['observations'][row] = self.encoder.encode(game)
+        game.action_mask(out=self.buffers['action_masks'][row])
+        self.buffers['actions'][row] = action_index
+        self.buffers['rewards'][row] = 0
+        self.buffers['dones'][row] = False
+        self.buffers['truncated'][row] = False
+        self.size += 1
+
+    def end_episode(self, reward: float = 0., truncated: bool = False):
+        """
+        Marks the last added step as the end of its episode and sets its reward, or with truncated as the step the
+        episode was cut short after, which is not done since the game went on. Call it before flush.
+        """
+        if self.size == 0:
+            raise RuntimeError("No buffered step to end the episode on")
+        self.buffers['rewards'][self.size - 1] = reward
+        self.buffers['dones'][self.size - 1] = not truncated
+        self.buffers['truncated'][self.size - 1] = truncated
+
+    def flush(self):
+        if self.size == 0:
+            return
+        chunk_index = len(self.manifest['chunks'])
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for column, buffer in self.buffers.items():
+            write_atomically(get_chunk_path(self.directory, column, chunk_index),
+                             lambda chunk_file: np.save(chunk_file, buffer[:self.size]))
+        self.manifest['chunks'].append(self.size)
+        manifest_bytes = json.dumps(self.manifest).encode('utf-8')
+        write_atomically(self.directory / MANIFEST_NAME, lambda manifest_file: manifest_file.write(manifest_bytes))
+        self.size = 0
+
+    def close(self):
+        self.flush()
+
+
+def write_game_steps(writer: TrajectoryWriter, game: Game, options: Iterable[str]) -> bool:
+    """
+    Plays options on game, adding a step for each, and ends the episode after the last one with WIN_REWARD or
+    LOSS_REWARD when the game ended. Running out of options, an option that is not currently legal or an error in the
+    engine leaves the game unfinished, so the last step is marked truncated instead. Returns whether the game ended.
+    """
+    added_step = False
+    try:
+        for option in options:
+            writer.add_step(game, get_action_index(game, option))
+            added_step = True
+            game.action_initiate([option])
+    except GameOver as exception:
+        writer.end_episode(WIN_REWARD if exception.args[0] else LOSS_REWARD)
+        return True
+    except Exception as exception:
+        logger.warning(f'Episode of game with seed {game.seed} was truncated: {exception!r}')
+    if added_step:
+        writer.end_episode(truncated=True)
+    return False
+
+
+def export_replay(writer: TrajectoryWriter, replay: ReplayReader) -> bool:
+    return write_game_steps(writer, replay.game_at(0), replay.actions)
+
+
+def export_run(writer: TrajectoryWriter, policy: Policy, seed: int, character: str = 'character',
+               max_actions: int = MAX_ACTIONS_PER_RUN) -> bool:
+    game = Game(character, seed=seed)
+    return write_game_steps(writer, game, (policy(game) for _ in range(max_actions)))
+
+
+class TrajectoryDataset:
+    """
+    Reads a trajectory directory with every chunk memory-mapped, so opening it reads nothing but the .npy headers.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        manifest = read_manifest(self.directory)
+        if manifest is None:
+            raise FileNotFoundError(f"No {MANIFEST_NAME} in {self.directory}")
+        if manifest['format'] != TRAJECTORY_FORMAT_VERSION:
+            raise ValueError(f"Unsupported trajectory format {manifest['format']}")
+        self.observation_size = manifest['observation_size']
+        self.chunks = [{column: np.load(get_chunk_path(self.directory, column, chunk_index), mmap_mode='r')
+                        for column, _, _ in TRAJECTORY_COLUMNS}
+                       for chunk_index in range(len(manifest['chunks']))]
+        self.chunk_lengths = manifest['chunks']
+
+    def __len__(self) -> int:
+        return sum(self.chunk_lengths)
+
+    def minibatches(self, batch_size: int, seed: int = None) -> Iterator[dict[str, np.ndarray]]:
+        """
+        Yields dicts of column name to batch_size consecutive steps. Batches are slices of the memory maps and never
+        span chunks, so the last batch of each chunk may be shorter. With a seed the batches come in random order.
+        """
+        batch_starts = [(chunk_index, start) for chunk_index, chunk_length in enumerate(self.chunk_lengths)
+                        for start in range(0, chunk_length, batch_size)]
+        if seed is not None:
+            random.Random(seed).shuffle(batch_starts)
+        for chunk_index, start in batch_starts:
+            yield {column: array[start:start + batch_size] for column, array in self.chunks[chunk_index].items()}
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Export played games as memory-mappable trajectory arrays.")
+    parser.add_argument('output', type=Path, help="trajectory directory, appended to if it exists")
+    parser.add_argument('--replays', type=Path, nargs='*', default=[], help="replay files to export")
+    parser.add_argument('--runs', type=int, default=0, help="number of runs to simulate and export")
+    parser.add_argument('--policy', default='random',
+                        help="random, greedy, or a user supplied policy as package.module:function")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first run, later runs count up from it")
+    parser.add_argument('--max-actions', type=int, default=MAX_ACTIONS_PER_RUN,
+                        help="end a simulated episode after this many actions")
+    args = parser.parse_args(argv)
+    policy = load_policy(args.policy)
+    with TrajectoryWriter(args.output) as writer:
+        for replay_path in args.replays:
+            with ReplayReader(replay_path) as replay:
+                export_replay(writer, replay)
+        for seed in range(args.seed, args.seed + args.runs):
+            export_run(writer, policy, seed, max_actions=args.max_actions)
+    print(f"{len(TrajectoryDataset(args.output))} steps -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+import zlib
+from collections import OrderedDict
+from logging.handlers import QueueHandler
+from pathlib import Path
+
+from fake_the_spire.config import config
+
+logger = logging.getLogger('flask_app')
+
+transcript_logger = logging.getLogger('fake_the_spire.transcripts')
+transcript_logger.propagate = False
+
+transcript_writer: 'TranscriptWriter | None' = None
+transcript_handler: 'TranscriptQueueHandler | None' = None
+
+
+def get_default_transcript_directory() -> Path:
+    return Path(__file__).resolve().parent.parent.parent / 'logs' / 'transcripts'
+
+
+def hash_options(options: list[str]) -> str:
+    return format(zlib.crc32('\n'.join(options).encode('utf-8')), '08x')
+
+
+def record_transcript(event: str, session_id: str, **fields):
+    """
+    Queues one transcript record of a game, e.g. record_transcript('step', session_id, action=...). Does nothing until
+    setup_transcript_logging has been called, so the engine and the simulator pay nothing for it.
+    """
+    if not transcript_logger.handlers:
+        return
+    transcript_logger.info(event, extra={'transcript': {'event': event, 'session_id': session_id, **fields}})
+
+
+class TranscriptQueueHandler(QueueHandler):
+    """
+    Puts records on a bounded queue without blocking. While the queue is full, e.g. because the disk is slower than
+    the request rate, records are dropped and counted in dropped_records.
+    """
+
+    def __init__(self, record_queue: queue.Queue):
+        super().__init__(record_queue)
+        self.dropped_records = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Handler.handle holds the handler lock here, so the count is safe across threads
+            self.dropped_records += 1
+
+
+class TranscriptWriter(threading.Thread):
+    """
+    Background thread writing queued transcript records as JSON lines, one file per game. Records are written in
+    batches of up to batch_size with one flush per batch. A game's file is closed when its 'end' record arrives, and
+    at most max_open_files files are kept open, least recently written ones are closed first. A record that cannot be
+    written is logged and counted in failed_records, and the thread carries on with the next one.
+    """
+
+    def __init__(self, record_queue: queue.Queue, directory: Path, batch_size: int = config.TRANSCRIPT_BATCH_SIZE,
+                 max_open_files: int = config.TRANSCRIPT_MAX_OPEN_FILES):
+        super().__init__(name='transcript_writer', daemon=True)
+        self.record_queue = record_queue
+        self.directory = directory
+        self.batch_size = batch_size
+        self.max_open_files = max_open_files
+        self.open_files: OrderedDict[str, object] = OrderedDict()
+        self.failed_records = 0
+
+    def get_transcript_path(self, session_id: str) -> Path:
+        return self.directory / f"transcript_{session_id}.jsonl"
+
+    def run(self):
+        running = True
+        while running:
+            batch = [self.record_queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.record_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = batch[:batch.index(None)]
+            self.write_batch(batch)
+        self.close_all()
+
+    def write_batch(self, batch: list[logging.LogRecord]):
+        ended_sessions = []
+        for record in batch:
+            try:
+                transcript = record.transcript
+                line = json.dumps(transcript, separators=(',', ':')) + '\n'
+                self.get_file(transcript['session_id']).write(line)
+            except Exception as exception:
+                self.failed_records += 1
+                logger.warning(f'Could not write transcript record: {exception!r}')
+                continue
+            if transcript['event'] == 'end':
+                ended_sessions.append(transcript['session_id'])
+        for session_id in ended_sessions:
+            self.close_file(session_id)
+        for session_id, transcript_file in list(self.open_files.items()):
+            try:
+                transcript_file.flush()
+            except OSError as exception:
+                logger.warning(f'Could not flush transcript of session {session_id}: {exception!r}')
+                self.close_file(session_id)
+
+    def get_file(self, session_id: str):
+        transcript_file = self.open_files.get(session_id)
+        if transcript_file is not None:
+            self.open_files.move_to_end(session_id)
+            return transcript_file
+        while len(self.open_files) >= self.max_open_files:
+            self.close_file(next(iter(self.open_files)))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        transcript_file = open(self.get_transcript_path(session_id), 'a', encoding='utf-8')
+        self.open_files[session_id] = transcript_file
+        return transcript_file
+
+    def close_file(self, session_id: str):
+        transcript_file = self.open_files.pop(session_id, None)
+        if transcript_file is None:
+            return
+        try:
+            transcript_file.close()
+        except OSError as exception:
+            logger.warning(f'Could not close transcript of session {session_id}: {exception!r}')
+
+    def close_all(self):
+        for session_id in list(self.open_files):
+            self.close_file(session_id)
+
+    def stop(self):
+        if self.is_alive():
+            self.record_queue.put(None)
+            self.join()
+
+
+def setup_transcript_logging(directory: Path = None,
+                             max_queued_records: int = config.TRANSCRIPT_MAX_QUEUED_RECORDS) -> TranscriptWriter:
+    """
+    Starts the transcript writer thread and routes transcript records to it through a queue of at most
+    max_queued_records, so the request path only enqueues them. Calling it again returns the running writer.
+    """
+    global transcript_writer, transcript_handler
+    if transcript_writer is not None:
+        return transcript_writer
+    record_queue = queue.Queue(maxsize=max_queued_records)
+    transcript_writer = TranscriptWriter(record_queue,
+                                         directory if directory is not None else get_default_transcript_directory())
+    transcript_writer.start()
+    transcript_handler = TranscriptQueueHandler(record_queue)
+    transcript_logger.addHandler(transcript_handler)
+    transcript_logger.setLevel(logging.INFO)
+    atexit.register(stop_transcript_logging)
+    return transcript_writer
+
+
+def stop_transcript_logging():
+    """
+    Writes out every queued record and stops the writer thread.
+    """
+    global transcript_writer, transcript_handler
+    if transcript_writer is None:
+        return
+    transcript_logger.removeHandler(transcript_handler)
+    transcript_writer.stop()
+    if transcript_handler.dropped_records or transcript_writer.failed_records:
+        logger.warning(f'Transcripts lost {transcript_handler.dropped_records} records to a full queue and '
+                       f'{transcript_writer.failed_records} to write errors')
+    transcript_writer = None
+    transcript_handler = None
@@ -0,0 +1,84 @@
+import logging
+
+import numpy as np
+
+from fake_the_spire import GameOver
+from fake_the_spire.action_space import ACTION_SPACE_SIZE
+from fake_the_spire.game import Game
+from fake_the_spire.observation import ObservationEncoder, ObservationLayout
+
+logger = logging.getLogger('flask_app')
+
+WIN_REWARD = 1.
+LOSS_REWARD = -1.
+
+
+class VectorGame:
+    """
+    Steps num_games games in lockstep. step takes one action index per game and returns stacked observations,
+    rewards, done flags, truncated flags and action masks. A finished game, won or lost, is replaced by a new game
+    whose first observation is returned in its row, and its reward is WIN_REWARD or LOSS_REWARD. A game whose action
+    raises an error in the engine is replaced the same way and flagged as truncated instead of done, with reward 0.
+    The returned arrays are reused by the next step, so copy them to keep them.
+    """
+
+    def __init__(self, num_games: int, character: str = 'character', seed: int = 0):
+        self.num_games = num_games
+        self.character = character
+        self.next_seed = seed
+        layout = ObservationLayout.get_instance()
+        self.observations = np.zeros((num_games, layout.size), dtype=np.float32)
+        self.action_masks = np.zeros((num_games, ACTION_SPACE_SIZE), dtype=np.bool_)
+        self.rewards = np.zeros(num_games, dtype=np.float32)
+        self.dones = np.zeros(num_games, dtype=np.bool_)
+        self.truncated = np.zeros(num_games, dtype=np.bool_)
+        self.games: list[Game] = [None] * num_games
+        self.encoders = [None] * num_games
+
+    def reset(self) -> tuple[np.ndarray, np.ndarray]:
+        for game_index in range(self.num_games):
+            self.reset_game(game_index)
+        self.rewards[:] = 0
+        self.dones[:] = False
+        self.truncated[:] = False
+        return self.observations, self.action_masks
+
+    def reset_game(self, game_index: int):
+        self.games[game_index] = Game(self.character, seed=self.next_seed)
+        self.next_seed += 1
+        self.encoders[game_index] = ObservationEncoder(out=self.observations[game_index])
+        self.observe(game_index)
+
+    def observe(self, game_index: int):
+        game = self.games[game_index]
+        self.encoders[game_index].encode(game)
+        game.action_mask(out=self.action_masks[game_index])
+
+    def step(self, action_indices) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        if len(action_indices) != self.num_games:
+            raise ValueError(f"Expected {self.num_games} action indices, got {len(action_indices)}")
+        if self.games[0] is None:
+            raise RuntimeError("Call reset before step")
+        # Checked before any game moves, so an illegal index leaves every game as it was
+        for game_index, action_index in enumerate(action_indices):
+            if int(action_index) not in self.games[game_index].get_current_option_indices():
+                raise ValueError(f"Action index {action_index} is not a legal action of game {game_index}")
+        self.rewards[:] = 0
+        self.dones[:] = False
+        self.truncated[:] = False
+        for game_index, action_index in enumerate(action_indices):
+            game = self.games[game_index]
+            try:
+                game.take_action_index(action_index)
+            except GameOver as game_over:
+                self.rewards[game_index] = WIN_REWARD if game_over.args[0] else LOSS_REWARD
+                self.dones[game_index] = True
+                self.reset_game(game_index)
+                continue
+            except Exception as exception:
+                logger.warning(f'Game with seed {game.seed} failed and was reset: {exception!r}')
+                self.truncated[game_index] = True
+                self.reset_game(game_index)
+                continue
+            self.observe(game_index)
+        return self.observations, self.rewards, self.dones, self.truncated, self.action_masks
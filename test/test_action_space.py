@@ -0,0 +1,66 @@
+import unittest
+import logging
+import random
+
+import numpy as np
+
+from fake_the_spire import GameOver
+from fake_the_spire.action_space import ACTION_SPACE_SIZE, CHOICE_OFFSET, END_TURN_INDEX, get_option_indices
+from fake_the_spire.game import Game
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TestActionSpace(unittest.TestCase):
+    def test_mask_matches_options(self):
+        game = Game('character', seed=5)
+        mask = game.action_mask()
+        self.assertEqual(mask.shape, (ACTION_SPACE_SIZE,))
+        self.assertEqual(mask.dtype, np.bool_)
+        self.assertTrue(mask[END_TURN_INDEX])
+        self.assertEqual(int(mask.sum()), len(game.current_options))
+        self.assertEqual(sorted(np.flatnonzero(mask)), sorted(game.get_current_option_indices()))
+
+    def test_mask_into_preallocated_row(self):
+        game = Game('character', seed=5)
+        masks = np.ones((2, ACTION_SPACE_SIZE), dtype=np.bool_)
+        game.action_mask(out=masks[1])
+        self.assertTrue(np.array_equal(masks[1], game.action_mask()))
+        self.assertTrue(masks[0].all())
+
+    def test_end_turn_index(self):
+        game = Game('character', seed=5)
+        hand_before = list(game.floor.player['hand'])
+        game.take_action_index(END_TURN_INDEX)
+        self.assertNotEqual(list(game.floor.player['hand']), hand_before)
+
+    def test_exhaust_pile_is_not_a_target(self):
+        game = Game('character', seed=5)
+        player = game.floor.player
+        discarded_id, exhausted_id = list(player['draw_pile'])[:2]
+        player['discard_pile'][discarded_id] = player['draw_pile'].pop(discarded_id)
+        player['exhaust_pile'][exhausted_id] = player['draw_pile'].pop(exhausted_id)
+        hand_id = next(iter(player['hand']))
+        option_indices = get_option_indices(game.floor, [('play', hand_id, discarded_id),
+                                                         ('play', hand_id, exhausted_id)])
+        self.assertEqual(list(option_indices.values()), [('play', hand_id, discarded_id)])
+
+    def test_illegal_index(self):
+        game = Game('character', seed=5)
+        with self.assertRaises(ValueError):
+            game.take_action_index(CHOICE_OFFSET)
+
+    def test_play_by_index_until_reward(self):
+        rng = random.Random(3)
+        game = Game('character', seed=3)
+        try:
+            for _ in range(500):
+                mask = game.action_mask()
+                self.assertEqual(int(mask.sum()), len(game.current_options))
+                if game.floor.floor_type != 'combat':
+                    self.assertTrue(mask[CHOICE_OFFSET])
+                    return
+                game.take_action_index(rng.choice(np.flatnonzero(mask)))
+        except GameOver:
+            return
+        self.fail("Combat did not end")
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import shutil
+import tempfile
+import unittest
+import logging
+from pathlib import Path
+
+from fake_the_spire import transcripts
+from fake_the_spire.asgi import PlayGameApp
+
+logging.basicConfig(level=logging.INFO)
+
+
+async def post(app: PlayGameApp, path: str, request_json) -> tuple[int, dict, dict]:
+    messages = [{'type': 'http.request', 'body': json.dumps(request_json).encode('utf-8'), 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await app({'type': 'http', 'method': 'POST', 'path': path}, receive, send)
+    return sent[0]['status'], dict(sent[0]['headers']), json.loads(sent[1]['body'])
+
+
+async def play_session(app: PlayGameApp, seed: int, num_actions: int) -> list[int]:
+    status, _, response_json = await post(app, '/play_game', {'seed': seed})
+    statuses = [status]
+    for _ in range(num_actions):
+        if 'options' not in response_json:
+            break
+        status, _, response_json = await post(app, '/play_game', {'session_id': response_json['session_id'],
+                                                                  'action': [response_json['options'][0]]})
+        statuses.append(status)
+    return statuses
+
+
+class TestASGI(unittest.TestCase):
+    def test_concurrent_sessions(self):
+        app = PlayGameApp(max_concurrent_steps=4)
+
+        async def play_sessions():
+            return await asyncio.gather(*(play_session(app, seed, 10) for seed in range(8)))
+
+        for statuses in asyncio.run(play_sessions()):
+            self.assertEqual(set(statuses), {200})
+        self.assertEqual(len(app.game_sessions), 8)
+
+    def test_batched_sessions(self):
+        app = PlayGameApp()
+
+        async def play_batch():
+            starts = [(await post(app, '/play_game', {'seed': seed}))[2] for seed in range(3)]
+            return await post(app, '/play_game', {'requests': [
+                {'session_id': start['session_id'], 'actions': ['end_turn', 'end_turn']} for start in starts]})
+
+        status, _, response_json = asyncio.run(play_batch())
+        self.assertEqual(status, 200)
+        self.assertEqual([session_response['status'] for session_response in response_json['responses']],
+                         [200, 200, 200])
+
+    def test_pipelined_responses_are_detached(self):
+        app = PlayGameApp()
+
+        async def play_pipelined():
+            start = (await post(app, '/play_game', {'seed': 1}))[2]
+            step_request = {'session_id': start['session_id'], 'action': ['end_turn']}
+            first_json, _ = await app.play_game(step_request)
+            first_state = json.loads(json.dumps(first_json['game']))
+            await app.play_game(step_request)
+            return first_json, first_state
+
+        first_json, first_state = asyncio.run(play_pipelined())
+        self.assertEqual(json.loads(json.dumps(first_json['game'])), first_state)
+
+    def test_invalid_batches(self):
+        app = PlayGameApp()
+        status, _, _ = asyncio.run(post(app, '/play_game', {'requests': 5}))
+        self.assertEqual(status, 400)
+        status, _, response_json = asyncio.run(post(app, '/play_game', {'requests': [
+            'x', {'requests': [{}]}, {'seed': 1}]}))
+        self.assertEqual(status, 200)
+        self.assertEqual([session_response['status'] for session_response in response_json['responses']],
+                         [400, 400, 200])
+
+    def test_malformed_actions(self):
+        app = PlayGameApp()
+
+        async def play_malformed_actions():
+            start = (await post(app, '/play_game', {'seed': 1}))[2]
+            malformed_requests = [{'action': [{'x': 1}]}, {'action': 5}, {'action': 'end_turn'},
+                                  {'actions': [['end_turn']]}, {'actions': [{'x': 1}]}, {'actions': 5}]
+            return [(await post(app, '/play_game', {'session_id': start['session_id'], **malformed_request}))[0]
+                    for malformed_request in malformed_requests]
+
+        self.assertEqual(asyncio.run(play_malformed_actions()), [400] * 6)
+
+    def test_errors(self):
+        app = PlayGameApp()
+        status, _, _ = asyncio.run(post(app, '/not_a_route', {}))
+        self.assertEqual(status, 404)
+        status, _, _ = asyncio.run(post(app, '/play_game', {'action': ['end_turn']}))
+        self.assertEqual(status, 400)
+        status, _, _ = asyncio.run(post(app, '/play_game', {'session_id': 'not_a_session', 'action': ['end_turn']}))
+        self.assertEqual(status, 404)
+
+    def test_backpressure(self):
+        app = PlayGameApp(max_pending_requests=0)
+        status, headers, response_json = asyncio.run(post(app, '/play_game', {'seed': 1}))
+        self.assertEqual(status, 503)
+        self.assertEqual(headers[b'retry-after'], b'1')
+
+    def test_lifespan_runs_transcript_writer(self):
+        self.assertIsNone(transcripts.transcript_writer)
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        app = PlayGameApp(transcript_directory=directory)
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            if not messages[0]['type'].endswith('startup'):
+                start = await post(app, '/play_game', {'seed': 1})
+                sent.append(start[2]['session_id'])
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(app({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent[0], 'lifespan.startup.complete')
+        self.assertEqual(sent[-1], 'lifespan.shutdown.complete')
+        self.assertTrue((directory / f"transcript_{sent[1]}.jsonl").exists())
+        self.assertIsNone(transcripts.transcript_writer)
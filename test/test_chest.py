@@ -4,6 +4,7 @@ import random
 
 from fake_the_spire.chest import Chest
 from fake_the_spire import FloorOver
+from fake_the_spire.entity_ids import entity_name
 
 logging.basicConfig(level=logging.INFO)
 
@@ -32,8 +33,7 @@ class TestChest(unittest.TestCase):
         chest = Chest(game_state)
         relic_to_choose = chest.chest["relics"][0]
         chest.take_action(f'relics {relic_to_choose}')
-        first_dash_index = relic_to_choose.find('-')
-        relic_to_choose = relic_to_choose[:first_dash_index]
+        relic_to_choose = entity_name(relic_to_choose)
         self.assertIn(relic_to_choose, game_state['player']['relics'])
 
     def test_take_gold(self):
@@ -1,5 +1,6 @@
 import unittest
 import logging
+from collections import Counter
 
 from fake_the_spire.game import GameOver, FloorOver
 from fake_the_spire.combat import Combat
@@ -543,7 +544,7 @@ class TestCombat(unittest.TestCase):
         discard_id = get_key_by_substring(combat.player['discard_pile'], 'headbutt')
         headbutt_id = get_key_by_substring(combat.player['hand'], 'headbutt')
         combat.take_action(f"play {headbutt_id} {enemy_id} {discard_id}")
-        self.assertIn(discard_id, combat.player['top_of_deck_ids'])
+        self.assertIn(discard_id, combat.player['draw_pile'].top_ids)
         self.assertIn(discard_id, combat.player['draw_pile'])
         self.assertNotIn(discard_id, combat.player['discard_pile'])
         combat.take_action("end_turn")
@@ -775,7 +776,7 @@ class TestCombat(unittest.TestCase):
         self.assertIn(f"play {warcry_id} {strike_id}", combat.get_new_options())
         self.assertNotIn(f"play {warcry_id} {warcry_id}", combat.get_new_options())
         combat.take_action(f"play {warcry_id} {strike_id}")
-        self.assertIn(strike_id, combat.player['top_of_deck_ids'])
+        self.assertIn(strike_id, combat.player['draw_pile'].top_ids)
         self.assertIn(strike_id, combat.player['draw_pile'])
         self.assertNotIn(strike_id, combat.player['hand'])
         self.assertIn(warcry_id, combat.player['exhaust_pile'])
@@ -857,6 +858,77 @@ class TestCombat(unittest.TestCase):
         combat.take_action(f"play {blood_for_blood_id} {enemy_id}")
         self.assertEqual(combat.enemy_list[0]['hp'], 82)
 
+    def test_option_tuples(self):
+        game_state = {
+            "floor_num": 1,
+            "act": 1,
+            "player": {
+                "deck": {
+                    "blood_for_blood": 5,
+                },
+                "hp": 100,
+                "max_energy": 3,
+                "max_hp": 100,
+                "potions": {}
+            }
+        }
+        combat = Combat(game_state, ['louse'])
+        combat.take_action("end_turn")
+        enemy_id = combat.enemy_list[0]['id']
+        option_tuples = combat.get_new_option_tuples()
+        self.assertIn(('end_turn',), option_tuples)
+        self.assertEqual(combat.get_new_options(), [' '.join(option) for option in option_tuples])
+        self.assertEqual(combat.get_new_option_tuples(), option_tuples)
+        blood_for_blood_id = get_key_by_substring(combat.player['hand'], 'blood_for_blood')
+        self.assertIn(('play', blood_for_blood_id, enemy_id), option_tuples)
+        self.assertEqual(combat.get_card_energy_cost(combat.player['hand'][blood_for_blood_id]), 3)
+
+    def test_enemy_lookup_by_id(self):
+        game_state = {
+            "floor_num": 1,
+            "act": 1,
+            "player": {
+                "deck": {
+                    "strike": 5,
+                },
+                "hp": 100,
+                "max_energy": 3,
+                "max_hp": 100,
+                "potions": {}
+            }
+        }
+        combat = Combat(game_state, ['louse', 'jaw_worm'])
+        for enemy in combat.enemy_list:
+            self.assertIs(combat.get_enemy_by_id(enemy['id']), enemy)
+            self.assertIs(combat.get_character(enemy['id']), enemy)
+        self.assertIs(combat.get_character('player'), combat.player)
+        combat.spawn_enemy(['louse'])
+        spawned_enemy = combat.enemy_list[-1]
+        self.assertIs(combat.get_enemy_by_id(spawned_enemy['id']), spawned_enemy)
+
+    def test_cards_share_templates(self):
+        game_state = {
+            "floor_num": 1,
+            "act": 1,
+            "player": {
+                "deck": {
+                    "blood_for_blood": 2,
+                },
+                "hp": 100,
+                "max_energy": 3,
+                "max_hp": 100,
+                "potions": {}
+            }
+        }
+        combat = Combat(game_state, ['louse'])
+        first_card, second_card = combat.player['hand'].values()
+        self.assertIs(first_card.template, second_card.template)
+        first_card['energy_cost'] -= 1
+        self.assertEqual(first_card['energy_cost'], 3)
+        self.assertEqual(second_card['energy_cost'], 4)
+        for card_dict in combat.to_dict()['player']['hand'].values():
+            self.assertEqual(card_dict['name'], 'blood_for_blood')
+
     def test_bloodletting(self):
         game_state = {
             "floor_num": 1,
@@ -2249,3 +2321,29 @@ class TestCombat(unittest.TestCase):
         upgraded_strike = get_key_by_substring(combat.player['hand'], 'strike_plus')
         self.assertIsNotNone(upgraded_strike)
         self.assertIn(armaments_id, combat.player['discard_pile'])
+
+    def test_action_counts(self):
+        game_state = {
+            "floor_num": 1,
+            "act": 1,
+            "player": {
+                "deck": {
+                    "strike": 5
+                },
+                "hp": 5,
+                "max_energy": 3,
+                "max_hp": 5,
+                "potions": {}
+            }
+        }
+        action_counts = Counter()
+        combat = Combat(game_state, ['louse'], action_counts=action_counts)
+        self.assertEqual(action_counts['draw'], 5)
+        enemy_id = combat.enemy_list[0]['id']
+        strike_id = get_key_by_substring(combat.player['hand'], 'strike')
+        combat.take_action(f"play {strike_id} {enemy_id}")
+        self.assertEqual(action_counts['play'], 1)
+        self.assertEqual(action_counts['attack'], 1)
+        self.assertEqual(action_counts['gain_energy'], 2)
+        self.assertFalse({'draw_card', 'add_energy'} & set(action_counts))
+        self.assertEqual(Combat(game_state, ['louse']).action_counts['play'], 0)
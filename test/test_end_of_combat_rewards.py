@@ -2,6 +2,7 @@ import unittest
 import logging
 
 from fake_the_spire.end_of_combat_reward import EndOfCombatReward
+from fake_the_spire.entity_ids import entity_name
 
 logging.basicConfig(level=logging.INFO)
 
@@ -29,8 +30,7 @@ class TestEndOfCombatReward(unittest.TestCase):
         end_of_combat_reward = EndOfCombatReward(game_state, combat_type='hallway', card_reward_count=1)
         random_card_option = end_of_combat_reward.rewards_dict['cards_0'][0]
         end_of_combat_reward.take_action(f"cards {random_card_option}")
-        first_dash_index = random_card_option.find('-')
-        card_name = random_card_option[:first_dash_index]
+        card_name = entity_name(random_card_option)
         self.assertIn(card_name, game_state['player']['deck'].keys())
 
     def test_get_potion_reward(self):
@@ -57,8 +57,7 @@ class TestEndOfCombatReward(unittest.TestCase):
         end_of_combat_reward = EndOfCombatReward(game_state, combat_type='hallway', card_reward_count=1)
         random_potion_option = end_of_combat_reward.rewards_dict['potions'][0]
         end_of_combat_reward.take_action(f"potions {random_potion_option}")
-        first_dash_index = random_potion_option.find('-')
-        random_potion_option = random_potion_option[:first_dash_index]
+        random_potion_option = entity_name(random_potion_option)
         self.assertIn(random_potion_option, game_state['player']['potions'])
 
     def test_no_potion_on_0_pct_chance(self):
@@ -110,8 +109,7 @@ class TestEndOfCombatReward(unittest.TestCase):
         end_of_combat_reward = EndOfCombatReward(game_state, combat_type='elite', card_reward_count=1)
         relic_name = end_of_combat_reward.rewards_dict['relics'][0]
         end_of_combat_reward.take_action(f"relics {relic_name}")
-        first_dash_index = relic_name.find('-')
-        relic_name = relic_name[:first_dash_index]
+        relic_name = entity_name(relic_name)
         self.assertIn(relic_name, game_state['player']['relics'])
 
     def test_gain_too_many_potions(self):
@@ -137,8 +135,7 @@ class TestEndOfCombatReward(unittest.TestCase):
         end_of_combat_reward = EndOfCombatReward(game_state, combat_type='hallway', card_reward_count=1)
         potion_id = end_of_combat_reward.rewards_dict['potions'][0]
         end_of_combat_reward.take_action(f"potions {potion_id}")
-        first_dash_index = potion_id.find('-')
-        potion_name = potion_id[:first_dash_index]
+        potion_name = entity_name(potion_id)
         new_options = end_of_combat_reward.get_new_options()
         self.assertIn(potion_name, game_state['player']['potions'])
         self.assertNotIn("end", new_options)
@@ -169,8 +166,7 @@ class TestEndOfCombatReward(unittest.TestCase):
         end_of_combat_reward = EndOfCombatReward(game_state, combat_type='hallway', card_reward_count=1)
         potion_name = end_of_combat_reward.rewards_dict['potions'][0]
         end_of_combat_reward.take_action(f"potions {potion_name}")
-        first_dash_index = potion_name.find('-')
-        potion_name = potion_name[:first_dash_index]
+        potion_name = entity_name(potion_name)
         self.assertIn(potion_name, game_state['player']['potions'])
 
     def test_multiple_card_rewards(self):
@@ -196,11 +192,9 @@ class TestEndOfCombatReward(unittest.TestCase):
         random_card_option_1 = end_of_combat_reward.rewards_dict['cards_1'][0]
         end_of_combat_reward.take_action(f"cards {random_card_option_0}")
         end_of_combat_reward.take_action(f"cards {random_card_option_1}")
-        first_dash_index_0 = random_card_option_0.find('-')
-        card_name_0 = random_card_option_0[:first_dash_index_0]
+        card_name_0 = entity_name(random_card_option_0)
         self.assertIn(card_name_0, game_state['player']['deck'].keys())
-        first_dash_index_1 = random_card_option_1.find('-')
-        card_name_1 = random_card_option_1[:first_dash_index_1]
+        card_name_1 = entity_name(random_card_option_1)
         self.assertIn(card_name_1, game_state['player']['deck'].keys())
 
 
@@ -0,0 +1,33 @@
+import unittest
+import logging
+import random
+
+from fake_the_spire.game import Game
+
+logging.basicConfig(level=logging.INFO)
+
+
+def describe_combat(game: Game) -> tuple:
+    hand_names = [card['name'] for card in game.floor.player['hand'].values()]
+    enemies = [(enemy['name'], enemy['intent']) for enemy in game.floor.enemy_list]
+    return hand_names, enemies
+
+
+class TestEndToEnd(unittest.TestCase):
+    def test_same_seed_same_game(self):
+        random.seed(1)
+        first_game = Game('character', seed=5)
+        random.seed(2)
+        second_game = Game('character', seed=5)
+        self.assertEqual(describe_combat(first_game), describe_combat(second_game))
+        first_game.action_initiate(['end_turn'])
+        second_game.action_initiate(['end_turn'])
+        self.assertEqual(describe_combat(first_game), describe_combat(second_game))
+        self.assertEqual(first_game.game_state['player']['hp'], second_game.game_state['player']['hp'])
+
+    def test_same_seed_same_ids(self):
+        first_game = Game('character', seed=5)
+        second_game = Game('character', seed=5)
+        self.assertEqual(first_game.current_options, second_game.current_options)
+        enemy_id = first_game.floor.enemy_list[0]['id']
+        self.assertEqual(enemy_id.name, first_game.floor.enemy_list[0]['name'])
@@ -0,0 +1,21 @@
+import unittest
+import logging
+
+from fake_the_spire.entity_ids import EntityId, IdAllocator, entity_name
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TestEntityIds(unittest.TestCase):
+    def test_entity_name(self):
+        self.assertEqual(entity_name('du-vu_doll-12'), 'du-vu_doll')
+        self.assertEqual(entity_name('strike-3'), 'strike')
+        self.assertEqual(entity_name('du-vu_doll'), 'du-vu_doll')
+
+    def test_allocate(self):
+        ids = IdAllocator()
+        first_id = ids.allocate('du-vu_doll')
+        self.assertIsInstance(first_id, EntityId)
+        self.assertEqual(first_id, 'du-vu_doll-1')
+        self.assertEqual((first_id.name, first_id.number), ('du-vu_doll', 1))
+        self.assertEqual(ids.allocate('strike'), 'strike-2')
@@ -0,0 +1,41 @@
+import unittest
+import logging
+
+import numpy as np
+
+from fake_the_spire.game import Game
+from fake_the_spire.observation import ObservationEncoder, ObservationLayout, encode_observation
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TestObservation(unittest.TestCase):
+    def test_encode_start_of_game(self):
+        game = Game('character', seed=5)
+        layout = ObservationLayout.get_instance()
+        observation = encode_observation(game)
+        self.assertEqual(observation.shape, (layout.size,))
+        self.assertEqual(observation[layout.sections['player']][0], game.game_state['player']['hp'])
+        deck = observation[layout.sections['deck']]
+        self.assertEqual(deck[layout.card_index['strike']], 5)
+        self.assertEqual(deck.sum(), 10)
+        piles = sum(observation[layout.sections[pile_name]].sum() for pile_name in ('hand', 'draw_pile'))
+        self.assertEqual(piles, 10)
+        self.assertEqual(observation[layout.sections['relics']][layout.relic_index['burning_blood']], 1)
+        enemies = observation[layout.sections['enemies']].reshape(-1, layout.enemy_width)
+        self.assertEqual(enemies[:, 0].sum(), len(game.floor.enemy_list))
+
+    def test_incremental_encode_matches_fresh_encode(self):
+        game = Game('character', seed=5)
+        batch = np.zeros((2, ObservationLayout.get_instance().size), dtype=np.float32)
+        encoder = ObservationEncoder(out=batch[1])
+        encoder.encode(game)
+        for _ in range(3):
+            game.action_initiate(['end_turn'])
+            encoder.encode(game)
+            self.assertTrue(np.array_equal(batch[1], encode_observation(game)))
+        self.assertFalse(batch[0].any())
+
+    def test_wrong_buffer_shape(self):
+        with self.assertRaises(ValueError):
+            ObservationEncoder(out=np.zeros(3, dtype=np.float32))
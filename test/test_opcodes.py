@@ -0,0 +1,66 @@
+import random
+import unittest
+import logging
+
+from fake_the_spire.combat import Combat
+from fake_the_spire.opcodes import Op, TargetSelector, Verb, compile_action, compile_action_list
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TestOpcodes(unittest.TestCase):
+    def test_value_and_args(self):
+        self.assertEqual(compile_action('apply block 5', 'self'),
+                         Op(Verb.APPLY, 5, ('block',), TargetSelector.SELF, 'self'))
+        self.assertEqual(compile_action('attack 6', 'enemy'), Op(Verb.ATTACK, 6, (), TargetSelector.ENEMY, 'enemy'))
+        self.assertEqual(compile_action('apply strength -2', 'enemy').value, -2)
+        self.assertEqual(compile_action('add wound discard_pile', 'self').args, ('wound', 'discard_pile'))
+        self.assertEqual(compile_action('draw', 'self').value, 0)
+
+    def test_last_number_is_the_value(self):
+        op = compile_action('attack 2 3', 'enemy')
+        self.assertEqual((op.value, op.args), (3, ()))
+
+    def test_every_target_selector(self):
+        for selector in TargetSelector:
+            if selector == TargetSelector.UNKNOWN:
+                continue
+            op = compile_action('attack 1', selector.word)
+            self.assertEqual((op.target, op.target_name), (selector, selector.word))
+
+    def test_unknown_target_keeps_its_name(self):
+        op = compile_action('attack 1', 'all_hand')
+        self.assertEqual((op.target, op.target_name), (TargetSelector.UNKNOWN, 'all_hand'))
+
+    def test_unknown_verb(self):
+        op = compile_action('teleport far 3', 'self')
+        self.assertEqual(op, Op(Verb.INVALID, 0, ('teleport', 'far', '3'), TargetSelector.UNKNOWN, 'self'))
+
+    def test_compile_action_list(self):
+        self.assertEqual(compile_action_list([['attack 6', 'enemy'], ['apply vulnerable 2', 'enemy']]),
+                         (Op(Verb.ATTACK, 6, (), TargetSelector.ENEMY, 'enemy'),
+                          Op(Verb.APPLY, 2, ('vulnerable',), TargetSelector.ENEMY, 'enemy')))
+        self.assertEqual(compile_action_list([]), ())
+
+    def test_target_tokens(self):
+        target_dict = {'enemy': ['cultist-1', 'louse-2'], 'hand': ['strike-3', 'bash-4'],
+                       'discard_pile': ['defend-5'], 'card': 'bash-4', 'exhaust': ['wound-6']}
+        expected_tokens = {
+            TargetSelector.SELF: [('player',)],
+            TargetSelector.HAND: [('strike-3', 'bash-4')],
+            TargetSelector.DISCARD_PILE: [('defend-5',)],
+            TargetSelector.ENEMY: [('cultist-1',), ('louse-2',)],
+            TargetSelector.SELF_CARD: [('bash-4',)],
+            TargetSelector.RANDOM_HAND: [('strike-3',)],
+            TargetSelector.SELF_CARD_ENEMY: [('bash-4', 'cultist-1'), ('bash-4', 'louse-2')],
+            TargetSelector.EXHAUST: [('wound-6',)],
+        }
+        for selector, tokens in expected_tokens.items():
+            op = compile_action('attack 1', selector.word)
+            self.assertEqual(Combat.generate_target_token_list(op, {**target_dict, 'hand': list(target_dict['hand'])}),
+                             tokens, selector)
+        op = compile_action('attack 1', 'random_enemy')
+        self.assertIn(Combat.generate_target_token_list(op, target_dict, random.Random(1))[0],
+                      [('cultist-1',), ('louse-2',)])
+        with self.assertRaises(KeyError):
+            Combat.generate_target_token_list(compile_action('attack 1', 'all_hand'), target_dict)
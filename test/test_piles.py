@@ -0,0 +1,37 @@
+import unittest
+import logging
+import random
+
+from fake_the_spire.piles import Pile
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TestPiles(unittest.TestCase):
+    def test_swap_remove_keeps_index(self):
+        pile = Pile({f'strike-{number}': number for number in range(5)})
+        del pile['strike-1']
+        self.assertEqual(len(pile), 4)
+        self.assertNotIn('strike-1', pile)
+        for card_id, card in pile.items():
+            self.assertEqual(card_id, f'strike-{card}')
+            self.assertEqual(pile.card_ids[pile.slots[card_id]], card_id)
+
+    def test_top_of_pile_is_drawn_first(self):
+        pile = Pile({f'strike-{number}': number for number in range(5)})
+        pile.put_on_top('bash-5', 5)
+        pile.put_on_top('defend-6', 6)
+        self.assertEqual(pile.peek_next_id(random), 'defend-6')
+        pile.pop('defend-6')
+        self.assertEqual(pile.peek_next_id(random), 'bash-5')
+        pile.pop('bash-5')
+        self.assertIn(pile.peek_next_id(random), pile)
+
+    def test_shuffle_in(self):
+        draw_pile = Pile()
+        discard_pile = Pile({'strike-1': 1, 'strike-2': 2})
+        draw_pile.shuffle_in(discard_pile)
+        self.assertEqual(len(discard_pile), 0)
+        self.assertEqual(dict(draw_pile), {'strike-1': 1, 'strike-2': 2})
+        discard_pile['strike-3'] = 3
+        self.assertNotIn('strike-3', draw_pile)
@@ -0,0 +1,68 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import logging
+from pathlib import Path
+from unittest import mock
+
+from fake_the_spire import reference_bundle
+from fake_the_spire.config import config
+from fake_the_spire.reference_bundle import (build_reference_bundle, get_reference_toml_paths, load_reference_bundle,
+                                             read_reference_bundle, validate_reference_data)
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TestReferenceBundle(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = Path(tempfile.mkdtemp())
+        self.paths = tuple(Path(shutil.copy(path, self.data_dir)) for path in get_reference_toml_paths())
+        self.bundle_path = self.data_dir / config.REFERENCE_BUNDLE_NAME
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def test_bundle_round_trip(self):
+        built_data = build_reference_bundle(self.paths, self.bundle_path)
+        self.assertEqual(read_reference_bundle(self.paths, self.bundle_path), built_data)
+        self.assertIn('strike', built_data[self.paths[0]]['cards'])
+
+    def test_touched_source_keeps_bundle(self):
+        build_reference_bundle(self.paths, self.bundle_path)
+        os.utime(self.paths[0], ns=(0, 0))
+        self.assertIsNotNone(read_reference_bundle(self.paths, self.bundle_path))
+        with mock.patch.object(reference_bundle, 'hash_file', side_effect=AssertionError("hashed a source")):
+            self.assertIsNotNone(read_reference_bundle(self.paths, self.bundle_path))
+
+    def test_changed_source_rebuilds_bundle(self):
+        build_reference_bundle(self.paths, self.bundle_path)
+        with open(self.paths[3], 'a') as relic_file:
+            relic_file.write("\n[relics.test_relic]\nrarity = 'common'\ncolor = 'colorless'\n")
+        self.assertIsNone(read_reference_bundle(self.paths, self.bundle_path))
+        self.assertIn('test_relic', load_reference_bundle(self.paths, self.bundle_path)[self.paths[3]]['relics'])
+        self.assertIsNotNone(read_reference_bundle(self.paths, self.bundle_path))
+
+    def test_incomplete_bundle_rebuilds(self):
+        build_reference_bundle(self.paths, self.bundle_path)
+        with open(self.bundle_path, 'rb') as bundle_file:
+            bundle = pickle.load(bundle_file)
+        del bundle['data']
+        with open(self.bundle_path, 'wb') as bundle_file:
+            pickle.dump(bundle, bundle_file)
+        self.assertIsNone(read_reference_bundle(self.paths, self.bundle_path))
+        self.assertIn('strike', load_reference_bundle(self.paths, self.bundle_path)[self.paths[0]]['cards'])
+        self.assertIsNotNone(read_reference_bundle(self.paths, self.bundle_path))
+
+    def test_missing_bundle(self):
+        self.assertIsNone(read_reference_bundle(self.paths, self.bundle_path))
+
+    def test_validation(self):
+        all_data = {'cards': {'strike': {'type': 'attack'}}, 'enemies': {}, 'potions': {}, 'relics': {},
+                    'combats': {}}
+        with self.assertRaises(ValueError):
+            validate_reference_data(all_data)
+        all_data['cards'] = {}
+        all_data['combats'] = {'cultists': {'act': 1, 'combat_type': 'hallway', 'enemies': ['cultist'], 'weight': 1}}
+        self.assertEqual(len(validate_reference_data(all_data)), 1)
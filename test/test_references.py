@@ -0,0 +1,52 @@
+import random
+import unittest
+import logging
+
+from fake_the_spire.entity_ids import IdAllocator, entity_name
+from fake_the_spire.references import CardReference, WeightedSampler, get_weighted_sampler
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TestWeightedSampler(unittest.TestCase):
+    def test_same_draws_as_random_choices(self):
+        names = ['common', 'uncommon', 'rare', 'never', 'shop']
+        for weights in ([.6, .37, .03, 0, 0], [1, 2, 3, 0, 4], [0, 0, 5, 0, 0]):
+            sampler = WeightedSampler(names, weights)
+            sampler_rng = random.Random(17)
+            choices_rng = random.Random(17)
+            for _ in range(2000):
+                self.assertEqual(sampler.sample(sampler_rng), choices_rng.choices(names, weights)[0])
+
+    def test_cached_sampler(self):
+        probability_dict = {'hallway': .8, 'elite': .2}
+        self.assertIs(get_weighted_sampler(probability_dict), get_weighted_sampler(dict(probability_dict)))
+        self.assertIsNot(get_weighted_sampler(probability_dict), get_weighted_sampler({'hallway': .5, 'elite': .5}))
+
+    def test_no_weight(self):
+        with self.assertRaises(ValueError):
+            WeightedSampler([], [])
+        with self.assertRaises(ValueError):
+            WeightedSampler(['common', 'rare'], [0, 0])
+        with self.assertRaises(ValueError):
+            get_weighted_sampler({})
+
+
+class TestReferenceQueries(unittest.TestCase):
+    def test_card_query_matches_exact_rarity(self):
+        card_reference = CardReference.get_instance()
+        card_names = card_reference.query_entity_names([("rarity", "uncommon"), ("color", "red"), ("type", "attack")])
+        self.assertGreater(len(card_names), 0)
+        for card_name in card_names:
+            card = card_reference.all_entities[card_name]
+            self.assertEqual(card['rarity'], 'uncommon')
+            self.assertEqual(card['type'], 'attack')
+
+    def test_mint_only_the_chosen_entity(self):
+        card_reference = CardReference.get_instance()
+        card_names = card_reference.query_entity_names([("rarity", "rare"), ("color", "colorless")])
+        ids = IdAllocator()
+        card_id, card = card_reference.mint_entity(card_names[0], ids)
+        self.assertEqual(entity_name(card_id), card_names[0])
+        self.assertIs(card, card_reference.all_entities[card_names[0]])
+        self.assertEqual(ids.next_number, 2)
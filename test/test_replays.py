@@ -0,0 +1,99 @@
+import io
+import json
+import random
+import unittest
+import logging
+from unittest import mock
+
+from fake_the_spire import GameOver
+from fake_the_spire.game import Game
+from fake_the_spire.replays import ReplayReader
+from fake_the_spire.rng import GameRandom
+from fake_the_spire.state_delta import copy_state
+
+logging.basicConfig(level=logging.INFO)
+
+
+def play_recorded_game(replay_file, num_actions: int, checkpoint_interval: int) -> list[dict]:
+    rng = random.Random(5)
+    game = Game('character', seed=5)
+    writer = game.record_replay(replay_file, checkpoint_interval=checkpoint_interval)
+    states = [copy_state(game.to_dict())]
+    try:
+        for _ in range(num_actions):
+            game.action_initiate([rng.choice(game.current_options)])
+            states.append(copy_state(game.to_dict()))
+        writer.close()
+    except GameOver:
+        pass
+    return states
+
+
+class TestReplays(unittest.TestCase):
+    def test_seek_to_any_step(self):
+        replay_file = io.BytesIO()
+        states = play_recorded_game(replay_file, 25, checkpoint_interval=10)
+        replay_file.seek(0)
+        replay = ReplayReader(replay_file)
+        self.assertEqual(replay.seed, 5)
+        self.assertEqual(len(replay), len(states) - 1)
+        self.assertEqual(len(replay.checkpoint_frames), 3)
+        for step in (0, 7, 10, 19, len(replay)):
+            self.assertEqual(replay.game_at(step).to_dict(), states[step])
+
+    def test_checkpoints_are_plain_data(self):
+        replay_file = io.BytesIO()
+        play_recorded_game(replay_file, 25, checkpoint_interval=10)
+        replay_file.seek(0)
+        replay = ReplayReader(replay_file)
+        checkpoint = json.loads(replay.read_payload(replay.checkpoint_frames[1]))
+        self.assertEqual((checkpoint['format'], checkpoint['seed']), (1, 5))
+
+    def test_checkpoint_round_trip(self):
+        game = Game('character', seed=5)
+        rng = random.Random(5)
+        for _ in range(12):
+            game.action_initiate([rng.choice(game.current_options)])
+        with mock.patch.object(Game, 'initialize_game', side_effect=AssertionError("started a combat")):
+            restored_game = Game.from_checkpoint(json.loads(json.dumps(game.checkpoint())))
+        self.assertEqual(restored_game.to_dict(), game.to_dict())
+        self.assertEqual(restored_game.action_counts, game.action_counts)
+        self.assertEqual(restored_game.current_options, game.current_options)
+        self.assertIsInstance(restored_game.rng, GameRandom)
+        self.assertEqual(restored_game.rng.getstate(), game.rng.getstate())
+        option = rng.choice(game.current_options)
+        game.action_initiate([option])
+        restored_game.action_initiate([option])
+        self.assertEqual(restored_game.to_dict(), game.to_dict())
+
+    def test_unloadable_checkpoint_replays_from_seed(self):
+        replay_file = io.BytesIO()
+        states = play_recorded_game(replay_file, 25, checkpoint_interval=10)
+        replay_file.seek(0)
+        replay = ReplayReader(replay_file)
+        with mock.patch.object(Game, 'from_checkpoint', side_effect=ValueError("Unsupported checkpoint format 0")):
+            self.assertEqual(replay.game_at(19).to_dict(), states[19])
+
+    def test_game_over_writes_end(self):
+        replay_file = io.BytesIO()
+        game = Game('character', seed=5)
+        game.record_replay(replay_file)
+        with self.assertRaises(GameOver):
+            for _ in range(500):
+                game.action_initiate(['end_turn'])
+        self.assertIsNone(game.replay_writer)
+        replay_file.seek(0)
+        replay = ReplayReader(replay_file)
+        self.assertEqual(replay.end, {'steps': len(replay), 'won': False})
+        self.assertEqual(replay.game_at(len(replay)).game_state['player']['hp'], game.game_state['player']['hp'])
+
+    def test_truncated_replay(self):
+        replay_file = io.BytesIO()
+        play_recorded_game(replay_file, 25, checkpoint_interval=10)
+        replay = ReplayReader(io.BytesIO(replay_file.getvalue()[:-3]))
+        self.assertEqual(len(replay), 20)
+        self.assertIsNone(replay.end)
+
+    def test_not_a_replay(self):
+        with self.assertRaises(ValueError):
+            ReplayReader(io.BytesIO(b'not a replay'))
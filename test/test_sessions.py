@@ -0,0 +1,152 @@
+import unittest
+import logging
+
+from fake_the_spire.game import Game
+from fake_the_spire.sessions import GameSessionStore, SessionNotFound, estimate_game_memory
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TestSessions(unittest.TestCase):
+    def test_sessions_are_independent(self):
+        store = GameSessionStore()
+        first_session = store.create_session(seed=1)
+        second_session = store.create_session(seed=2)
+        self.assertNotEqual(first_session.session_id, second_session.session_id)
+        self.assertIs(store.get_session(first_session.session_id), first_session)
+        self.assertIs(store.get_session(second_session.session_id), second_session)
+        self.assertIsNot(first_session.game, second_session.game)
+
+    def test_least_recently_used_session_is_evicted(self):
+        store = GameSessionStore(max_sessions=2)
+        first_session = store.create_session(seed=1)
+        second_session = store.create_session(seed=2)
+        store.get_session(first_session.session_id)
+        third_session = store.create_session(seed=3)
+        self.assertIn(first_session.session_id, store)
+        self.assertNotIn(second_session.session_id, store)
+        self.assertIn(third_session.session_id, store)
+        with self.assertRaises(SessionNotFound):
+            store.get_session(second_session.session_id)
+
+    def test_idle_session_is_evicted(self):
+        store = GameSessionStore(idle_timeout=60)
+        session = store.create_session(seed=1)
+        session.last_used -= 61
+        with self.assertRaises(SessionNotFound):
+            store.get_session(session.session_id)
+        self.assertEqual(len(store), 0)
+
+    def test_memory_cap_evicts_oldest_sessions(self):
+        store = GameSessionStore(max_memory_bytes=1)
+        first_session = store.create_session(seed=1)
+        second_session = store.create_session(seed=2)
+        self.assertNotIn(first_session.session_id, store)
+        self.assertIn(second_session.session_id, store)
+
+    def test_memory_estimate_follows_game_size(self):
+        game = Game('character', seed=1)
+        estimate = estimate_game_memory(game)
+        self.assertGreater(estimate, 10000)
+        game.game_state['player']['relics'].append('anchor')
+        self.assertGreater(estimate_game_memory(game), estimate)
+        game.floor.player['hand'].clear()
+        self.assertLess(estimate_game_memory(game), estimate)
+
+    def test_play_game_routes_actions_by_session(self):
+        from fake_the_spire.views import app
+        client = app.test_client()
+        first_start = client.post('/play_game', json={'seed': 1}).get_json()
+        second_start = client.post('/play_game', json={'seed': 2}).get_json()
+        action = first_start['options'][0]
+        response = client.post('/play_game', json={'session_id': first_start['session_id'], 'action': [action]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['session_id'], first_start['session_id'])
+        second_response = client.post('/play_game', json={'session_id': second_start['session_id'],
+                                                          'action': [second_start['options'][0]]})
+        self.assertEqual(second_response.status_code, 200)
+        missing_response = client.post('/play_game', json={'action': [action]})
+        self.assertEqual(missing_response.status_code, 400)
+        unknown_response = client.post('/play_game', json={'session_id': 'not_a_session', 'action': [action]})
+        self.assertEqual(unknown_response.status_code, 404)
+
+    def test_play_game_batches_actions(self):
+        from fake_the_spire.views import app
+        client = app.test_client()
+        start = client.post('/play_game', json={'seed': 1}).get_json()
+        first_action = start['options'][0]
+        response = client.post('/play_game', json={'session_id': start['session_id'],
+                                                   'actions': [first_action, 'end_turn', 'not_an_action']})
+        response_json = response.get_json()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['action'] for result in response_json['results']],
+                         [first_action, 'end_turn', 'not_an_action'])
+        self.assertNotIn('error', response_json['results'][1])
+        self.assertEqual(response_json['results'][2]['error'], 'Invalid action')
+
+    def test_play_game_batches_sessions(self):
+        from fake_the_spire.views import app
+        client = app.test_client()
+        first_start = client.post('/play_game', json={'seed': 1}).get_json()
+        second_start = client.post('/play_game', json={'seed': 2}).get_json()
+        response = client.post('/play_game', json={'requests': [
+            {'session_id': first_start['session_id'], 'action': ['end_turn']},
+            {'session_id': second_start['session_id'], 'actions': ['end_turn', 'end_turn']},
+            {'session_id': 'not_a_session', 'action': ['end_turn']}]})
+        responses = response.get_json()['responses']
+        self.assertEqual([session_response['status'] for session_response in responses], [200, 200, 404])
+        self.assertEqual(responses[0]['session_id'], first_start['session_id'])
+        self.assertEqual(len(responses[1]['results']), 2)
+
+    def test_play_game_rejects_invalid_batches(self):
+        from fake_the_spire.views import app
+        client = app.test_client()
+        self.assertEqual(client.post('/play_game', json={'requests': 5}).status_code, 400)
+        self.assertEqual(client.post('/play_game', json=['end_turn']).status_code, 400)
+        response = client.post('/play_game', json={'requests': ['x', {'requests': [{}]}, {'seed': 1}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([session_response['status'] for session_response in response.get_json()['responses']],
+                         [400, 400, 200])
+
+    def test_play_game_game_over_state(self):
+        from fake_the_spire.state_delta import apply_delta
+        from fake_the_spire.views import app
+        client = app.test_client()
+        response_json = client.post('/play_game', json={'seed': 1, 'delta': True}).get_json()
+        client_state = response_json['game']
+        for _ in range(500):
+            response_json = client.post('/play_game', json={
+                'session_id': response_json['session_id'], 'delta': True,
+                'state_version': response_json['state_version'], 'action': ['end_turn']}).get_json()
+            client_state = apply_delta(client_state, response_json['delta'])
+            if 'game_over' in response_json:
+                break
+        self.assertIn('game_over', response_json)
+        self.assertIn('state_version', response_json)
+        self.assertLessEqual(client_state['game_state']['player']['hp'], 0)
+
+    def test_play_game_response_is_detached(self):
+        from fake_the_spire.api import play_game_request
+        from fake_the_spire.state_delta import copy_state
+        game_sessions = GameSessionStore()
+        start_json, _ = play_game_request(game_sessions, {'seed': 1})
+        start_state = copy_state(start_json['game'])
+        play_game_request(game_sessions, {'session_id': start_json['session_id'], 'action': ['end_turn']})
+        self.assertEqual(start_json['game'], start_state)
+        self.assertNotEqual(start_state, game_sessions.get_session(start_json['session_id']).game.to_dict())
+
+    def test_play_game_delta_responses(self):
+        from fake_the_spire.state_delta import apply_delta, copy_state
+        from fake_the_spire.views import app, game_sessions
+        client = app.test_client()
+        start = client.post('/play_game', json={'seed': 1, 'delta': True}).get_json()
+        request_json = {'session_id': start['session_id'], 'delta': True, 'state_version': start['state_version'],
+                        'action': ['end_turn']}
+        response_json = client.post('/play_game', json=request_json).get_json()
+        self.assertNotIn('game', response_json)
+        client_state = apply_delta(start['game'], response_json['delta'])
+        server_game = game_sessions.get_session(start['session_id']).game
+        self.assertEqual(client_state, copy_state(server_game.to_dict()))
+        resync_json = client.post('/play_game', json=request_json).get_json()
+        self.assertIn('game', resync_json)
+        self.assertEqual(resync_json['state_version'], response_json['state_version'] + 1)
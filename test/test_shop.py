@@ -4,6 +4,7 @@ import random
 
 from fake_the_spire.shop import Shop
 from fake_the_spire import FloorOver
+from fake_the_spire.entity_ids import entity_name
 
 logging.basicConfig(level=logging.INFO)
 
@@ -34,8 +35,7 @@ class TestShop(unittest.TestCase):
         shop = Shop(game_state)
         random_card_option, cost = shop.shop['cards'][0]
         shop.take_action(f"cards {random_card_option}")
-        first_dash_index = random_card_option.find('-')
-        card_name = random_card_option[:first_dash_index]
+        card_name = entity_name(random_card_option)
         self.assertIn(card_name, game_state['player']['deck'].keys())
         self.assertEqual(game_state['player']['gold'] + cost, 1000)
 
@@ -67,8 +67,7 @@ class TestShop(unittest.TestCase):
         shop = Shop(game_state)
         random_potion_option, cost = shop.shop['potions'][0]
         shop.take_action(f"potions {random_potion_option}")
-        first_dash_index = random_potion_option.find('-')
-        random_potion_option = random_potion_option[:first_dash_index]
+        random_potion_option = entity_name(random_potion_option)
         self.assertIn(random_potion_option, game_state['player']['potions'].keys())
         self.assertEqual(game_state['player']['gold'] + cost, 1000)
 
@@ -132,8 +131,7 @@ class TestShop(unittest.TestCase):
         shop = Shop(game_state)
         random_relic, cost = shop.shop['relics'][0]
         shop.take_action(f"relics {random_relic}")
-        first_dash_index = random_relic.find('-')
-        random_relic = random_relic[:first_dash_index]
+        random_relic = entity_name(random_relic)
         self.assertIn(random_relic, game_state['player']['relics'])
         self.assertEqual(game_state['player']['gold'] + cost, 1000)
 
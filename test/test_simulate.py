@@ -0,0 +1,48 @@
+import random
+import unittest
+import logging
+
+from fake_the_spire.simulate import (play_run, random_policy, greedy_policy, load_policy, simulate_runs,
+                                     simulate_runs_in_parallel, split_seed_range)
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TestSimulate(unittest.TestCase):
+    def test_play_run_record(self):
+        record = play_run(greedy_policy, seed=3)
+        self.assertIn(record['won'], [True, False])
+        self.assertGreaterEqual(record['floor_reached'], 1)
+        self.assertGreater(record['actions'], 0)
+        self.assertEqual(record['hp_curve'][0], 100)
+        self.assertIn('strike', record['deck'])
+        self.assertGreater(record['action_counts']['end_turn'], 0)
+        self.assertGreater(record['action_counts']['draw'], 0)
+
+    def test_same_seed_same_run(self):
+        first_record = play_run(random_policy, seed=11)
+        second_record = play_run(random_policy, seed=11)
+        self.assertEqual(first_record, second_record)
+
+    def test_run_leaves_global_random_alone(self):
+        random.seed(1)
+        global_state = random.getstate()
+        first_record = play_run(random_policy, seed=11)
+        self.assertEqual(random.getstate(), global_state)
+        random.seed(2)
+        self.assertEqual(play_run(random_policy, seed=11), first_record)
+
+    def test_load_policy(self):
+        self.assertIs(load_policy('greedy'), greedy_policy)
+        self.assertIs(load_policy('fake_the_spire.simulate:random_policy'), random_policy)
+        with self.assertRaises(ValueError):
+            load_policy('not_a_policy')
+
+    def test_split_seed_range(self):
+        self.assertEqual(split_seed_range(10, 5, 2), [range(10, 13), range(13, 15)])
+        self.assertEqual(split_seed_range(0, 1, 4), [range(0, 1)])
+
+    def test_parallel_runs_match_sequential_runs(self):
+        sequential_records = list(simulate_runs(4, random_policy, seed=20))
+        parallel_records = list(simulate_runs_in_parallel(4, 'random', num_workers=2, seed=20))
+        self.assertEqual(sorted(parallel_records, key=lambda record: record['seed']), sequential_records)
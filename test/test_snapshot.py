@@ -0,0 +1,64 @@
+import unittest
+import logging
+
+from fake_the_spire import GameOver
+from fake_the_spire.game import Game
+from fake_the_spire.state_delta import copy_state
+
+logging.basicConfig(level=logging.INFO)
+
+
+def play_first_options(game: Game, num_actions: int):
+    try:
+        for _ in range(num_actions):
+            game.action_initiate([game.current_options[0]])
+    except GameOver:
+        pass
+
+
+class TestSnapshot(unittest.TestCase):
+    def test_restore_mid_combat(self):
+        game = Game('character', seed=5)
+        game.action_initiate(['end_turn'])
+        snapshot = game.snapshot()
+        state_before = copy_state(game.to_dict())
+        options_before = list(game.current_options)
+        play_first_options(game, 6)
+        game.restore(snapshot)
+        self.assertEqual(game.to_dict(), state_before)
+        self.assertEqual(game.current_options, options_before)
+
+    def test_branches_replay_identically(self):
+        game = Game('character', seed=5)
+        snapshot = game.snapshot()
+        play_first_options(game, 8)
+        first_branch = copy_state(game.to_dict())
+        game.restore(snapshot)
+        play_first_options(game, 8)
+        self.assertEqual(game.to_dict(), first_branch)
+
+    def test_restore_across_floors(self):
+        game = Game('character', seed=5)
+        combat = game.floor
+        snapshot = game.snapshot()
+        hp_before = game.game_state['player']['hp']
+        for _ in range(100):
+            if game.floor is not combat:
+                break
+            play_first_options(game, 1)
+        game.restore(snapshot)
+        self.assertIs(game.floor, combat)
+        self.assertIs(game.floor.game_state, game.game_state)
+        self.assertEqual(game.game_state['player']['hp'], hp_before)
+
+    def test_unchanged_piles_are_shared(self):
+        game = Game('character', seed=5)
+        first_snapshot = game.snapshot()
+        second_snapshot = game.snapshot()
+        first_piles = first_snapshot.floor_snapshot.floor_state.piles
+        second_piles = second_snapshot.floor_snapshot.floor_state.piles
+        for pile_name, pile_snapshot in first_piles.items():
+            self.assertIs(second_piles[pile_name].cards, pile_snapshot.cards)
+        game.action_initiate(['end_turn'])
+        third_piles = game.snapshot().floor_snapshot.floor_state.piles
+        self.assertIsNot(third_piles['hand'].cards, first_piles['hand'].cards)
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+import unittest
+import logging
+from pathlib import Path
+from unittest import mock
+
+from fake_the_spire.config import find_data_dir
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TestStartup(unittest.TestCase):
+    def test_engine_import_is_light(self):
+        check = ("import sys; import fake_the_spire.game, fake_the_spire.simulate; "
+                 "print(','.join(name for name in ('flask', 'pandas', 'numpy', 'toml') if name in sys.modules))")
+        environment = {**os.environ, 'PYTHONPATH': os.pathsep.join(path for path in sys.path if path)}
+        output = subprocess.run([sys.executable, '-c', check], capture_output=True, text=True, check=True,
+                                env=environment)
+        self.assertEqual(output.stdout.strip(), '')
+
+    def test_data_dir_from_environment(self):
+        with mock.patch.dict(os.environ, {'FAKE_THE_SPIRE_DATA': '/srv/spire_data'}):
+            self.assertEqual(find_data_dir(), Path('/srv/spire_data'))
+
+    def test_data_dir_independent_of_cwd(self):
+        with mock.patch.dict(os.environ, {'FAKE_THE_SPIRE_DATA': ''}):
+            self.assertTrue((find_data_dir() / 'cards.toml').exists())
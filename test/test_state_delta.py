@@ -0,0 +1,29 @@
+import unittest
+import logging
+
+from fake_the_spire.game import Game
+from fake_the_spire.state_delta import apply_delta, copy_state, diff_state
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TestStateDelta(unittest.TestCase):
+    def test_diff_and_apply(self):
+        old_state = {'hp': 10, 'hand': {'strike-1': {'cost': 1}, 'a/b': 1}, 'enemies': [{'hp': 5}, {'hp': 7}],
+                     'relics': ['burning_blood']}
+        new_state = {'hp': 8, 'hand': {'bash-2': {'cost': 2}, 'a/b': 2}, 'enemies': [{'hp': 5}, {'hp': 3}],
+                     'relics': ['burning_blood', 'anchor'], 'gold': 5}
+        delta = diff_state(old_state, new_state)
+        self.assertIn({'op': 'replace', 'path': '/enemies/1/hp', 'value': 3}, delta)
+        self.assertIn({'op': 'replace', 'path': '/hand/a~1b', 'value': 2}, delta)
+        self.assertEqual(apply_delta(copy_state(old_state), delta), new_state)
+        self.assertEqual(diff_state(new_state, copy_state(new_state)), [])
+
+    def test_game_deltas_rebuild_state(self):
+        game = Game('character', seed=2)
+        client_state = copy_state(game.to_dict())
+        for _ in range(20):
+            server_state = copy_state(game.to_dict())
+            game.action_initiate([game.current_options[0]])
+            client_state = apply_delta(client_state, diff_state(server_state, game.to_dict()))
+            self.assertEqual(client_state, copy_state(game.to_dict()))
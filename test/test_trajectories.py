@@ -0,0 +1,117 @@
+import io
+import random
+import shutil
+import tempfile
+import unittest
+import logging
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from fake_the_spire import GameOver
+from fake_the_spire.game import Game
+from fake_the_spire.observation import encode_observation
+from fake_the_spire.replays import ReplayReader
+from fake_the_spire.simulate import greedy_policy, random_policy
+from fake_the_spire.trajectories import (TrajectoryDataset, TrajectoryWriter, export_replay, export_run,
+                                         get_action_index, write_game_steps)
+from fake_the_spire.vector_game import LOSS_REWARD
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TestTrajectories(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp()) / 'trajectories'
+
+    def tearDown(self):
+        shutil.rmtree(self.directory.parent)
+
+    def test_export_run(self):
+        with TrajectoryWriter(self.directory, chunk_size=64) as writer:
+            self.assertFalse(export_run(writer, greedy_policy, seed=3, max_actions=150))
+        dataset = TrajectoryDataset(self.directory)
+        self.assertEqual(len(dataset), 150)
+        self.assertEqual(dataset.chunk_lengths, [64, 64, 22])
+        dones = np.concatenate([chunk['dones'] for chunk in dataset.chunks])
+        truncated = np.concatenate([chunk['truncated'] for chunk in dataset.chunks])
+        self.assertFalse(dones.any())
+        self.assertEqual(list(np.flatnonzero(truncated)), [149])
+        first_game = Game('character', seed=3)
+        first_chunk = dataset.chunks[0]
+        np.testing.assert_array_equal(first_chunk['observations'][0], encode_observation(first_game))
+        np.testing.assert_array_equal(first_chunk['action_masks'][0], first_game.action_mask())
+        self.assertEqual(first_chunk['actions'][0], get_action_index(first_game, greedy_policy(first_game)))
+        for chunk in dataset.chunks:
+            self.assertTrue(chunk['action_masks'][np.arange(len(chunk['actions'])), chunk['actions']].all())
+
+    def test_append_replay(self):
+        with TrajectoryWriter(self.directory, chunk_size=32) as writer:
+            self.assertTrue(export_run(writer, greedy_policy, seed=0))
+        steps = len(TrajectoryDataset(self.directory))
+        replay_file = io.BytesIO()
+        game = Game('character', seed=5)
+        game.record_replay(replay_file)
+        with self.assertRaises(GameOver):
+            for _ in range(500):
+                game.action_initiate(['end_turn'])
+        replay_file.seek(0)
+        replay = ReplayReader(replay_file)
+        with TrajectoryWriter(self.directory, chunk_size=32) as writer:
+            self.assertTrue(export_replay(writer, replay))
+        dataset = TrajectoryDataset(self.directory)
+        self.assertEqual(len(dataset), steps + len(replay))
+        rewards = np.concatenate([chunk['rewards'] for chunk in dataset.chunks])
+        dones = np.concatenate([chunk['dones'] for chunk in dataset.chunks])
+        self.assertEqual(list(np.flatnonzero(dones)), [steps - 1, len(dataset) - 1])
+        self.assertEqual(list(rewards[dones]), [LOSS_REWARD, LOSS_REWARD])
+        self.assertFalse(np.concatenate([chunk['truncated'] for chunk in dataset.chunks]).any())
+        actions = np.concatenate([chunk['actions'] for chunk in dataset.chunks])
+        self.assertTrue((actions[steps:] == actions[-1]).all())
+
+    def test_engine_error_truncates(self):
+        game = Game('character', seed=3)
+        options = [greedy_policy(game)]
+        with TrajectoryWriter(self.directory) as writer, \
+                mock.patch.object(Game, 'action_initiate', side_effect=KeyError('all_hand')), \
+                self.assertLogs('flask_app', level='WARNING'):
+            self.assertFalse(write_game_steps(writer, game, options))
+        chunk = TrajectoryDataset(self.directory).chunks[0]
+        self.assertEqual((list(chunk['dones']), list(chunk['truncated']), list(chunk['rewards'])),
+                         ([False], [True], [0]))
+
+    def test_illegal_option_truncates(self):
+        with TrajectoryWriter(self.directory) as writer:
+            game = Game('character', seed=3)
+            self.assertFalse(write_game_steps(writer, game, [game.current_options[0], 'not an option']))
+        chunk = TrajectoryDataset(self.directory).chunks[0]
+        self.assertEqual((list(chunk['dones']), list(chunk['truncated'])), ([False], [True]))
+
+    def test_same_seed_same_run(self):
+        actions = []
+        for index in range(2):
+            random.seed(index)
+            with TrajectoryWriter(self.directory / str(index)) as writer:
+                export_run(writer, random_policy, seed=4, max_actions=40)
+            actions.append(TrajectoryDataset(self.directory / str(index)).chunks[0]['actions'])
+        np.testing.assert_array_equal(actions[0], actions[1])
+
+    def test_minibatches(self):
+        with TrajectoryWriter(self.directory, chunk_size=50) as writer:
+            export_run(writer, greedy_policy, seed=3, max_actions=120)
+        dataset = TrajectoryDataset(self.directory)
+        batches = list(dataset.minibatches(20, seed=1))
+        self.assertEqual([len(batch['actions']) for batch in batches].count(20), 5)
+        self.assertEqual(sum(len(batch['actions']) for batch in batches), 120)
+        self.assertIsInstance(batches[0]['observations'].base, np.memmap)
+        ordered = np.concatenate([batch['actions'] for batch in dataset.minibatches(20)])
+        np.testing.assert_array_equal(ordered, np.concatenate([chunk['actions'] for chunk in dataset.chunks]))
+
+    def test_layout_mismatch(self):
+        with TrajectoryWriter(self.directory) as writer:
+            export_run(writer, greedy_policy, seed=3, max_actions=5)
+        manifest_path = self.directory / 'manifest.json'
+        manifest_path.write_text(manifest_path.read_text().replace('"observation_size": ', '"observation_size": 1'))
+        with self.assertRaises(ValueError):
+            TrajectoryWriter(self.directory)
@@ -0,0 +1,80 @@
+import json
+import queue
+import shutil
+import tempfile
+import unittest
+import logging
+from pathlib import Path
+
+from fake_the_spire.api import play_game_request
+from fake_the_spire.sessions import GameSessionStore
+from fake_the_spire.transcripts import (TranscriptQueueHandler, hash_options, record_transcript,
+                                        setup_transcript_logging, stop_transcript_logging)
+
+logging.basicConfig(level=logging.INFO)
+
+
+def read_transcript(path: Path) -> list[dict]:
+    with open(path, encoding='utf-8') as transcript_file:
+        return [json.loads(line) for line in transcript_file]
+
+
+class TestTranscripts(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.writer = setup_transcript_logging(self.directory)
+
+    def tearDown(self):
+        stop_transcript_logging()
+        shutil.rmtree(self.directory)
+
+    def test_transcript_per_game(self):
+        game_sessions = GameSessionStore()
+        start_response, _ = play_game_request(game_sessions, {'seed': 5})
+        session_id = start_response['session_id']
+        options = start_response['options']
+        play_game_request(game_sessions, {'session_id': session_id, 'action': ['end_turn']})
+        play_game_request(game_sessions, {'session_id': session_id, 'actions': ['end_turn', 'end_turn']})
+        stop_transcript_logging()
+        records = read_transcript(self.writer.get_transcript_path(session_id))
+        self.assertEqual([record['event'] for record in records], ['start', 'step', 'step', 'step'])
+        self.assertEqual(records[0]['seed'], 5)
+        self.assertEqual(records[1]['action'], 'end_turn')
+        self.assertEqual(records[1]['options_hash'], hash_options(options))
+
+    def test_end_of_game_closes_file(self):
+        game_sessions = GameSessionStore()
+        start_response, _ = play_game_request(game_sessions, {'seed': 5})
+        session_id = start_response['session_id']
+        for _ in range(200):
+            response, _ = play_game_request(game_sessions, {'session_id': session_id, 'action': ['end_turn'],
+                                                            'delta': True})
+            if 'game_over' in response:
+                break
+        stop_transcript_logging()
+        records = read_transcript(self.writer.get_transcript_path(session_id))
+        self.assertEqual(records[-1], {'event': 'end', 'session_id': session_id, 'won': False})
+        self.assertEqual(self.writer.open_files, {})
+
+    def test_open_file_limit(self):
+        self.writer.max_open_files = 2
+        game_sessions = GameSessionStore()
+        session_ids = [play_game_request(game_sessions, {'seed': seed})[0]['session_id'] for seed in range(4)]
+        stop_transcript_logging()
+        for session_id in session_ids:
+            self.assertEqual(len(read_transcript(self.writer.get_transcript_path(session_id))), 1)
+
+    def test_unwritable_record_keeps_writer_running(self):
+        record_transcript('start', 'broken', seed=object())
+        for step in range(3):
+            record_transcript('step', 'working', action=f'play {step}')
+        stop_transcript_logging()
+        self.assertEqual(self.writer.failed_records, 1)
+        self.assertEqual(len(read_transcript(self.writer.get_transcript_path('working'))), 3)
+
+    def test_full_queue_drops_records(self):
+        handler = TranscriptQueueHandler(queue.Queue(maxsize=2))
+        for step in range(5):
+            handler.handle(logging.makeLogRecord({'msg': 'step', 'transcript': {'event': 'step', 'step': step}}))
+        self.assertEqual(handler.dropped_records, 3)
+        self.assertEqual(handler.queue.qsize(), 2)
@@ -0,0 +1,82 @@
+import unittest
+import logging
+import random
+from unittest import mock
+
+import numpy as np
+
+from fake_the_spire.action_space import ACTION_SPACE_SIZE, CHOICE_OFFSET, END_TURN_INDEX
+from fake_the_spire.observation import ObservationLayout
+from fake_the_spire.state_delta import copy_state
+from fake_the_spire.vector_game import VectorGame, LOSS_REWARD
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TestVectorGame(unittest.TestCase):
+    def test_reset_shapes(self):
+        vector_game = VectorGame(3, seed=5)
+        observations, action_masks = vector_game.reset()
+        self.assertEqual(observations.shape, (3, ObservationLayout.get_instance().size))
+        self.assertEqual(action_masks.shape, (3, ACTION_SPACE_SIZE))
+        self.assertTrue(action_masks[:, END_TURN_INDEX].all())
+        self.assertEqual([game.seed for game in vector_game.games], [5, 6, 7])
+
+    def test_end_turn_until_games_are_lost(self):
+        vector_game = VectorGame(2, seed=5)
+        vector_game.reset()
+        first_games = list(vector_game.games)
+        for _ in range(200):
+            observations, rewards, dones, truncated, action_masks = vector_game.step([END_TURN_INDEX] * 2)
+            if dones.any():
+                break
+        self.assertTrue(dones.any())
+        done_index = int(np.flatnonzero(dones)[0])
+        self.assertEqual(rewards[done_index], LOSS_REWARD)
+        self.assertIsNot(vector_game.games[done_index], first_games[done_index])
+        self.assertTrue(action_masks[done_index, END_TURN_INDEX])
+
+    def test_random_actions(self):
+        rng = random.Random(1)
+        vector_game = VectorGame(16, seed=10)
+        _, action_masks = vector_game.reset()
+        for _ in range(100):
+            actions = [rng.choice(np.flatnonzero(mask)) for mask in action_masks]
+            observations, rewards, dones, truncated, action_masks = vector_game.step(actions)
+            self.assertTrue(action_masks.any(axis=1).all())
+            self.assertFalse((dones & truncated).any())
+
+    def test_engine_error_truncates_one_game(self):
+        vector_game = VectorGame(2, seed=5)
+        vector_game.reset()
+        first_games = list(vector_game.games)
+        with mock.patch.object(first_games[0], 'play_action', side_effect=KeyError('Missing all_hand')):
+            _, rewards, dones, truncated, action_masks = vector_game.step([END_TURN_INDEX] * 2)
+        self.assertEqual(list(truncated), [True, False])
+        self.assertEqual(list(dones), [False, False])
+        self.assertEqual(rewards[0], 0)
+        self.assertIsNot(vector_game.games[0], first_games[0])
+        self.assertIs(vector_game.games[1], first_games[1])
+        self.assertTrue(action_masks[0, END_TURN_INDEX])
+
+    def test_illegal_action(self):
+        vector_game = VectorGame(1)
+        vector_game.reset()
+        with self.assertRaises(ValueError):
+            vector_game.step([CHOICE_OFFSET])
+
+    def test_illegal_action_moves_no_game(self):
+        vector_game = VectorGame(2)
+        vector_game.reset()
+        states = [copy_state(game.to_dict()) for game in vector_game.games]
+        observations = vector_game.observations.copy()
+        with self.assertRaises(ValueError):
+            vector_game.step([END_TURN_INDEX, CHOICE_OFFSET])
+        self.assertEqual([game.to_dict() for game in vector_game.games], states)
+        np.testing.assert_array_equal(vector_game.observations, observations)
+
+    def test_wrong_action_count(self):
+        vector_game = VectorGame(2)
+        vector_game.reset()
+        with self.assertRaises(ValueError):
+            vector_game.step([END_TURN_INDEX])